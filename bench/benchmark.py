@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""Benchmarking helpers shared by all benchmarks."""
+
+from __future__ import print_function
+
+import json
+import time
+import timeit
+import rospy
+import platform
+
+# Summary line of a benchmark: name, best throughput, and best, median and 99th
+# percentile of the mean milliseconds per call of each run.
+LINE_FORMAT = ("{:<48s} {:>12.1f} ops/s {:>10.4f} ms "
+               "{:>10.4f} ms run p50 {:>10.4f} ms run p99")
+
+
+def init_rostime():
+    """Allows rospy.get_rostime() to be used without a ROS master.
+
+    The serializers stamp messages with the current ROS time, which is only
+    available once a node has been initialized. Benchmarks run without a
+    master, so wall-clock time is used instead.
+    """
+    rospy.rostime.set_rostime_initialized(True)
+
+
+def measure(f, number=100, repeat=5):
+    """Measures how long a function takes to run.
+
+    Args:
+        f: Function to call without arguments.
+        number: Number of calls per run.
+        repeat: Number of runs.
+
+    Returns:
+        List of average seconds per call, one per run.
+    """
+    timer = timeit.Timer(f)
+    return [t / number for t in timer.repeat(repeat=repeat, number=number)]
+
+
+def percentile(samples, p):
+    """Computes a percentile of samples by linear interpolation.
+
+    Args:
+        samples: List of samples.
+        p: Percentile between 0 and 100.
+
+    Returns:
+        Percentile.
+    """
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * p / 100.0
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def summarize(samples):
+    """Summarizes benchmark samples.
+
+    The percentiles are of the mean time per call of each run, not of the time
+    taken by individual calls, so they are prefixed with "run_".
+
+    Args:
+        samples: List of seconds per call, as returned by measure().
+
+    Returns:
+        Dictionary with the best throughput in calls per second, and the best,
+        median, 90th and 99th percentile seconds per call of the runs.
+    """
+    best = min(samples)
+    return {
+        "ops_per_s": 1.0 / best,
+        "best": best,
+        "run_p50": percentile(samples, 50),
+        "run_p90": percentile(samples, 90),
+        "run_p99": percentile(samples, 99)
+    }
+
+
+def report(name, samples, results=None):
+    """Prints a one line summary of a benchmark.
+
+    Args:
+        name: Benchmark name.
+        samples: List of seconds per call, as returned by measure().
+        results: Optional list to append the summary to, see summarize().
+
+    Returns:
+        Summary, see summarize().
+    """
+    summary = summarize(samples)
+    times = [summary[key] * 1e3 for key in ("best", "run_p50", "run_p99")]
+    print(LINE_FORMAT.format(name, summary["ops_per_s"], *times))
+    if results is not None:
+        results.append(dict(summary, name=name))
+    return summary
+
+
+def write_results(path, results):
+    """Writes benchmark results as JSON.
+
+    Args:
+        path: Path to write to.
+        results: List of summaries, as appended by report().
+    """
+    output = {
+        "time": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results
+    }
+    with open(path, "w") as f:
+        json.dump(output, f, indent=2, sort_keys=True)
+
+
+def compare_results(results, path, threshold=0.1):
+    """Prints the benchmarks that regressed since a previous run.
+
+    Args:
+        results: List of summaries, as appended by report().
+        path: Path to the JSON results of the previous run.
+        threshold: Relative increase of the median of the runs' mean time per
+            call considered a regression.
+
+    Returns:
+        Number of regressions.
+    """
+    with open(path) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+
+    regressions = 0
+    for result in results:
+        if result["name"] not in baseline:
+            continue
+        change = result["run_p50"] / baseline[result["name"]]["run_p50"] - 1.0
+        if change > threshold:
+            print("REGRESSION {:<48s} {:>+8.1%}".format(result["name"], change))
+            regressions += 1
+    return regressions
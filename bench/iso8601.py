@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""ISO 8601 timestamp parsing micro-benchmark.
+
+Compares the fixed layout parser used for interop server timestamps against
+the general dateutil based parser it falls back to.
+"""
+
+from __future__ import print_function
+
+import argparse
+from interop import serializers
+from benchmark import measure, report
+
+# Timestamps in the layouts returned by the interop server.
+TIMESTAMPS = [
+    "2017-06-15T18:23:14.451726+00:00",
+    "2017-06-15T18:23:14Z",
+]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--number", type=int, default=10000, help="calls per run")
+    parser.add_argument("--repeat", type=int, default=5, help="runs")
+    args = parser.parse_args()
+
+    for iso in TIMESTAMPS:
+        fast = measure(lambda: serializers._parse_iso8601(iso), args.number,
+                       args.repeat)
+        fallback = measure(lambda: serializers._parse_iso8601_fallback(iso),
+                           args.number, args.repeat)
+        rostime = measure(lambda: serializers.iso8601_to_rostime(iso),
+                          args.number, args.repeat)
+
+        print(iso)
+        report("fixed layout", fast)
+        report("dateutil fallback", fallback)
+        report("iso8601_to_rostime", rostime)
+        print("speedup: {:.2f}x".format(min(fallback) / min(fast)))
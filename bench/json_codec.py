@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""JSON codec benchmark.
+
+Compares the standard library's json module against the JSON library used by
+interop.json_codec on obstacle, mission and object payloads.
+"""
+
+from __future__ import print_function
+
+import sys
+import json
+import random
+import argparse
+from interop import json_codec
+from benchmark import measure, report
+from mission_deserializer import generate_mission
+
+
+def generate_obstacles(n):
+    """Generates random obstacles.
+
+    Args:
+        n: Number of stationary and moving obstacles each.
+
+    Returns:
+        Obstacles dictionary.
+    """
+    return {
+        "moving_obstacles": [{
+            "altitude_msl": random.uniform(100.0, 750.0),
+            "latitude": 38.14 + random.uniform(-0.01, 0.01),
+            "longitude": -76.43 + random.uniform(-0.01, 0.01),
+            "sphere_radius": random.uniform(30.0, 300.0)
+        } for _ in range(n)],
+        "stationary_obstacles": [{
+            "cylinder_height": random.uniform(100.0, 750.0),
+            "cylinder_radius": random.uniform(30.0, 300.0),
+            "latitude": 38.14 + random.uniform(-0.01, 0.01),
+            "longitude": -76.43 + random.uniform(-0.01, 0.01)
+        } for _ in range(n)]
+    }
+
+
+def generate_objects(n):
+    """Generates random objects.
+
+    Args:
+        n: Number of objects.
+
+    Returns:
+        List of object dictionaries.
+    """
+    return [{
+        "id": i + 1,
+        "user": 1,
+        "type": "standard",
+        "latitude": 38.14 + random.uniform(-0.01, 0.01),
+        "longitude": -76.43 + random.uniform(-0.01, 0.01),
+        "orientation": "n",
+        "shape": "star",
+        "background_color": "orange",
+        "alphanumeric": "C",
+        "alphanumeric_color": "black",
+        "description": "",
+        "autonomous": False
+    } for i in range(n)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--size", type=int, default=1000, help="number of items per payload")
+    parser.add_argument("--number", type=int, default=100, help="calls per run")
+    parser.add_argument("--repeat", type=int, default=5, help="runs")
+    args = parser.parse_args()
+
+    if json_codec.NAME == "json":
+        print(
+            "No faster JSON library is installed, comparing json to itself",
+            file=sys.stderr)
+
+    payloads = [
+        ("obstacles", generate_obstacles(args.size)),
+        ("missions", [generate_mission(args.size)]),
+        ("objects", generate_objects(args.size)),
+    ]
+
+    for name, payload in payloads:
+        encoded = json.dumps(payload)
+        for codec_name, codec in [("json", json), (json_codec.NAME,
+                                                   json_codec)]:
+            dumps = measure(lambda: codec.dumps(payload), args.number,
+                            args.repeat)
+            loads = measure(lambda: codec.loads(encoded), args.number,
+                            args.repeat)
+            report("{} {} dumps".format(codec_name, name), dumps)
+            report("{} {} loads".format(codec_name, name), loads)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Mission deserialization benchmark.
+
+Compares the array based mission deserialization against the original point
+by point implementation on missions with many boundary points and waypoints.
+"""
+
+from __future__ import print_function
+
+import random
+import argparse
+from benchmark import init_rostime, measure, report
+from geographic_msgs.msg import GeoPoint
+from interop.msg import FlyZone, FlyZoneArray, GeoPolygonStamped, WayPoints
+from interop.serializers import MissionDeserializer, feet_to_meters
+
+
+def generate_points(n, altitude=True):
+    """Generates random mission points.
+
+    Args:
+        n: Number of points.
+        altitude: Whether to include an altitude or not.
+
+    Returns:
+        List of dictionaries.
+    """
+    points = []
+    for i in range(n):
+        point = {
+            "latitude": 38.14 + random.uniform(-0.01, 0.01),
+            "longitude": -76.43 + random.uniform(-0.01, 0.01),
+            "order": i + 1
+        }
+        if altitude:
+            point["altitude_msl"] = random.uniform(100.0, 750.0)
+        points.append(point)
+    return points
+
+
+def generate_mission(n):
+    """Generates a random mission.
+
+    Args:
+        n: Number of boundary points, search grid points and waypoints.
+
+    Returns:
+        Mission dictionary.
+    """
+    position = {"latitude": 38.14, "longitude": -76.43}
+    return {
+        "id":
+            1,
+        "active":
+            True,
+        "air_drop_pos":
+            position,
+        "fly_zones": [{
+            "altitude_msl_max": 750.0,
+            "altitude_msl_min": 100.0,
+            "boundary_pts": generate_points(n, altitude=False)
+        }],
+        "home_pos":
+            position,
+        "mission_waypoints":
+            generate_points(n),
+        "off_axis_odlc_pos":
+            position,
+        "emergent_last_known_pos":
+            position,
+        "search_grid_points":
+            generate_points(n)
+    }
+
+
+def reference_points(mission):
+    """Deserializes the mission points one by one as originally done.
+
+    Args:
+        mission: Mission dictionary.
+
+    Returns:
+        Tuple of (FlyZoneArray, GeoPolygonStamped, WayPoints).
+    """
+    flyzones = FlyZoneArray()
+    for zone in mission["fly_zones"]:
+        flyzone = FlyZone()
+        flyzone.max_alt = feet_to_meters(zone["altitude_msl_max"])
+        flyzone.min_alt = feet_to_meters(zone["altitude_msl_min"])
+        for waypoint in zone["boundary_pts"]:
+            point = GeoPoint()
+            point.latitude = waypoint["latitude"]
+            point.longitude = waypoint["longitude"]
+            flyzone.zone.polygon.points.append(point)
+        flyzones.flyzones.append(flyzone)
+
+    search_grid = GeoPolygonStamped()
+    for point in mission["search_grid_points"]:
+        boundary_pnt = GeoPoint()
+        boundary_pnt.latitude = point["latitude"]
+        boundary_pnt.longitude = point["longitude"]
+        boundary_pnt.altitude = feet_to_meters(point["altitude_msl"])
+        search_grid.polygon.points.append(boundary_pnt)
+
+    waypoints = WayPoints()
+    for point in mission["mission_waypoints"]:
+        waypoint = GeoPoint()
+        waypoint.latitude = point["latitude"]
+        waypoint.longitude = point["longitude"]
+        waypoint.altitude = feet_to_meters(point["altitude_msl"])
+        waypoints.waypoints.append(waypoint)
+
+    return flyzones, search_grid, waypoints
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000, 5000],
+        help="number of points per mission list")
+    parser.add_argument("--number", type=int, default=20, help="calls per run")
+    parser.add_argument("--repeat", type=int, default=5, help="runs")
+    args = parser.parse_args()
+
+    init_rostime()
+
+    for n in args.sizes:
+        mission = generate_mission(n)
+        reference = measure(lambda: reference_points(mission), args.number,
+                            args.repeat)
+        vectorized = measure(
+            lambda: MissionDeserializer.from_dict(mission, "earth"),
+            args.number, args.repeat)
+
+        report("reference ({:d} points)".format(n), reference)
+        report("MissionDeserializer.from_dict ({:d} points)".format(n),
+               vectorized)
+        print("speedup: {:.2f}x".format(min(reference) / min(vectorized)))
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Objects synchronization throughput benchmark.
+
+Fills an ObjectsDirectory with objects and images, and syncs it to a local
+interop server running in this process, in the following scenarios:
+
+    cold: every object and image is new.
+    incremental: a fraction of new objects and images is added.
+    churn: a fraction of objects is added, updated, deleted or has its image
+        replaced, as during a search pass.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+from json_codec import generate_objects
+from interop.local_objects import ObjectsDirectory
+from interop.client import InteroperabilityClient
+
+# The local server lives with the tests.
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "test"))
+from local_server import LocalInteropServer  # noqa: E402
+
+# Time to wait for the server to record the last request in seconds.
+SETTLE_TIME = 0.1
+
+
+def generate_data(n):
+    """Generates object data as stored in an ObjectsDirectory.
+
+    Args:
+        n: Number of objects.
+
+    Returns:
+        List of JSON strings.
+    """
+    objects = generate_objects(n)
+    for object_ in objects:
+        del object_["id"]
+        del object_["user"]
+    return [json.dumps(object_) for object_ in objects]
+
+
+def totals(server):
+    """Sums the server's request statistics over every endpoint.
+
+    Args:
+        server: LocalInteropServer.
+
+    Returns:
+        Tuple of (requests, bytes received).
+    """
+    endpoints = server.stats.to_dict()["endpoints"].values()
+    requests = sum(stats["requests"] for stats in endpoints)
+    bytes_in = sum(stats["bytes_in"] for stats in endpoints)
+    return requests, bytes_in
+
+
+def timed_sync(name, directory, server, results):
+    """Syncs a directory, and reports its throughput.
+
+    Args:
+        name: Scenario name.
+        directory: ObjectsDirectory.
+        server: LocalInteropServer.
+        results: List to append the scenario's results to.
+    """
+    requests_before, bytes_before = totals(server)
+    start = time.time()
+    directory.sync()
+    elapsed = time.time() - start
+
+    # The server records requests after responding, so let it settle.
+    time.sleep(SETTLE_TIME)
+    requests_after, bytes_after = totals(server)
+    requests = requests_after - requests_before
+
+    result = {
+        "name": name,
+        "objects": len(directory.objects),
+        "wall_time": elapsed,
+        "requests": requests,
+        "requests_per_s": requests / elapsed,
+        "bytes_uploaded": bytes_after - bytes_before
+    }
+    results.append(result)
+    print("{name:<32s} {objects:>8d} objects {wall_time:>10.3f} s "
+          "{requests:>8d} requests {requests_per_s:>10.1f} req/s "
+          "{bytes_uploaded:>12d} bytes".format(**result))
+
+
+def run(n, args, client, server, results):
+    """Runs every scenario with a given number of objects.
+
+    Args:
+        n: Number of objects to start with.
+        args: Parsed command-line arguments.
+        client: InteroperabilityClient.
+        server: LocalInteropServer.
+        results: List to append the results to.
+    """
+    path = tempfile.mkdtemp()
+    try:
+        directory = ObjectsDirectory(path, client, False)
+
+        # Cold sync.
+        file_ids = directory.add_objects(generate_data(n))
+        for file_id in file_ids:
+            directory.set_object_image(file_id, os.urandom(args.image_size))
+        timed_sync("cold ({:d})".format(n), directory, server, results)
+
+        # Incremental sync.
+        k = max(1, int(n * args.fraction))
+        new_file_ids = directory.add_objects(generate_data(k))
+        for file_id in new_file_ids:
+            directory.set_object_image(file_id, os.urandom(args.image_size))
+        timed_sync("incremental ({:d}+{:d})".format(n, k), directory, server,
+                   results)
+
+        # Churn: split the sampled objects evenly between every operation.
+        file_ids = list(directory.objects)
+        sample = random.sample(file_ids, min(len(file_ids), 3 * k))
+        updated, replaced, deleted = sample[0::3], sample[1::3], sample[2::3]
+        directory.update_objects(
+            list(zip(updated, generate_data(len(updated)))))
+        for file_id in replaced:
+            directory.set_object_image(file_id, os.urandom(args.image_size))
+        directory.delete_objects(deleted)
+        for file_id in directory.add_objects(generate_data(k)):
+            directory.set_object_image(file_id, os.urandom(args.image_size))
+        timed_sync("churn ({:d})".format(n), directory, server, results)
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument(
+        "--objects",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="number of objects to start with")
+    parser.add_argument(
+        "--image-size",
+        type=int,
+        default=50000,
+        help="size of every image in bytes")
+    parser.add_argument(
+        "--fraction",
+        type=float,
+        default=0.1,
+        help="fraction of objects added and changed after the cold sync")
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="time the server waits before responding in seconds")
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.0,
+        help="maximum random time added to the latency in seconds")
+    parser.add_argument("--output", help="path to save the results as JSON")
+    args = parser.parse_args()
+
+    server = LocalInteropServer(("127.0.0.1", 0), args.latency, args.jitter)
+    thread = threading.Thread(target=server.serve_forever, name="server")
+    thread.daemon = True
+    thread.start()
+
+    url = "http://{}:{}".format(*server.server_address)
+    client = InteroperabilityClient(url, "testuser", "testpass", 10.0)
+    client.login()
+
+    results = []
+    for n in args.objects:
+        run(n, args, client, server, results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    server.shutdown()
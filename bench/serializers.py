@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Serializer benchmark suite.
+
+Benchmarks the serializers on the hot paths of every node with synthetic
+payloads of varying sizes. Results can be saved as JSON, and compared against
+a previous run to catch regressions.
+"""
+
+from __future__ import print_function
+
+import sys
+import argparse
+import numpy as np
+from interop import serializers
+from cv_bridge import CvBridge
+from mavros_msgs.msg import Altitude
+from sensor_msgs.msg import NavSatFix
+from geometry_msgs.msg import PoseStamped
+from mission_deserializer import generate_mission
+from json_codec import generate_objects, generate_obstacles
+from benchmark import (compare_results, init_rostime, measure, report,
+                       write_results)
+
+# Timestamps in the layouts returned by the interop server.
+TIMESTAMPS = [
+    "2017-06-15T18:23:14.451726+00:00",
+    "2017-06-15T18:23:14Z",
+]
+
+
+def generate_telemetry():
+    """Generates telemetry messages.
+
+    Returns:
+        Tuple of (NavSatFix, Altitude, PoseStamped).
+    """
+    navsat_msg = NavSatFix()
+    navsat_msg.latitude = 38.149
+    navsat_msg.longitude = -76.432
+    altitude_msg = Altitude()
+    altitude_msg.amsl = 30.48
+    pose_msg = PoseStamped()
+    pose_msg.pose.orientation.z = 0.3826834
+    pose_msg.pose.orientation.w = 0.9238795
+    return navsat_msg, altitude_msg, pose_msg
+
+
+def generate_image(size):
+    """Generates a random color image.
+
+    Random images are the worst case for PNG compression.
+
+    Args:
+        size: Width and height in pixels.
+
+    Returns:
+        ROS Image message.
+    """
+    img = np.random.randint(0, 256, (size, size, 3)).astype(np.uint8)
+    return CvBridge().cv2_to_imgmsg(img, "bgr8")
+
+
+def run(args):
+    """Runs every benchmark.
+
+    Args:
+        args: Parsed command-line arguments.
+
+    Returns:
+        List of summaries, see benchmark.summarize().
+    """
+    results = []
+
+    def bench(name, f, number=args.number):
+        report(name, measure(f, number, args.repeat), results)
+
+    for n in args.sizes:
+        mission = generate_mission(n)
+        bench(
+            "MissionDeserializer.from_dict ({:d})".format(n),
+            lambda: serializers.MissionDeserializer.from_dict(mission, "earth"))
+
+        obstacles = generate_obstacles(n)
+        bench("ObstaclesDeserializer.from_dict ({:d})".format(n),
+              lambda: serializers.ObstaclesDeserializer.from_dict(
+                  obstacles, "earth", 1.0))
+
+    telemetry = generate_telemetry()
+    bench("TelemetrySerializer.from_msg",
+          lambda: serializers.TelemetrySerializer.from_msg(*telemetry))
+
+    data = generate_objects(1)[0]
+    msg = serializers.ObjectSerializer.from_dict(data)
+    bench("ObjectSerializer.from_msg",
+          lambda: serializers.ObjectSerializer.from_msg(msg))
+    bench("ObjectSerializer.from_dict",
+          lambda: serializers.ObjectSerializer.from_dict(data))
+
+    # Images are orders of magnitude slower, so they are called less often.
+    image_number = max(1, args.number // 10)
+    for size in args.image_sizes:
+        image = generate_image(size)
+        png = serializers.ObjectImageSerializer.from_msg(image)
+        bench("ObjectImageSerializer.from_msg ({0:d}x{0:d})".format(size),
+              lambda: serializers.ObjectImageSerializer.from_msg(image),
+              image_number)
+        bench("ObjectImageSerializer.from_raw ({0:d}x{0:d})".format(size),
+              lambda: serializers.ObjectImageSerializer.from_raw(png),
+              image_number)
+
+    for iso in TIMESTAMPS:
+        bench("iso8601_to_rostime ({})".format(iso),
+              lambda: serializers.iso8601_to_rostime(iso))
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="number of points and obstacles per payload")
+    parser.add_argument(
+        "--image-sizes",
+        type=int,
+        nargs="+",
+        default=[64, 256, 1024],
+        help="width and height of images in pixels")
+    parser.add_argument("--number", type=int, default=20, help="calls per run")
+    parser.add_argument("--repeat", type=int, default=20, help="runs")
+    parser.add_argument("--output", help="path to save the results as JSON")
+    parser.add_argument(
+        "--compare", help="path to previous results to check for regressions")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative slowdown considered a regression")
+    args = parser.parse_args()
+
+    init_rostime()
+    results = run(args)
+
+    if args.output:
+        write_results(args.output, results)
+
+    if args.compare and compare_results(results, args.compare, args.threshold):
+        sys.exit(1)
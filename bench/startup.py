@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Node startup time benchmark.
+
+Measures how long each node takes to start, from launching a new Python
+interpreter to having imported everything it needs, as it would when it is
+respawned. The nodes are only loaded, not run, so no ROS master is needed. The
+heavy dependencies loaded by each node are also listed.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+from benchmark import compare_results, report, write_results
+
+# Directory containing the nodes.
+SCRIPTS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "scripts")
+
+# Nodes launched by interop.launch.
+NODES = [
+    "obstacles_client.py",
+    "missions_client.py",
+    "telemetry_client.py",
+    "objects_server.py",
+]
+
+# Dependencies that are slow to import.
+HEAVY_MODULES = ["cv2", "cv_bridge", "dateutil", "numpy", "tf"]
+
+# Loads a node without running it, and prints the heavy modules it loaded.
+LOAD_NODE = ("import sys, runpy; runpy.run_path(sys.argv[1]); "
+             "print(' '.join(m for m in sys.argv[2:] if m in sys.modules))")
+
+
+def start(args):
+    """Starts a new Python interpreter, and waits for it to exit.
+
+    Args:
+        args: Command-line arguments to the interpreter.
+
+    Returns:
+        Tuple of (seconds taken, output).
+    """
+    start = time.time()
+    output = subprocess.check_output([sys.executable] + args)
+    return time.time() - start, output.decode().strip()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--nodes",
+        nargs="+",
+        default=NODES,
+        help="nodes to start, from the scripts directory")
+    parser.add_argument(
+        "--repeat", type=int, default=10, help="starts per node")
+    parser.add_argument("--output", help="path to save the results as JSON")
+    parser.add_argument(
+        "--compare", help="path to previous results to check for regressions")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative slowdown considered a regression")
+    args = parser.parse_args()
+
+    results = []
+
+    # The bare interpreter's startup time is the lower bound of every node's.
+    samples = [start(["-c", "pass"])[0] for i in range(args.repeat)]
+    report("python", samples, results)
+
+    for node in args.nodes:
+        path = os.path.join(SCRIPTS_PATH, node)
+        samples = []
+        for i in range(args.repeat):
+            elapsed, modules = start(["-c", LOAD_NODE, path] + HEAVY_MODULES)
+            samples.append(elapsed)
+        report(node, samples, results)
+        print("  loaded: {}".format(modules or "none"))
+
+    if args.output:
+        write_results(args.output, results)
+
+    if args.compare and compare_results(results, args.compare, args.threshold):
+        sys.exit(1)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""End-to-end telemetry latency benchmark.
+
+Replays synthetic NavSatFix, Altitude and PoseStamped streams into the
+telemetry node, which uploads them to a local interop server running in this
+node. Every NavSatFix message is tagged with a sequence number through its
+latitude, so that the time from publishing it to the server receiving its
+telemetry can be measured.
+
+Run it with its launch file, which also starts the telemetry node:
+
+    roslaunch interop telemetry_latency.launch rate:=20 latency:=0.05
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import json
+import time
+import rospy
+import threading
+from benchmark import percentile
+from mavros_msgs.msg import Altitude
+from sensor_msgs.msg import NavSatFix
+from geometry_msgs.msg import PoseStamped
+
+# The local server lives with the tests.
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "test"))
+from local_server import LocalInteropServer  # noqa: E402
+
+# Latitude of the first message, and step between consecutive messages.
+LATITUDE = 38.0
+LATITUDE_STEP = 1e-6
+
+# Upper bounds of the latency histogram buckets in milliseconds.
+BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+def receive_telemetry(data, t):
+    """Stores the time telemetry was first received by the server at.
+
+    Args:
+        data: Telemetry dictionary.
+        t: Time it was received at.
+    """
+    seq = int(round((float(data["latitude"]) - LATITUDE) / LATITUDE_STEP))
+    with lock:
+        received.setdefault(seq, t)
+
+
+def replay(rate, duration, skew):
+    """Publishes synthetic telemetry streams.
+
+    Args:
+        rate: Publishing rate in Hz.
+        duration: Time to publish for in seconds.
+        skew: Offset of the altitude and pose time stamps from the NavSatFix
+            time stamps in seconds.
+
+    Returns:
+        Dictionary of sequence numbers to the time they were published at.
+    """
+    sent = {}
+    r = rospy.Rate(rate)
+    for seq in range(int(rate * duration)):
+        if rospy.is_shutdown():
+            break
+
+        stamp = rospy.get_rostime()
+        skewed_stamp = stamp + rospy.Duration(skew)
+
+        navsat_msg = NavSatFix()
+        navsat_msg.header.stamp = stamp
+        navsat_msg.latitude = LATITUDE + seq * LATITUDE_STEP
+        navsat_msg.longitude = -76.43
+
+        altitude_msg = Altitude()
+        altitude_msg.header.stamp = skewed_stamp
+        altitude_msg.amsl = 100.0
+
+        pose_msg = PoseStamped()
+        pose_msg.header.stamp = skewed_stamp
+        pose_msg.pose.orientation.w = 1.0
+
+        sent[seq] = time.time()
+        navsat_pub.publish(navsat_msg)
+        altitude_pub.publish(altitude_msg)
+        pose_pub.publish(pose_msg)
+        r.sleep()
+
+    return sent
+
+
+def summarize(sent, received):
+    """Summarizes the upload rate, drop rate and latencies.
+
+    Args:
+        sent: Dictionary of sequence numbers to the time they were published
+            at.
+        received: Dictionary of sequence numbers to the time they were
+            received at.
+
+    Returns:
+        Summary dictionary.
+    """
+    latencies = sorted(
+        received[seq] - sent[seq] for seq in received if seq in sent)
+    summary = {
+        "sent": len(sent),
+        "received": len(latencies),
+        "drop_rate": 1.0 - len(latencies) / float(max(len(sent), 1)),
+        "upload_rate": 0.0,
+        "latency": {},
+        "histogram": []
+    }
+    if not latencies:
+        return summary
+
+    times = sorted(received.values())
+    if len(times) > 1:
+        summary["upload_rate"] = (len(times) - 1) / (times[-1] - times[0])
+
+    summary["latency"] = {
+        "mean": sum(latencies) / len(latencies),
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "max": latencies[-1]
+    }
+
+    # Count latencies per bucket, with a last bucket for everything slower.
+    counts = [0] * (len(BUCKETS) + 1)
+    for latency in latencies:
+        i = 0
+        while i < len(BUCKETS) and latency * 1e3 > BUCKETS[i]:
+            i += 1
+        counts[i] += 1
+    summary["histogram"] = list(zip(BUCKETS + [None], counts))
+
+    return summary
+
+
+def print_summary(summary):
+    """Prints a summary.
+
+    Args:
+        summary: Summary dictionary, see summarize().
+    """
+    print("sent: {sent:d}, received: {received:d}, drop rate: {drop_rate:.1%}, "
+          "upload rate: {upload_rate:.1f} Hz".format(**summary))
+    if not summary["latency"]:
+        return
+
+    print("latency: " + ", ".join(
+        "{} {:.1f} ms".format(key, value * 1e3)
+        for key, value in sorted(summary["latency"].items())))
+
+    largest = max(count for _, count in summary["histogram"])
+    for bound, count in summary["histogram"]:
+        label = "<= {:d} ms".format(bound) if bound else "slower"
+        bar = "#" * int(round(50.0 * count / largest))
+        print("{:>12s} {:>8d} {}".format(label, count, bar))
+
+
+if __name__ == "__main__":
+    # Initialize node.
+    rospy.init_node("telemetry_latency")
+
+    # Get ROS parameters for the local server.
+    port = int(rospy.get_param("~port", 8765))
+    server = LocalInteropServer(
+        ("127.0.0.1", port),
+        latency=float(rospy.get_param("~latency", 0.0)),
+        jitter=float(rospy.get_param("~jitter", 0.0)),
+        error_rate=float(rospy.get_param("~error_rate", 0.0)))
+
+    # Received telemetry, shared with the server's threads.
+    lock = threading.Lock()
+    received = {}
+    server.on_telemetry = receive_telemetry
+
+    # Serve in the background.
+    thread = threading.Thread(target=server.serve_forever, name="server")
+    thread.daemon = True
+    thread.start()
+
+    # Get ROS parameters for the replayed streams.
+    rate = float(rospy.get_param("~rate", 10.0))
+    duration = float(rospy.get_param("~duration", 30.0))
+    skew = float(rospy.get_param("~skew", 0.0))
+    drain = float(rospy.get_param("~drain", 5.0))
+    output = rospy.get_param("~output", "")
+
+    # Setup publishers.
+    navsat_pub = rospy.Publisher(
+        rospy.get_param("~navsat_topic"), NavSatFix, queue_size=100)
+    altitude_pub = rospy.Publisher(
+        rospy.get_param("~altitude_topic"), Altitude, queue_size=100)
+    pose_pub = rospy.Publisher(
+        rospy.get_param("~pose_topic"), PoseStamped, queue_size=100)
+
+    # Wait for the telemetry node to subscribe and login.
+    publishers = (navsat_pub, altitude_pub, pose_pub)
+    while not rospy.is_shutdown() and (
+            not all(pub.get_num_connections() for pub in publishers) or
+            "login" not in server.stats.to_dict()["endpoints"]):
+        rospy.sleep(0.1)
+
+    rospy.loginfo("Replaying telemetry at {} Hz for {} s".format(
+        rate, duration))
+    sent = replay(rate, duration, skew)
+
+    # Let the last messages go through.
+    rospy.sleep(drain)
+    with lock:
+        summary = summarize(sent, dict(received))
+
+    print_summary(summary)
+    if output:
+        with open(output, "w") as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+
+    server.shutdown()
+    rospy.signal_shutdown("Done")
@@ -23,6 +23,9 @@ if __name__ == "__main__":
     else:
         base_url = rospy.get_param("~base_url")
 
+    # Get frame ID to prebuild ROS messages for.
+    frame = str(rospy.get_param("~frame", "earth"))
+
     # Initialize interoperability client.
     client = InteroperabilityClient.from_env(base_url, timeout, verify)
 
@@ -37,5 +40,5 @@ if __name__ == "__main__":
     # Download.
     if not os.path.isdir(base_path):
         os.makedirs(base_path)
-    client.download_mission_info(base_path)
+    client.download_mission_info(base_path, frames=[frame])
     rospy.loginfo("Mission downloaded successfully to {}".format(base_path))
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Combined Interoperability ROS Node.
+
+Runs the obstacles, mission_info, telemetry and objects nodes in a single
+process sharing one logged in client, and therefore one session and pool of
+connections to the interop server. Each node keeps its own namespace, so its
+topics, services and parameters are the same as if it were run on its own.
+"""
+
+import sys
+import rospy
+import objects_server
+import missions_client
+import obstacles_client
+import telemetry_client
+from interop.node import NodeNamespace, connect
+
+# Nodes that can be combined, in the order to start them in. The mission
+# information is started last since it blocks until a mission is received.
+NODES = [
+    ("obstacles", obstacles_client),
+    ("telemetry", telemetry_client),
+    ("objects", objects_server),
+    ("mission_info", missions_client),
+]
+
+if __name__ == "__main__":
+    # Initialize node.
+    rospy.init_node("client")
+
+    # Get the nodes to run, and their namespaces.
+    names = rospy.get_param("~nodes", [name for name, node in NODES])
+    nodes = [(NodeNamespace(rospy.get_namespace() + name), node)
+             for name, node in NODES
+             if name in names]
+
+    # Connect to the server once for all of the nodes.
+    ns = NodeNamespace()
+    recorder = None
+    if "telemetry" in names:
+        telemetry_ns = NodeNamespace(rospy.get_namespace() + "telemetry")
+        recorder = telemetry_client.create_recorder(telemetry_ns)
+    try:
+        client = connect(ns, recorder)
+    except Exception as e:
+        rospy.logfatal(e)
+        sys.exit(1)
+
+    for node_ns, node in nodes:
+        rospy.loginfo("Starting {}".format(node_ns.name))
+        node.start(client, node_ns)
+
+    rospy.spin()
@@ -7,11 +7,16 @@ from threading import Lock
 from functools import partial
 from std_msgs.msg import Header
 from std_srvs.srv import Trigger
-from interop.srv import GetMissionByID
+from interop.spatial import FlyZoneIndex
+from interop.projection import project_mission
+from interop.profiling import CallbackProfiler
+from geometry_msgs.msg import PolygonStamped
+from interop.node import NodeNamespace, connect
+from interop.srv import CheckFlyZone, GetMissionByID
 from geographic_msgs.msg import GeoPointStamped
-from interop.msg import FlyZoneArray, WayPoints, GeoPolygonStamped
+from interop.msg import (FlyZoneArray, WayPoints, GeoPolygonStamped,
+                         LocalFlyZoneArray, LocalWayPoints)
 from requests.exceptions import Timeout, ConnectionError, HTTPError
-from interop import InteroperabilityClient, OfflineInteroperabilityClient
 
 
 def publish_mission(event):
@@ -35,6 +40,12 @@ def publish_mission(event):
         emergent_obj_pub.publish(msgs[5])
         home_pub.publish(msgs[6])
 
+        if local_msgs is not None:
+            update_stamp(stamp, local_msgs)
+            local_flyzones_pub.publish(local_msgs[0])
+            local_search_grid_pub.publish(local_msgs[1])
+            local_waypoints_pub.publish(local_msgs[2])
+
 
 def update_stamp(stamp, msg):
     """Recursively update the time stamp of all the messages.
@@ -58,6 +69,26 @@ def update_stamp(stamp, msg):
         map(lambda m: update_stamp(stamp, getattr(msg, m)), msg.__slots__)
 
 
+def load_mission(mission):
+    """Sets the mission to publish, and preprocesses its geometry.
+
+    This must be called with the lock held.
+
+    Args:
+        mission: Tuple of mission messages, as returned by the client.
+    """
+    global msgs, flyzone_index, local_msgs
+    msgs = mission
+
+    # Preprocess the fly zones once for containment queries.
+    flyzone_index = FlyZoneIndex(msgs[0].flyzones)
+
+    # Project the geometry to ENU once, relative to the home position.
+    if enu:
+        local_msgs = project_mission(msgs[0], msgs[1], msgs[2], msgs[6],
+                                     enu_frame)
+
+
 def get_active_mission(req):
     """ Service to update mission information with current active mission.
 
@@ -68,9 +99,8 @@ def get_active_mission(req):
         TriggerResponse with true, false for success, failure.
     """
     with lock:
-        global msgs
         try:
-            msgs = client.get_active_mission(frame)
+            load_mission(client.get_active_mission(frame))
         except (ConnectionError, Timeout) as e:
             rospy.logwarn(e)
             return False, str(e)
@@ -95,9 +125,8 @@ def get_mission_by_id(req):
         failure.
     """
     with lock:
-        global msgs
         try:
-            msgs = client.get_mission(req.id, frame)
+            load_mission(client.get_mission(req.id, frame))
         except (ConnectionError, Timeout) as e:
             rospy.logwarn(e)
             return False, str(e)
@@ -112,37 +141,50 @@ def get_mission_by_id(req):
     return True, "Success"
 
 
-if __name__ == "__main__":
-    rospy.init_node("mission_info")
+def check_flyzone(req):
+    """Service to check whether points or a path are inside the fly zones.
 
-    # Get server connection information.
-    offline = rospy.get_param("~offline")
-    if offline:
-        base_path = rospy.get_param("~base_path")
-        client = OfflineInteroperabilityClient(base_path)
-        rospy.logwarn("Running in OFFLINE mode")
-    else:
-        base_url = rospy.get_param("~base_url")
-        timeout = rospy.get_param("~timeout")
-        verify = rospy.get_param("~verify")
-        client = InteroperabilityClient.from_env(base_url, timeout, verify)
-
-    # Login.
-    client.wait_for_server()
-    try:
-        client.login()
-    except Exception as e:
-        rospy.logfatal(e)
-        sys.exit(1)
+    Args:
+        req: CheckFlyZone request with the points to check.
+
+    Returns:
+        CheckFlyZoneResponse with whether the path and each point are inside
+        the fly zones, and the distance of each point to their boundary.
+    """
+    with lock:
+        index = flyzone_index
+
+    if index is None:
+        rospy.logwarn("No mission received yet")
+        return False, False, [], []
+
+    path_inside, inside, distances = index.query(req.points)
+    return True, path_inside, inside.tolist(), distances.tolist()
+
+
+def start(interop_client, ns):
+    """Starts publishing the mission information.
+
+    This blocks until the first mission is received.
+
+    Args:
+        interop_client: Logged in interop client.
+        ns: NodeNamespace to get parameters from and advertise in.
+    """
+    global client, flyzones_pub, search_grid_pub, waypoints_pub, air_drop_pub
+    global off_axis_obj_pub, emergent_obj_pub, home_pub, enu, enu_frame
+    global local_flyzones_pub, local_search_grid_pub, local_waypoints_pub
+    global frame, lock, flyzone_index, local_msgs, msgs
+    client = interop_client
 
     # Get topics to publish to.
-    flyzones_topic = rospy.get_param("~flyzones_topic")
-    search_grid_topic = rospy.get_param("~search_grid_topic")
-    waypoints_topic = rospy.get_param("~waypoints_topic")
-    air_drop_topic = rospy.get_param("~air_drop_topic")
-    off_axis_obj_topic = rospy.get_param("~off_axis_obj_topic")
-    emergent_obj_topic = rospy.get_param("~emergent_obj_topic")
-    home_topic = rospy.get_param("~home_topic")
+    flyzones_topic = ns.resolve(ns.get_param("~flyzones_topic"))
+    search_grid_topic = ns.resolve(ns.get_param("~search_grid_topic"))
+    waypoints_topic = ns.resolve(ns.get_param("~waypoints_topic"))
+    air_drop_topic = ns.resolve(ns.get_param("~air_drop_topic"))
+    off_axis_obj_topic = ns.resolve(ns.get_param("~off_axis_obj_topic"))
+    emergent_obj_topic = ns.resolve(ns.get_param("~emergent_obj_topic"))
+    home_topic = ns.resolve(ns.get_param("~home_topic"))
 
     # Setup publishers.
     flyzones_pub = rospy.Publisher(flyzones_topic, FlyZoneArray, queue_size=1)
@@ -157,21 +199,41 @@ if __name__ == "__main__":
         emergent_obj_topic, GeoPointStamped, queue_size=1)
     home_pub = rospy.Publisher(home_topic, GeoPointStamped, queue_size=1)
 
+    # Setup ENU publishers, if enabled.
+    enu = ns.get_param("~enu", False)
+    if enu:
+        enu_frame = str(ns.get_param("~enu_frame"))
+        flyzones_enu_topic = ns.resolve(ns.get_param("~flyzones_enu_topic"))
+        search_grid_enu_topic = ns.resolve(
+            ns.get_param("~search_grid_enu_topic"))
+        waypoints_enu_topic = ns.resolve(ns.get_param("~waypoints_enu_topic"))
+
+        local_flyzones_pub = rospy.Publisher(
+            flyzones_enu_topic, LocalFlyZoneArray, queue_size=1)
+        local_search_grid_pub = rospy.Publisher(
+            search_grid_enu_topic, PolygonStamped, queue_size=1)
+        local_waypoints_pub = rospy.Publisher(
+            waypoints_enu_topic, LocalWayPoints, queue_size=1)
+
     # Get message parameters.
-    frame = str(rospy.get_param("~frame"))
+    frame = str(ns.get_param("~frame"))
 
     # Create timer event and publish.
-    period = float(rospy.get_param("~period"))
+    period = float(ns.get_param("~period"))
 
     # Create lock for msgs.
     lock = Lock()
+    flyzone_index = None
+    local_msgs = None
 
     # Setup services and publish mission.
-    rospy.Service("get_active_mission", Trigger, get_active_mission)
-    rospy.Service("get_mission_by_id", GetMissionByID, get_mission_by_id)
+    rospy.Service(ns.resolve("get_active_mission"), Trigger, get_active_mission)
+    rospy.Service(
+        ns.resolve("get_mission_by_id"), GetMissionByID, get_mission_by_id)
+    rospy.Service(ns.resolve("check_flyzone"), CheckFlyZone, check_flyzone)
 
     # Get mission to begin publishing. This is the first mission published.
-    mission_id = rospy.get_param("~id")
+    mission_id = ns.get_param("~id")
     msgs = None
 
     retry_rate = rospy.Rate(1)
@@ -186,7 +248,24 @@ if __name__ == "__main__":
 
         retry_rate.sleep()
 
+    # Profile the publishing callback if enabled.
+    profiler = CallbackProfiler.from_params(ns)
+
     # Publish message on timer.
-    timer = rospy.Timer(rospy.Duration(period), publish_mission)
+    rospy.Timer(rospy.Duration(period), profiler.wrap(publish_mission))
+
+
+if __name__ == "__main__":
+    rospy.init_node("mission_info")
+
+    # Connect to the server.
+    ns = NodeNamespace()
+    try:
+        client = connect(ns)
+    except Exception as e:
+        rospy.logfatal(e)
+        sys.exit(1)
+
+    start(client, ns)
 
     rospy.spin()
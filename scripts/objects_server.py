@@ -4,16 +4,19 @@
 
 import os
 import sys
-import json
 import rospy
 import errno
 import datetime
+import threading
 import interop.srv
 from cv_bridge import CvBridgeError
 from interop.msg import ObjectNotification
 from interop import serializers, local_objects
+from interop.profiling import CallbackProfiler
 from std_srvs.srv import Trigger, TriggerResponse
-from interop import InteroperabilityClient, OfflineInteroperabilityClient
+from interop.node import NodeNamespace, connect
+from interop.diagnostics import ObjectsDiagnostics
+from interop import OfflineInteroperabilityClient
 
 
 def trigger_exception_handler(*expected_exception_types):
@@ -67,6 +70,10 @@ class ObjectsServer(object):
         """
         self.objects_dir = objects_dir
 
+        # Whether a one-off sync has already been scheduled.
+        self.sync_lock = threading.Lock()
+        self.sync_pending = False
+
     def add_object(self, req):
         """Handles AddObject service requests.
 
@@ -78,8 +85,7 @@ class ObjectsServer(object):
         """
         response = interop.srv.AddObjectResponse()
 
-        dict_object = serializers.ObjectSerializer.from_msg(req.object)
-        json_object = json.dumps(dict_object)
+        json_object = serializers.ObjectSerializer.to_json(req.object)
 
         try:
             file_id = self.objects_dir.add_object(json_object)
@@ -102,6 +108,43 @@ class ObjectsServer(object):
 
         return response
 
+    def add_objects(self, req):
+        """Handles AddObjects service requests.
+
+        Args:
+            req: AddObjectsRequest message.
+
+        Returns:
+            AddObjectsResponse.
+        """
+        response = interop.srv.AddObjectsResponse()
+
+        json_objects = [
+            serializers.ObjectSerializer.to_json(o) for o in req.objects
+        ]
+
+        try:
+            file_ids = self.objects_dir.add_objects(json_objects)
+        except Exception as e:
+            rospy.logfatal(e)
+            file_ids = [None] * len(json_objects)
+
+        notification = ObjectNotification()
+        notification.type = ObjectNotification.ADDED_OBJECTS
+        for file_id, object_ in zip(file_ids, req.objects):
+            response.succeeded.append(file_id is not None)
+            response.ids.append(file_id or 0)
+            if file_id is not None:
+                notification.ids.append(file_id)
+                notification.objects.append(object_)
+        response.success = all(response.succeeded)
+
+        if notification.ids:
+            notification_pub.publish(notification)
+            self.schedule_sync()
+
+        return response
+
     def get_object(self, req):
         """Handles GetObject service requests.
 
@@ -122,9 +165,8 @@ class ObjectsServer(object):
             rospy.logfatal(e)
             response.success = False
         else:
-            dict_object = json.loads(json_object)
-            response.object = serializers.ObjectSerializer.from_dict(
-                dict_object)
+            response.object = serializers.ObjectSerializer.from_json(
+                json_object)
             response.success = True
 
         return response
@@ -140,8 +182,7 @@ class ObjectsServer(object):
         """
         response = interop.srv.UpdateObjectResponse()
 
-        dict_object = serializers.ObjectSerializer.from_msg(req.object)
-        json_object = json.dumps(dict_object)
+        json_object = serializers.ObjectSerializer.to_json(req.object)
 
         try:
             self.objects_dir.update_object(req.id, json_object)
@@ -163,6 +204,47 @@ class ObjectsServer(object):
 
         return response
 
+    def update_objects(self, req):
+        """Handles UpdateObjects service requests.
+
+        Args:
+            req: UpdateObjectsRequest message.
+
+        Returns:
+            UpdateObjectsResponse.
+        """
+        response = interop.srv.UpdateObjectsResponse()
+
+        if len(req.ids) != len(req.objects):
+            rospy.logerr("Could not update objects: got {} IDs for {} objects"
+                         .format(len(req.ids), len(req.objects)))
+            response.success = False
+            return response
+
+        updates = [(file_id, serializers.ObjectSerializer.to_json(o))
+                   for file_id, o in zip(req.ids, req.objects)]
+
+        try:
+            response.succeeded = self.objects_dir.update_objects(updates)
+        except Exception as e:
+            rospy.logfatal(e)
+            response.succeeded = [False] * len(updates)
+        response.success = all(response.succeeded)
+
+        notification = ObjectNotification()
+        notification.type = ObjectNotification.UPDATED_OBJECTS
+        for succeeded, file_id, object_ in zip(response.succeeded, req.ids,
+                                               req.objects):
+            if succeeded:
+                notification.ids.append(file_id)
+                notification.objects.append(object_)
+
+        if notification.ids:
+            notification_pub.publish(notification)
+            self.schedule_sync()
+
+        return response
+
     def delete_object(self, req):
         """Handles DeleteObject service requests.
 
@@ -193,6 +275,37 @@ class ObjectsServer(object):
 
         return response
 
+    def delete_objects(self, req):
+        """Handles DeleteObjects service requests.
+
+        Args:
+            req: DeleteObjectsRequest message.
+
+        Returns:
+            DeleteObjectsResponse.
+        """
+        response = interop.srv.DeleteObjectsResponse()
+
+        try:
+            response.succeeded = self.objects_dir.delete_objects(req.ids)
+        except Exception as e:
+            rospy.logfatal(e)
+            response.succeeded = [False] * len(req.ids)
+        response.success = all(response.succeeded)
+
+        notification = ObjectNotification()
+        notification.type = ObjectNotification.DELETED_OBJECTS
+        notification.ids = [
+            file_id for succeeded, file_id in zip(response.succeeded, req.ids)
+            if succeeded
+        ]
+
+        if notification.ids:
+            notification_pub.publish(notification)
+            self.schedule_sync()
+
+        return response
+
     def get_all_objects(self, req):
         """Handles GetAllObjects service requests.
 
@@ -215,8 +328,7 @@ class ObjectsServer(object):
         else:
             for str_file_id, json_object in json_objects.iteritems():
                 file_id = int(str_file_id)
-                dict_object = json.loads(json_object)
-                ros_object = serializers.ObjectSerializer.from_dict(dict_object)
+                ros_object = serializers.ObjectSerializer.from_json(json_object)
 
                 response.ids.append(file_id)
                 response.objects.append(ros_object)
@@ -381,6 +493,30 @@ class ObjectsServer(object):
         """
         self.objects_dir.sync()
 
+    def schedule_sync(self):
+        """Schedules a single sync of the local objects and images to the
+        interop server as soon as possible.
+
+        Requests made while a sync is already scheduled are coalesced into it.
+        """
+        with self.sync_lock:
+            if self.sync_pending:
+                return
+            self.sync_pending = True
+
+        rospy.Timer(rospy.Duration(0.001), self._scheduled_sync, oneshot=True)
+
+    def _scheduled_sync(self, rospy_timer_event):
+        """Handles the one-shot rospy.Timer set up by schedule_sync().
+
+        Args:
+            rospy_timer_event (rospy.TimerEvent): Unused.
+        """
+        with self.sync_lock:
+            self.sync_pending = False
+
+        self.sync(rospy_timer_event)
+
 
 def get_objects_path(objects_root):
     """"Gets a new objects diretory.
@@ -440,33 +576,20 @@ def symlink_objects_path_to_latest(objects_path):
                 "Could not create symlink to the latest objects directory")
 
 
-if __name__ == "__main__":
-    # Initialize node.
-    rospy.init_node("objects")
+def start(interop_client, ns):
+    """Starts the objects server.
 
-    # Get server connection information.
-    offline = rospy.get_param("~offline")
-    if offline:
-        base_path = rospy.get_param("~base_path")
-        client = OfflineInteroperabilityClient(base_path)
-        rospy.logwarn("Running in OFFLINE mode")
-    else:
-        base_url = rospy.get_param("~base_url")
-        timeout = rospy.get_param("~timeout")
-        verify = rospy.get_param("~verify")
-        client = InteroperabilityClient.from_env(base_url, timeout, verify)
+    Args:
+        interop_client: Logged in interop client.
+        ns: NodeNamespace to get parameters from and advertise in.
+    """
+    global notification_pub
 
-    # Get other ROS parameters.
-    objects_root = rospy.get_param("~objects_root")
-    update_period = rospy.get_param("~interop_update_period")
+    offline = isinstance(interop_client, OfflineInteroperabilityClient)
 
-    # Wait for server to be reachable, then login.
-    client.wait_for_server()
-    try:
-        client.login()
-    except Exception as e:
-        rospy.logfatal(e)
-        sys.exit(1)
+    # Get other ROS parameters.
+    objects_root = ns.get_param("~objects_root")
+    update_period = ns.get_param("~interop_update_period")
 
     # Initialize a directory for storing the objects.
     try:
@@ -475,8 +598,8 @@ if __name__ == "__main__":
         rospy.loginfo("Storing object files in {}".format(objects_path))
         create_objects_path(objects_path)
         symlink_objects_path_to_latest(objects_path)
-        objects_dir = local_objects.ObjectsDirectory(objects_path, client,
-                                                     offline)
+        objects_dir = local_objects.ObjectsDirectory(objects_path,
+                                                     interop_client, offline)
     except OSError as e:
         rospy.logfatal(e)
         raise
@@ -490,43 +613,102 @@ if __name__ == "__main__":
             rospy.logfatal(e)
             raise
 
+        # Publish the sync backlog as diagnostics, warning when changes have
+        # been waiting for more than a couple of sync passes.
+        diagnostics_period = float(ns.get_param("~diagnostics_period", 1.0))
+        max_age = float(ns.get_param("~backlog_max_age", 2 * update_period))
+        objects_diagnostics = ObjectsDiagnostics(objects_dir, ns.name,
+                                                 interop_client.url, max_age)
+        rospy.Timer(
+            rospy.Duration(diagnostics_period), objects_diagnostics.publish)
+
     # Set up the objects server.
     objects_server = ObjectsServer(objects_dir)
 
+    # Profile the sync and service callbacks if enabled.
+    profiler = CallbackProfiler.from_params(ns)
+    for callback in ("sync", "add_object", "add_objects", "get_object",
+                     "update_object", "update_objects", "delete_object",
+                     "delete_objects", "get_all_objects", "set_object_image",
+                     "get_object_image", "delete_object_image",
+                     "reload_all_objects", "clear_all_objects"):
+        setattr(objects_server, callback,
+                profiler.wrap(getattr(objects_server, callback)))
+
     # Set up a timer to periodically update the objects and images
     # on the interop server.
     rospy.Timer(rospy.Duration(update_period), objects_server.sync)
 
     # Initialize ROS publishers.
     notification_pub = rospy.Publisher(
-        "~notification", ObjectNotification, queue_size=10)
+        ns.resolve("~notification"), ObjectNotification, queue_size=10)
 
     # Initialize object ROS services.
-    rospy.Service("~add", interop.srv.AddObject, objects_server.add_object)
-    rospy.Service("~get", interop.srv.GetObject, objects_server.get_object)
-    rospy.Service("~update", interop.srv.UpdateObject,
-                  objects_server.update_object)
-    rospy.Service("~delete", interop.srv.DeleteObject,
-                  objects_server.delete_object)
-    rospy.Service("~all", interop.srv.GetAllObjects,
-                  objects_server.get_all_objects)
+    rospy.Service(
+        ns.resolve("~add"), interop.srv.AddObject, objects_server.add_object)
+    rospy.Service(
+        ns.resolve("~get"), interop.srv.GetObject, objects_server.get_object)
+    rospy.Service(
+        ns.resolve("~update"), interop.srv.UpdateObject,
+        objects_server.update_object)
+    rospy.Service(
+        ns.resolve("~delete"), interop.srv.DeleteObject,
+        objects_server.delete_object)
+    rospy.Service(
+        ns.resolve("~all"), interop.srv.GetAllObjects,
+        objects_server.get_all_objects)
+
+    # Initialize batch object ROS services.
+    rospy.Service(
+        ns.resolve("~batch/add"), interop.srv.AddObjects,
+        objects_server.add_objects)
+    rospy.Service(
+        ns.resolve("~batch/update"), interop.srv.UpdateObjects,
+        objects_server.update_objects)
+    rospy.Service(
+        ns.resolve("~batch/delete"), interop.srv.DeleteObjects,
+        objects_server.delete_objects)
 
     # Initialize object image ROS services.
-    rospy.Service("~image/set", interop.srv.SetObjectImage,
-                  objects_server.set_object_image)
-    rospy.Service("~image/get", interop.srv.GetObjectImage,
-                  objects_server.get_object_image)
-    rospy.Service("~image/delete", interop.srv.DeleteObjectImage,
-                  objects_server.delete_object_image)
+    rospy.Service(
+        ns.resolve("~image/set"), interop.srv.SetObjectImage,
+        objects_server.set_object_image)
+    rospy.Service(
+        ns.resolve("~image/get"), interop.srv.GetObjectImage,
+        objects_server.get_object_image)
+    rospy.Service(
+        ns.resolve("~image/delete"), interop.srv.DeleteObjectImage,
+        objects_server.delete_object_image)
 
     # Initialize object compressed image ROS services.
-    rospy.Service("~image/compressed/set", interop.srv.SetObjectCompressedImage,
-                  lambda r: objects_server.set_object_image(r, True))
-    rospy.Service("~image/compressed/get", interop.srv.GetObjectCompressedImage,
-                  lambda r: objects_server.get_object_image(r, True))
+    rospy.Service(
+        ns.resolve("~image/compressed/set"),
+        interop.srv.SetObjectCompressedImage,
+        lambda r: objects_server.set_object_image(r, True))
+    rospy.Service(
+        ns.resolve("~image/compressed/get"),
+        interop.srv.GetObjectCompressedImage,
+        lambda r: objects_server.get_object_image(r, True))
 
     # Initialize objects syncing ROS services.
-    rospy.Service("~clear", Trigger, objects_server.clear_all_objects)
-    rospy.Service("~reload", Trigger, objects_server.reload_all_objects)
+    rospy.Service(
+        ns.resolve("~clear"), Trigger, objects_server.clear_all_objects)
+    rospy.Service(
+        ns.resolve("~reload"), Trigger, objects_server.reload_all_objects)
+
+
+if __name__ == "__main__":
+    # Initialize node.
+    rospy.init_node("objects")
+
+    # Connect to the server.
+    ns = NodeNamespace()
+    try:
+        client = connect(ns)
+    except Exception as e:
+        rospy.logfatal(e)
+        sys.exit(1)
+
+    start(client, ns)
 
     rospy.spin()
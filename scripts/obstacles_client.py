@@ -4,72 +4,238 @@
 
 import sys
 import rospy
+import threading
+import message_filters
+from mavros_msgs.msg import Altitude
+from sensor_msgs.msg import NavSatFix
+from geographic_msgs.msg import GeoPoint
+from interop.spatial import ObstacleIndex
+from interop.srv import GetNearbyObstacles
+from interop.profiling import CallbackProfiler
+from interop.node import NodeNamespace, connect
 from requests.exceptions import ConnectionError, HTTPError, Timeout
-from interop.msg import GeoCylinderArrayStamped
-from interop import InteroperabilityClient, OfflineInteroperabilityClient
+from interop.msg import GeoCylinderArrayStamped, GeoSphereArrayStamped
+from interop.obstacles import MovingObstacleExtrapolator
+
+
+def fetch_obstacles():
+    """Continuously requests obstacles and stores the latest ones.
+
+    This runs in its own thread until shutdown, so that slow responses from
+    the server do not delay publishing.
+    """
+    global index, index_key, latest_stationary
+
+    rate = rospy.Rate(1.0 / poll_period)
+    while not rospy.is_shutdown():
+        try:
+            moving, stationary = client.get_obstacles(frame, lifetime)
+        except (ConnectionError, Timeout) as e:
+            rospy.logwarn(e)
+        except (ValueError, HTTPError) as e:
+            rospy.logerr(e)
+        except Exception as e:
+            rospy.logfatal(e)
+        else:
+            extrapolator.update(moving)
+
+            # Only rebuild the index when the obstacles change. This is the
+            # only thread updating it, so it is built outside of the lock.
+            key = ObstacleIndex.key(stationary.cylinders)
+            new_index = index
+            if key != index_key:
+                new_index = ObstacleIndex(stationary.cylinders, cell_size)
+
+            with lock:
+                latest_stationary = stationary
+                index_key = key
+                index = new_index
+
+        try:
+            rate.sleep()
+        except rospy.ROSInterruptException:
+            break
 
 
 def publish_obstacles(timer_event):
-    """Requests and publishes obstacles.
+    """Publishes the latest obstacles.
+
+    Moving obstacles are extrapolated to the current time, and the stationary
+    obstacles near the aircraft are also published on their own.
 
     Args:
         timer_event: ROS TimerEvent.
     """
-    try:
-        stationary_obstacles = client.get_obstacles(frame, lifetime)
-    except (ConnectionError, Timeout) as e:
-        rospy.logwarn(e)
-        return
-    except (ValueError, HTTPError) as e:
-        rospy.logerr(e)
-        return
-    except Exception as e:
-        rospy.logfatal(e)
+    with lock:
+        stationary = latest_stationary
+        stationary_index = index
+        position = latest_position
+
+    if stationary is None:
         return
 
+    # The stored message is only ever replaced by the fetching thread, so its
+    # time stamp is left untouched to compute the age of the data.
+    now = rospy.get_rostime()
+    stationary_obstacles = GeoCylinderArrayStamped()
+    stationary_obstacles.header.frame_id = stationary.header.frame_id
+    stationary_obstacles.header.stamp = now
+    stationary_obstacles.cylinders = stationary.cylinders
+    stationary_obstacles.age = now - stationary.header.stamp
     stationary_pub.publish(stationary_obstacles)
 
+    if position is not None:
+        nearby_obstacles = GeoCylinderArrayStamped()
+        nearby_obstacles.header = stationary_obstacles.header
+        nearby_obstacles.cylinders = [
+            cylinder
+            for cylinder, _ in stationary_index.query([position], nearby_radius)
+        ]
+        nearby_obstacles.age = stationary_obstacles.age
+        nearby_pub.publish(nearby_obstacles)
 
-if __name__ == "__main__":
-    # Initialize node.
-    rospy.init_node("obstacles")
+    if not no_moving_obstacles:
+        moving_obstacles = extrapolator.predict(now)
+        if moving_obstacles is not None:
+            moving_pub.publish(moving_obstacles)
 
-    # Get server connection information.
-    offline = rospy.get_param("~offline")
-    if offline:
-        base_path = rospy.get_param("~base_path")
-        no_moving_obstacles = rospy.get_param("~no_moving_obstacles")
-        client = OfflineInteroperabilityClient(base_path)
-        rospy.logwarn("Running in OFFLINE mode")
-    else:
-        base_url = rospy.get_param("~base_url")
-        timeout = rospy.get_param("~timeout")
-        verify = rospy.get_param("~verify")
-        no_moving_obstacles = False
-        client = InteroperabilityClient.from_env(base_url, timeout, verify)
-
-    # Wait for server to be reachable, then login.
-    client.wait_for_server()
-    try:
-        client.login()
-    except Exception as e:
-        rospy.logfatal(e)
-        sys.exit(1)
+
+def update_position(navsat_msg, altitude_msg):
+    """Stores the latest position of the aircraft.
+
+    The altitude is taken w.r.t. sea level as the obstacles are, since the
+    NavSatFix altitude is w.r.t. the WGS84 ellipsoid.
+
+    Args:
+        navsat_msg: sensor_msgs/NavSatFix message.
+        altitude_msg: mavros_msgs/Altitude message.
+    """
+    global latest_position
+
+    position = GeoPoint(navsat_msg.latitude, navsat_msg.longitude,
+                        altitude_msg.amsl)
+    with lock:
+        latest_position = position
+
+
+def get_nearby_obstacles(req):
+    """Service to find the stationary obstacles near a point or path.
+
+    Args:
+        req: GetNearbyObstacles request with the points to search around and
+            the search radius.
+
+    Returns:
+        GetNearbyObstaclesResponse with the obstacles within the search radius
+        and their distances, sorted from closest to furthest.
+    """
+    with lock:
+        stationary_index = index
+
+    if stationary_index is None:
+        rospy.logwarn("No obstacles received yet")
+        return False, [], []
+
+    nearby = stationary_index.query(req.points, req.radius)
+    cylinders = [cylinder for cylinder, _ in nearby]
+    distances = [distance for _, distance in nearby]
+    return True, cylinders, distances
+
+
+def start(interop_client, ns):
+    """Starts requesting and publishing obstacles.
+
+    Args:
+        interop_client: Logged in interop client.
+        ns: NodeNamespace to get parameters from and advertise in.
+    """
+    global client, frame, lifetime, poll_period, extrapolator, cell_size
+    global nearby_radius, no_moving_obstacles, moving_pub, stationary_pub
+    global nearby_pub, lock, latest_stationary, latest_position, index_key
+    global index
+    client = interop_client
+
+    # Moving obstacles can only be disabled offline, so this is only set then.
+    no_moving_obstacles = ns.get_param("~no_moving_obstacles", False)
 
     # Get ROS parameters for published topic names.
-    stationary_topic = rospy.get_param("~stationary_topic")
+    moving_topic = ns.resolve(ns.get_param("~moving_topic"))
+    stationary_topic = ns.resolve(ns.get_param("~stationary_topic"))
+    nearby_topic = ns.resolve(
+        ns.get_param("~nearby_topic", "~stationary/nearby"))
 
     # Setup publishers.
+    moving_pub = rospy.Publisher(
+        moving_topic, GeoSphereArrayStamped, queue_size=1)
     stationary_pub = rospy.Publisher(
         stationary_topic, GeoCylinderArrayStamped, queue_size=1)
+    nearby_pub = rospy.Publisher(
+        nearby_topic, GeoCylinderArrayStamped, queue_size=1)
 
     # Get ROS parameter for publishing period and frame ID.
-    period = float(rospy.get_param("~period"))
-    frame = str(rospy.get_param("~frame"))
+    period = float(ns.get_param("~period"))
+    frame = str(ns.get_param("~frame"))
     lifetime = 2 * period
 
+    # Get ROS parameters for requesting and extrapolating obstacles.
+    poll_period = float(ns.get_param("~poll_period", period))
+    max_extrapolation = float(ns.get_param("~max_extrapolation", 1.0))
+    extrapolator = MovingObstacleExtrapolator(max_horizon=max_extrapolation)
+
+    # Get ROS parameters for indexing stationary obstacles.
+    cell_size = float(ns.get_param("~cell_size", 100.0))
+    nearby_radius = float(ns.get_param("~nearby_radius", 100.0))
+
+    # Latest stationary obstacles and aircraft position, shared between
+    # threads.
+    lock = threading.Lock()
+    latest_stationary = None
+    latest_position = None
+    index_key = None
+    index = None
+
+    # Subscribe to the aircraft's position to find the obstacles near it.
+    navsat_topic = ns.resolve(ns.get_param("~navsat_topic"))
+    altitude_topic = ns.resolve(ns.get_param("~altitude_topic"))
+    sync_queue = ns.get_param("~sync_queue_size", 12)
+    sync_delay = ns.get_param("~max_sync_delay", 1)
+    subscribers = [
+        message_filters.Subscriber(navsat_topic, NavSatFix),
+        message_filters.Subscriber(altitude_topic, Altitude),
+    ]
+    synchronizer = message_filters.ApproximateTimeSynchronizer(
+        subscribers, sync_queue, sync_delay)
+    synchronizer.registerCallback(update_position)
+
+    # Set up service to find obstacles near a point or path.
+    rospy.Service(
+        ns.resolve("~nearby"), GetNearbyObstacles, get_nearby_obstacles)
+
+    # Request obstacles in the background.
+    fetcher = threading.Thread(target=fetch_obstacles, name="fetch_obstacles")
+    fetcher.daemon = True
+    fetcher.start()
+
+    # Profile the publishing callback if enabled.
+    profiler = CallbackProfiler.from_params(ns)
+
     # Set up ROS timer for publishing at the specified rates.
-    rospy.Timer(rospy.Duration(period), publish_obstacles)
+    rospy.Timer(rospy.Duration(period), profiler.wrap(publish_obstacles))
+
+
+if __name__ == "__main__":
+    # Initialize node.
+    rospy.init_node("obstacles")
+
+    # Connect to the server.
+    ns = NodeNamespace()
+    try:
+        client = connect(ns)
+    except Exception as e:
+        rospy.logfatal(e)
+        sys.exit(1)
+
+    start(client, ns)
 
     # Spin forever.
     rospy.spin()
@@ -9,8 +9,10 @@ import message_filters
 from mavros_msgs.msg import Altitude
 from sensor_msgs.msg import NavSatFix
 from geometry_msgs.msg import PoseStamped
+from interop.profiling import CallbackProfiler
+from interop.recording import TelemetryRecorder
+from interop.node import NodeNamespace, connect
 from requests.exceptions import ConnectionError, HTTPError, Timeout
-from interop import InteroperabilityClient, OfflineInteroperabilityClient
 
 
 def update_telemetry(navsat_msg, altitude_msg, pose_msg):
@@ -34,38 +36,49 @@ def update_telemetry(navsat_msg, altitude_msg, pose_msg):
         return
 
 
-if __name__ == "__main__":
-    # Initialize node.
-    rospy.init_node("telemetry")
+def create_recorder(ns):
+    """Creates the telemetry recorder to use offline, if enabled.
 
-    # Get server connection information.
-    offline = rospy.get_param("~offline")
-    if offline:
-        base_path = rospy.get_param("~base_path")
-        client = OfflineInteroperabilityClient(base_path)
-        rospy.logwarn("Running in OFFLINE mode")
-    else:
-        base_url = rospy.get_param("~base_url")
-        timeout = rospy.get_param("~timeout")
-        verify = rospy.get_param("~verify")
-        client = InteroperabilityClient.from_env(base_url, timeout, verify)
-
-    # Wait for server to be reachable, then login.
-    client.wait_for_server()
-    try:
-        client.login()
-    except Exception as e:
-        rospy.logfatal(e)
-        sys.exit(1)
+    Args:
+        ns: NodeNamespace to get parameters from.
+
+    Returns:
+        TelemetryRecorder, or None if recording is disabled or online.
+    """
+    if not ns.get_param("~offline", False):
+        return None
+
+    record_path = ns.get_param("~record_path", "")
+    if not record_path:
+        return None
+
+    max_size = float(ns.get_param("~record_max_size", 10.0))
+    backups = int(ns.get_param("~record_backups", 5))
+    recorder = TelemetryRecorder(record_path, int(max_size * 1024 * 1024),
+                                 backups)
+    rospy.on_shutdown(recorder.close)
+    rospy.loginfo("Recording telemetry to {}".format(record_path))
+    return recorder
+
+
+def start(interop_client, ns):
+    """Starts sending telemetry.
+
+    Args:
+        interop_client: Logged in interop client.
+        ns: NodeNamespace to get parameters from.
+    """
+    global client
+    client = interop_client
 
     # Get ROS parameters for synchronization queue size and time delay.
-    sync_queue = rospy.get_param("~sync_queue_size")
-    sync_delay = rospy.get_param("~max_sync_delay")
+    sync_queue = ns.get_param("~sync_queue_size")
+    sync_delay = ns.get_param("~max_sync_delay")
 
     # Get ROS parameters for subscribed topic names.
-    navsat_topic = rospy.get_param("~navsat_topic")
-    altitude_topic = rospy.get_param("~altitude_topic")
-    pose_topic = rospy.get_param("~pose_topic")
+    navsat_topic = ns.resolve(ns.get_param("~navsat_topic"))
+    altitude_topic = ns.resolve(ns.get_param("~altitude_topic"))
+    pose_topic = ns.resolve(ns.get_param("~pose_topic"))
 
     # Setup synchronized subscribers.
     subscribers = [
@@ -75,7 +88,25 @@ if __name__ == "__main__":
     ]
     synchronizer = message_filters.ApproximateTimeSynchronizer(
         subscribers, sync_queue, sync_delay)
-    synchronizer.registerCallback(update_telemetry)
+
+    # Profile the telemetry callback if enabled.
+    profiler = CallbackProfiler.from_params(ns)
+    synchronizer.registerCallback(profiler.wrap(update_telemetry))
+
+
+if __name__ == "__main__":
+    # Initialize node.
+    rospy.init_node("telemetry")
+
+    # Connect to the server, recording telemetry if enabled.
+    ns = NodeNamespace()
+    try:
+        client = connect(ns, create_recorder(ns))
+    except Exception as e:
+        rospy.logfatal(e)
+        sys.exit(1)
+
+    start(client, ns)
 
     # Spin forever.
     rospy.spin()
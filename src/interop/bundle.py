@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""Offline mission bundles.
+
+A bundle holds all the mission and obstacle information downloaded from the
+interop server in a single file, laid out as follows:
+
+    header | index | blobs
+
+The header is fixed size and holds the length of the index. The index is
+JSON, and holds the offset and length of every blob, relative to the end of
+the index. Each blob is either the JSON of a single mission or of the
+obstacles, or an optional ROS message in its binary serialization, cached for
+a given frame ID so that it does not need to be built from JSON again. The
+index also holds the type and MD5 sum of every cached message, so that
+messages cached before their definition changed are not misread.
+
+Bundles are memory-mapped when loaded, so that processes loading the same
+bundle share its pages, and only the missions that are accessed are parsed.
+"""
+
+import os
+import six
+import mmap
+import struct
+import json_codec
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+
+class Bundle(Mapping):
+
+    """Read-only memory-mapped bundle.
+
+    This is a mapping of mission IDs to mission dictionaries, each of which is
+    parsed when accessed.
+
+    Attributes:
+        path: Path to the bundle.
+        active: List of active mission IDs.
+    """
+
+    # File identification.
+    MAGIC = b"IOPB"
+    VERSION = 1
+
+    # Magic, version, reserved, index length.
+    HEADER = struct.Struct("<4sHHI")
+
+    def __init__(self, path):
+        """Loads a bundle.
+
+        Args:
+            path: Path to the bundle.
+
+        Raises:
+            IOError: On bundle not found.
+            ValueError: On invalid bundle.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < self.HEADER.size:
+            raise ValueError("Invalid bundle: {}".format(path))
+        magic, version, _, index_length = self.HEADER.unpack_from(self._mmap)
+        if magic != self.MAGIC:
+            raise ValueError("Invalid bundle: {}".format(path))
+        if version != self.VERSION:
+            raise ValueError("Unsupported bundle version: {}".format(version))
+
+        start = self.HEADER.size
+        index = json_codec.loads(self._mmap[start:start + index_length])
+        self._data_offset = start + index_length
+
+        self._missions = {
+            id: (offset, length)
+            for id, offset, length, _ in index["missions"]
+        }
+        self.active = [id for id, _, _, active in index["missions"] if active]
+        self._obstacles = index["obstacles"]
+        self._messages = {}
+        for entry in index.get("messages", []):
+            # Messages cached without their type and MD5 sum are ignored as
+            # they cannot be checked.
+            if len(entry) == 5:
+                key, msg_type, md5sum, offset, length = entry
+                self._messages[key] = (msg_type, md5sum, offset, length)
+
+    def _read(self, offset, length):
+        """Reads a blob.
+
+        Args:
+            offset: Offset of the blob relative to the end of the index.
+            length: Length of the blob.
+
+        Returns:
+            Bytes.
+        """
+        start = self._data_offset + offset
+        return self._mmap[start:start + length]
+
+    def _load(self, offset, length):
+        """Parses a JSON blob.
+
+        Args:
+            offset: Offset of the blob relative to the end of the index.
+            length: Length of the blob.
+
+        Returns:
+            Decoded object.
+        """
+        return json_codec.loads(self._read(offset, length))
+
+    def __getitem__(self, id):
+        """Parses the mission with the matching ID.
+
+        Args:
+            id: Mission ID.
+
+        Returns:
+            Mission dictionary.
+
+        Raises:
+            KeyError: On mission ID not found.
+        """
+        return self._load(*self._missions[id])
+
+    def __iter__(self):
+        return iter(self._missions)
+
+    def __len__(self):
+        return len(self._missions)
+
+    def obstacles(self):
+        """Parses the obstacles.
+
+        Returns:
+            Obstacles dictionary.
+        """
+        return self._load(*self._obstacles)
+
+    def message(self, key, msg_type):
+        """Deserializes a cached ROS message.
+
+        Args:
+            key: Message key, see message_key().
+            msg_type: ROS message class.
+
+        Returns:
+            ROS message, or None if it is not cached or was cached with a
+            different message definition.
+        """
+        if key not in self._messages:
+            return None
+
+        type_name, md5sum, offset, length = self._messages[key]
+        if type_name != msg_type._type or md5sum != msg_type._md5sum:
+            return None
+
+        return msg_type().deserialize(self._read(offset, length))
+
+    def close(self):
+        """Unmaps the bundle."""
+        self._mmap.close()
+
+
+def message_key(frame, *path):
+    """Builds the key of a cached ROS message.
+
+    Args:
+        frame: Frame ID the message was built for.
+        *path: Path of the message, e.g. ("missions", id, index).
+
+    Returns:
+        Message key.
+    """
+    return "/".join([frame] + [str(p) for p in path])
+
+
+def write_bundle(path, missions, obstacles, messages=None):
+    """Writes a bundle.
+
+    The bundle is written to a temporary file first, and then moved into place
+    so that processes never load a partially written bundle.
+
+    Args:
+        path: Path to write the bundle to.
+        missions: List of mission dictionaries.
+        obstacles: Obstacles dictionary.
+        messages: Optional dictionary of ROS messages to cache by key, see
+            message_key().
+    """
+    messages = messages or {}
+    keys = sorted(messages)
+
+    # Encode every mission, followed by the obstacles and the messages.
+    blobs = [json_codec.dumps(m).encode("utf-8") for m in missions]
+    blobs.append(json_codec.dumps(obstacles).encode("utf-8"))
+    for key in keys:
+        buff = six.BytesIO()
+        messages[key].serialize(buff)
+        blobs.append(buff.getvalue())
+
+    # Locate every blob as (offset, length).
+    entries = []
+    offset = 0
+    for blob in blobs:
+        entries.append((offset, len(blob)))
+        offset += len(blob)
+
+    n = len(missions)
+    index = {}
+    index["missions"] = [
+        [m["id"], o, l, m["active"]] for m, (o, l) in zip(missions, entries)
+    ]
+    index["obstacles"] = entries[n]
+    index["messages"] = [[k, messages[k]._type, messages[k]._md5sum, o, l]
+                         for k, (o, l) in zip(keys, entries[n + 1:])]
+    index = json_codec.dumps(index).encode("utf-8")
+    header = Bundle.HEADER.pack(Bundle.MAGIC, Bundle.VERSION, 0, len(index))
+
+    tmp_path = "{}.tmp".format(path)
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(index)
+        for blob in blobs:
+            f.write(blob)
+    os.rename(tmp_path, path)
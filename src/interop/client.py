@@ -5,9 +5,50 @@ import os
 import abc
 import six
 import json
+import time
 import rospy
+import bundle
 import requests
+import threading
+import json_codec
 import serializers
+from std_msgs.msg import Header
+from metrics import RequestMetrics
+from obstacles import MovingObstacleSimulator
+
+
+def _update_stamp(stamp, msg):
+    """Recursively updates the time stamp of all the headers in messages.
+
+    Args:
+        stamp: Time stamp to set all header stamps to.
+        msg: Any ROS message or list of ROS messages.
+    """
+    if isinstance(msg, (list, tuple)):
+        for m in msg:
+            _update_stamp(stamp, m)
+    elif isinstance(msg, Header):
+        msg.stamp = stamp
+    elif hasattr(msg, "__slots__"):
+        for slot in msg.__slots__:
+            _update_stamp(stamp, getattr(msg, slot))
+
+
+def _is_up_to_date(path, *sources):
+    """Checks whether a file was modified after the files it was built from.
+
+    Args:
+        path: Path to the file.
+        *sources: Paths to the files it was built from, ignored if missing.
+
+    Returns:
+        Whether the file is at least as recent as every existing source.
+    """
+    mtime = os.path.getmtime(path)
+    return all(
+        os.path.getmtime(source) <= mtime
+        for source in sources
+        if os.path.exists(source))
 
 
 @six.add_metaclass(abc.ABCMeta)
@@ -40,7 +81,8 @@ class BaseClient:
             lifetime: Lifetime of every Marker in seconds.
 
         Returns:
-            GeoCylinderArrayStamped of stationary obstacles.
+            Tuple of (GeoSphereArrayStamped, GeoCylinderArrayStamped)
+            corresponding to the moving and stationary obstacles.
 
         Raises:
             Timeout: On timeout.
@@ -97,11 +139,12 @@ class BaseClient:
             frame: Frame ID.
 
         Returns:
-            A tuple of (FlyZoneArray, GeoPolygonStamped, GeoObjectArray,
-            GeoPointStamped, GeoPointStamped, GeoPointStamped, GeoPointStamped)
-            corresponding to the flyzones, search grid, waypoints,
-            air drop position, off axis object location, the emergent object
-            location, the home position.
+            A mapping of mission IDs to tuples of (FlyZoneArray,
+            GeoPolygonStamped, WayPoints, GeoPointStamped, GeoPointStamped,
+            GeoPointStamped, GeoPointStamped) corresponding to the flyzones,
+            search grid, waypoints, air drop position, off axis object
+            location, the emergent object location, the home position.
+            Missions are only deserialized when first accessed.
 
         Raises:
             Timeout: On timeout.
@@ -266,10 +309,14 @@ class InteroperabilityClient(BaseClient):
 
     """InteroperabilityClient.
 
+    The client is thread-safe, so a single session can be shared by several
+    nodes hosted in the same process.
+
     Attributes:
         url: Base URL of the Interoperability server.
         session: Requests session.
         timeout: Timeout in seconds for individual requests.
+        metrics: RequestMetrics of every request sent.
     """
 
     # Endpoint paths.
@@ -302,6 +349,12 @@ class InteroperabilityClient(BaseClient):
         self.timeout = timeout
         self.url = url[:-1] if url.endswith('/') else url
         self.session = requests.Session()
+        self.metrics = RequestMetrics()
+
+        # Number of times the session was renewed, so that threads whose
+        # session expired at the same time only renew it once.
+        self._login_lock = threading.Lock()
+        self._logins = 0
 
         # Set up credentials for login.
         self.__credentials = {"username": username, "password": password}
@@ -345,27 +398,30 @@ class InteroperabilityClient(BaseClient):
             HTTPError: On request failure.
             ConnectionError: On connection failure.
         """
+        uri = uri if uri.startswith('/') else '/' + uri
+
         # Try until authenticated.
         response = requests.Response()
         while not rospy.is_shutdown():
             # Send request.
-            response = self.session.request(
-                method=method,
-                url=self.url + (uri if uri.startswith('/') else '/' + uri),
-                timeout=self.timeout,
-                verify=self.verify,
-                **kwargs)
+            logins = self._logins
+            response = self._send(method, uri, **kwargs)
 
             # Relogin if session expired, and try again.
             if response.status_code == requests.codes.FORBIDDEN:
-                rospy.logwarn("Session expired: reauthenticating...")
-
-                # Start a new session.
-                self.session.close()
-                self.session = requests.Session()
-
-                # Relogin.
-                self.login()
+                with self._login_lock:
+                    # Skip if another thread already renewed the session.
+                    if logins == self._logins:
+                        rospy.logwarn("Session expired: reauthenticating...")
+                        self.metrics.record_relogin()
+
+                        # Start a new session.
+                        self.session.close()
+                        self.session = requests.Session()
+
+                        # Relogin.
+                        self.login()
+                        self._logins += 1
                 continue
 
             message = self._get_response_log_message(method, uri, response)
@@ -383,6 +439,39 @@ class InteroperabilityClient(BaseClient):
 
         return response
 
+    def _send(self, method, uri, **kwargs):
+        """Sends a single request, and records its metrics.
+
+        Args:
+            method: HTTP method.
+            uri: Server URI to access, starting with a slash.
+            **kwargs: Arguments to HTTP Request.
+
+        Returns:
+            HTTP Response.
+
+        Raises:
+            Timeout: On timeout.
+            ConnectionError: On connection failure.
+        """
+        start = time.time()
+        try:
+            response = self.session.request(
+                method=method,
+                url=self.url + uri,
+                timeout=self.timeout,
+                verify=self.verify,
+                **kwargs)
+        except requests.RequestException:
+            self.metrics.record(method, uri, None, time.time() - start)
+            raise
+
+        duration = time.time() - start
+        body = response.request.body or b""
+        self.metrics.record(method, uri, response.status_code, duration,
+                            len(body), len(response.content))
+        return response
+
     def _get_response_log_message(self, method, uri, response):
         """Constructs a user-friendly log message.
 
@@ -500,12 +589,7 @@ class InteroperabilityClient(BaseClient):
         """
         method = "POST"
         uri = self.LOGIN_PATH
-        response = self.session.request(
-            method=method,
-            url=self.url + uri,
-            timeout=self.timeout,
-            verify=self.verify,
-            data=self.__credentials)
+        response = self._send(method, uri, data=self.__credentials)
         message = self._get_response_log_message(method, uri, response)
 
         try:
@@ -523,7 +607,8 @@ class InteroperabilityClient(BaseClient):
             lifetime: Lifetime of every Marker in seconds.
 
         Returns:
-            GeoCylinderArrayStamped of stationary obstacles.
+            Tuple of (GeoSphereArrayStamped, GeoCylinderArrayStamped)
+            corresponding to the moving and stationary obstacles.
 
         Raises:
             Timeout: On timeout.
@@ -533,7 +618,7 @@ class InteroperabilityClient(BaseClient):
         """
         response = self._get(self.OBSTACLES_PATH)
         return serializers.ObstaclesDeserializer.from_dict(
-            response.json(), frame, lifetime)
+            json_codec.loads(response.content), frame, lifetime)
 
     def post_telemetry(self, navsat_msg, altitude_msg, pose_msg):
         """Uploads telemetry information to Interoperability server.
@@ -573,7 +658,7 @@ class InteroperabilityClient(BaseClient):
             LookupError: On no active missions found.
         """
         response = self._get(self.MISSIONS_PATH)
-        for m in response.json():
+        for m in json_codec.loads(response.content):
             if m["active"]:
                 return serializers.MissionDeserializer.from_dict(m, frame)
         raise LookupError("No active missions found")
@@ -585,11 +670,12 @@ class InteroperabilityClient(BaseClient):
             frame: Frame ID.
 
         Returns:
-            A tuple of (FlyZoneArray, GeoPolygonStamped, GeoObjectArray,
-            GeoPointStamped, GeoPointStamped, GeoPointStamped, GeoPointStamped)
-            corresponding to the flyzones, search grid, waypoints,
-            air drop position, off axis object location, the emergent object
-            location, the home position.
+            A mapping of mission IDs to tuples of (FlyZoneArray,
+            GeoPolygonStamped, WayPoints, GeoPointStamped, GeoPointStamped,
+            GeoPointStamped, GeoPointStamped) corresponding to the flyzones,
+            search grid, waypoints, air drop position, off axis object
+            location, the emergent object location, the home position.
+            Missions are only deserialized when first accessed.
 
         Raises:
             Timeout: On timeout.
@@ -598,11 +684,8 @@ class InteroperabilityClient(BaseClient):
             ValueError: On JSON decoding failure.
         """
         response = self._get(self.MISSIONS_PATH)
-        missions = {
-            m["id"]: serializers.MissionDeserializer.from_dict(m, frame)
-            for m in response.json()
-        }
-        return missions
+        missions = {m["id"]: m for m in json_codec.loads(response.content)}
+        return serializers.MissionMapping(missions, frame)
 
     def get_mission(self, id, frame):
         """Returns mission with the matching ID.
@@ -626,7 +709,7 @@ class InteroperabilityClient(BaseClient):
         """
         response = self._get(self.MISSIONS_FORMAT_PATH.format(id))
         mission = serializers.MissionDeserializer.from_dict(
-            response.json(), frame)
+            json_codec.loads(response.content), frame)
         return mission
 
     def get_all_objects(self):
@@ -642,7 +725,7 @@ class InteroperabilityClient(BaseClient):
             ValueError: On JSON decoding failure.
         """
         response = self._get(self.OBJECTS_PATH)
-        objects = {t["id"]: t for t in response.json()}
+        objects = {t["id"]: t for t in json_codec.loads(response.content)}
         return objects
 
     def get_object(self, id):
@@ -661,7 +744,7 @@ class InteroperabilityClient(BaseClient):
             ValueError: On JSON decoding failure.
         """
         response = self._get(self.OBJECTS_FORMAT_PATH.format(id))
-        return response.json()
+        return json_codec.loads(response.content)
 
     def post_object(self, json_object):
         """Uploads new object for submission.
@@ -678,7 +761,7 @@ class InteroperabilityClient(BaseClient):
             ConnectionError: On connection failure.
         """
         response = self._post(self.OBJECTS_PATH, data=json_object)
-        return response.json()["id"]
+        return json_codec.loads(response.content)["id"]
 
     def put_object(self, id, json_object):
         """Updates object information.
@@ -754,24 +837,45 @@ class InteroperabilityClient(BaseClient):
         """
         self._delete(self.OBJECTS_IMAGE_FORMAT_PATH.format(id))
 
-    def download_mission_info(self, path):
+    def download_mission_info(self, path, frames=()):
         """Downloads all mission information in a format readable by the
         OfflineInteroperabilityClient.
 
         Args:
             path: Target download path.
+            frames: Frame IDs to also cache prebuilt ROS messages for, so that
+                they do not need to be built from JSON when running offline.
         """
-        missions = self._get(self.MISSIONS_PATH)
+        missions = json_codec.loads(self._get(self.MISSIONS_PATH).content)
         mission_path = os.path.join(path,
                                     OfflineInteroperabilityClient.MISSIONS_PATH)
         with open(mission_path, "wb") as f:
-            f.write(json.dumps(missions.json(), indent=4, sort_keys=True))
+            f.write(json.dumps(missions, indent=4, sort_keys=True))
 
-        obstacles = self._get(self.OBSTACLES_PATH)
+        obstacles = json_codec.loads(self._get(self.OBSTACLES_PATH).content)
         obstacles_path = os.path.join(
             path, OfflineInteroperabilityClient.OBSTACLES_PATH)
         with open(obstacles_path, "wb") as f:
-            f.write(json.dumps(obstacles.json(), indent=4, sort_keys=True))
+            f.write(json.dumps(obstacles, indent=4, sort_keys=True))
+
+        # Prebuild the messages for every frame.
+        messages = {}
+        for frame in frames:
+            for m in missions:
+                mission = serializers.MissionDeserializer.from_dict(m, frame)
+                for i, msg in enumerate(mission):
+                    key = bundle.message_key(frame, "missions", m["id"], i)
+                    messages[key] = msg
+
+            obstacle_msgs = serializers.ObstaclesDeserializer.from_dict(
+                obstacles, frame, 0.0)
+            for i, msg in enumerate(obstacle_msgs):
+                messages[bundle.message_key(frame, "obstacles", i)] = msg
+
+        # Also bundle everything up for faster loading.
+        bundle_path = os.path.join(path,
+                                   OfflineInteroperabilityClient.BUNDLE_PATH)
+        bundle.write_bundle(bundle_path, missions, obstacles, messages)
 
 
 class OfflineInteroperabilityClient(BaseClient):
@@ -780,30 +884,64 @@ class OfflineInteroperabilityClient(BaseClient):
 
     Attributes:
         path: Path to root directory that stores all mission information.
+        recorder: TelemetryRecorder to record telemetry to, or None.
     """
 
     # File paths.
     MISSIONS_PATH = "missions.json"
     OBSTACLES_PATH = "obstacles.json"
+    BUNDLE_PATH = "mission.bundle"
+    MOVING_OBSTACLES_PATH = "moving_obstacles.json"
 
-    def __init__(self, path, *args, **kwargs):
+    def __init__(self, path, recorder=None, *args, **kwargs):
         """Initializes an OfflineInteroperabilityClient.
 
+        The mission information is loaded from the bundle if there is one that
+        is not older than the JSON files, and from the JSON files otherwise.
+        Moving obstacles are simulated from their waypoints if there is a
+        moving obstacles file.
+
         Args:
             path: Path to root directory that stores all mission information.
+            recorder: Optional TelemetryRecorder to record telemetry to.
             *args: Additional positional arguments, ignored.
             **kwargs: Additional key-word arguments, ignored.
 
         Raises:
             IOError: On missions or obstacles files not found.
             JSONDecodeError: On JSON deserialization error.
+            ValueError: On invalid bundle.
         """
         # Verify paths.
         self.path = path
-        missions_path = os.path.join(path, self.MISSIONS_PATH)
-        obstacles_path = os.path.join(path, self.OBSTACLES_PATH)
+        self.recorder = recorder
         if not os.path.isdir(path):
             raise IOError("No such directory: {}".format(path))
+
+        # Load moving obstacle waypoints to simulate, if any.
+        self._simulator = None
+        moving_obstacles_path = os.path.join(path, self.MOVING_OBSTACLES_PATH)
+        if os.path.exists(moving_obstacles_path):
+            with open(moving_obstacles_path, "rb") as f:
+                self._simulator = MovingObstacleSimulator(
+                    json_codec.loads(f.read()))
+
+        # Prefer the bundle, as missions are only parsed when accessed, unless
+        # the JSON files were edited since it was written.
+        bundle_path = os.path.join(path, self.BUNDLE_PATH)
+        missions_path = os.path.join(path, self.MISSIONS_PATH)
+        obstacles_path = os.path.join(path, self.OBSTACLES_PATH)
+        if os.path.exists(bundle_path):
+            if _is_up_to_date(bundle_path, missions_path, obstacles_path):
+                self._bundle = bundle.Bundle(bundle_path)
+                self._missions = self._bundle
+                self._active = self._bundle.active
+                self._obstacles = self._bundle.obstacles()
+                return
+
+            rospy.logwarn("{} is older than the JSON files, ignoring it".format(
+                bundle_path))
+
         if not os.path.exists(missions_path):
             raise IOError("No such file: {}".format(missions_path))
         if not os.path.exists(obstacles_path):
@@ -811,9 +949,52 @@ class OfflineInteroperabilityClient(BaseClient):
 
         # Load mission information.
         with open(missions_path, "rb") as f:
-            self._missions = json.loads(f.read())
+            missions = json_codec.loads(f.read())
         with open(obstacles_path, "rb") as f:
-            self._obstacles = json.loads(f.read())
+            self._obstacles = json_codec.loads(f.read())
+        self._bundle = None
+        self._missions = {m["id"]: m for m in missions}
+        self._active = [m["id"] for m in missions if m["active"]]
+
+    def _get_cached(self, msg_types, frame, *path):
+        """Returns prebuilt ROS messages from the bundle.
+
+        The messages' time stamps are updated to the current time.
+
+        Args:
+            msg_types: Types of the messages.
+            frame: Frame ID the messages were built for.
+            *path: Path of the messages in the bundle.
+
+        Returns:
+            Tuple of ROS messages, or None if they were not cached.
+        """
+        if self._bundle is None:
+            return None
+
+        msgs = []
+        for i, msg_type in enumerate(msg_types):
+            key = bundle.message_key(frame, *(path + (i,)))
+            msg = self._bundle.message(key, msg_type)
+            if msg is None:
+                return None
+            msgs.append(msg)
+
+        _update_stamp(rospy.get_rostime(), msgs)
+        return tuple(msgs)
+
+    def _get_cached_mission(self, id, frame):
+        """Returns a prebuilt mission from the bundle.
+
+        Args:
+            id: Mission ID.
+            frame: Frame ID.
+
+        Returns:
+            Tuple of mission messages, or None if they were not cached.
+        """
+        return self._get_cached(serializers.MissionDeserializer.TYPES, frame,
+                                "missions", id)
 
     def wait_for_server(self):
         """Waits until interoperability server is reachable.
@@ -837,23 +1018,41 @@ class OfflineInteroperabilityClient(BaseClient):
             lifetime: Lifetime of every Marker in seconds.
 
         Returns:
-            GeoCylinderArrayStamped of stationary obstacles.
+            Tuple of (GeoSphereArrayStamped, GeoCylinderArrayStamped)
+            corresponding to the moving and stationary obstacles.
         """
-        return serializers.ObstaclesDeserializer.from_dict(
-            self._obstacles, frame, lifetime)
+        obstacles = self._get_cached(serializers.ObstaclesDeserializer.TYPES,
+                                     frame, "obstacles")
+        if obstacles is None:
+            obstacles = serializers.ObstaclesDeserializer.from_dict(
+                self._obstacles, frame, lifetime)
+        moving, stationary = obstacles
+
+        # Replace the moving obstacles with simulated ones, if any.
+        if self._simulator is not None:
+            t = moving.header.stamp.to_sec()
+            data = {"moving_obstacles": self._simulator.moving_obstacles(t)}
+            simulated, _ = serializers.ObstaclesDeserializer.from_dict(
+                data, frame, lifetime)
+            moving.spheres = simulated.spheres
+
+        return moving, stationary
 
     def post_telemetry(self, navsat_msg, altitude_msg, pose_msg):
         """Uploads telemetry information to Interoperability server.
 
-        Note: This does nothing as the server is not connected.
+        Note: The server is not connected, so this only records the telemetry
+        if a recorder was given.
 
         Args:
             navsat_msg: sensor_msgs/NavSatFix message.
             altitude_msg: mavros_msgs/Altitude message.
             pose_msg: geometry_msgs/PoseStamped message in ENU.
         """
-        serializers.TelemetrySerializer.from_msg(navsat_msg, altitude_msg,
-                                                 pose_msg)
+        dict_telem = serializers.TelemetrySerializer.from_msg(
+            navsat_msg, altitude_msg, pose_msg)
+        if self.recorder is not None:
+            self.recorder.record(dict_telem, navsat_msg.header.stamp.to_sec())
 
     def get_active_mission(self, frame):
         """Gets active mission.
@@ -871,11 +1070,10 @@ class OfflineInteroperabilityClient(BaseClient):
         Raises:
             LookupError: On no active missions found.
         """
-        for m in self._missions:
-            if m["active"]:
-                return serializers.MissionDeserializer.from_dict(m, frame)
+        if not self._active:
+            raise LookupError("No active missions found")
 
-        raise LookupError("No active missions found")
+        return self.get_mission(self._active[0], frame)
 
     def get_all_missions(self, frame):
         """Gets all missions.
@@ -884,16 +1082,16 @@ class OfflineInteroperabilityClient(BaseClient):
             frame: Frame ID.
 
         Returns:
-            A tuple of (FlyZoneArray, GeoPolygonStamped, GeoObjectArray,
-            GeoPointStamped, GeoPointStamped, GeoPointStamped, GeoPointStamped)
-            corresponding to the flyzones, search grid, waypoints,
-            air drop position, off axis object location, the emergent object
-            location, the home position.
+            A mapping of mission IDs to tuples of (FlyZoneArray,
+            GeoPolygonStamped, WayPoints, GeoPointStamped, GeoPointStamped,
+            GeoPointStamped, GeoPointStamped) corresponding to the flyzones,
+            search grid, waypoints, air drop position, off axis object
+            location, the emergent object location, the home position.
+            Missions are only deserialized when first accessed.
         """
-        return {
-            m["id"]: serializers.MissionDeserializer.from_dict(m, frame)
-            for m in self._missions
-        }
+        return serializers.MissionMapping(
+            self._missions, frame,
+            lambda id: self._get_cached_mission(id, frame))
 
     def get_mission(self, id, frame):
         """Returns mission with the matching ID.
@@ -912,11 +1110,15 @@ class OfflineInteroperabilityClient(BaseClient):
         Raises:
             LookupError: On mission ID not found.
         """
-        for m in self._missions:
-            if m["id"] == id:
-                return serializers.MissionDeserializer.from_dict(m, frame)
+        if id not in self._missions:
+            raise LookupError("Mission {:d} not found".format(id))
+
+        mission = self._get_cached_mission(id, frame)
+        if mission is not None:
+            return mission
 
-        raise LookupError("Mission {:d} not found".format(id))
+        return serializers.MissionDeserializer.from_dict(
+            self._missions[id], frame)
 
     def get_all_objects(self):
         """Returns first 100 submitted objects.
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""ROS diagnostics."""
+
+import rospy
+from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
+
+
+def _format_latency(seconds):
+    """Formats a latency for display.
+
+    Args:
+        seconds: Latency in seconds, or None.
+
+    Returns:
+        Latency in milliseconds as a string.
+    """
+    if seconds is None:
+        return ""
+    return "{:.1f}".format(seconds * 1e3)
+
+
+def _format_duration(seconds):
+    """Formats a duration for display.
+
+    Args:
+        seconds: Duration in seconds, or None.
+
+    Returns:
+        Duration in seconds as a string.
+    """
+    if seconds is None:
+        return ""
+    return "{:.3f}".format(seconds)
+
+
+class BaseDiagnostics(object):
+
+    """Base class of diagnostics published periodically."""
+
+    def __init__(self, name, hardware_id, topic="/diagnostics"):
+        """Constructs a BaseDiagnostics.
+
+        Args:
+            name: Prefix of every status name, e.g. the node's name.
+            hardware_id: Hardware ID of every status, e.g. the server's URL.
+            topic: Topic to publish to.
+        """
+        self.name = name
+        self.hardware_id = hardware_id
+        self.pub = rospy.Publisher(topic, DiagnosticArray, queue_size=1)
+
+    def _status(self, name):
+        """Builds an empty status.
+
+        Args:
+            name: Status name, prefixed with the diagnostics' name.
+
+        Returns:
+            DiagnosticStatus.
+        """
+        status = DiagnosticStatus()
+        status.name = "{}: {}".format(self.name, name)
+        status.hardware_id = self.hardware_id
+        return status
+
+    def statuses(self):
+        """Builds every status.
+
+        Returns:
+            List of DiagnosticStatus.
+        """
+        raise NotImplementedError()
+
+    def to_msg(self):
+        """Builds the diagnostics.
+
+        Returns:
+            DiagnosticArray.
+        """
+        msg = DiagnosticArray()
+        msg.header.stamp = rospy.get_rostime()
+        msg.status = self.statuses()
+        return msg
+
+    def publish(self, timer_event=None):
+        """Publishes the diagnostics.
+
+        Args:
+            timer_event: ROS TimerEvent, unused.
+        """
+        self.pub.publish(self.to_msg())
+
+
+class RequestDiagnostics(BaseDiagnostics):
+
+    """Publishes the request metrics of an InteroperabilityClient as
+    diagnostics, with one status per endpoint.
+
+    The level of each endpoint is based on its last response: OK on success,
+    WARN on client errors, and ERROR on server errors or no response.
+    """
+
+    def __init__(self, metrics, name, hardware_id, topic="/diagnostics"):
+        """Constructs a RequestDiagnostics.
+
+        Args:
+            metrics: RequestMetrics to publish.
+            name: Prefix of every status name, e.g. the node's name.
+            hardware_id: Hardware ID of every status, e.g. the server's URL.
+            topic: Topic to publish to.
+        """
+        super(RequestDiagnostics, self).__init__(name, hardware_id, topic)
+        self.metrics = metrics
+
+    def _endpoint_status(self, endpoint, metrics):
+        """Builds the status of an endpoint.
+
+        Args:
+            endpoint: Endpoint name.
+            metrics: EndpointMetrics of the endpoint.
+
+        Returns:
+            DiagnosticStatus.
+        """
+        status = self._status(endpoint)
+
+        if metrics.last_status is None:
+            status.level = DiagnosticStatus.ERROR
+            status.message = "No response"
+        elif metrics.last_status >= 500:
+            status.level = DiagnosticStatus.ERROR
+            status.message = "Server error {:d}".format(metrics.last_status)
+        elif metrics.last_status >= 400:
+            status.level = DiagnosticStatus.WARN
+            status.message = "Client error {:d}".format(metrics.last_status)
+        else:
+            status.level = DiagnosticStatus.OK
+            status.message = "OK"
+
+        values = [
+            ("requests", metrics.requests),
+            ("failures", metrics.failures),
+            ("bytes out", metrics.bytes_out),
+            ("bytes in", metrics.bytes_in),
+            ("mean latency (ms)", _format_latency(metrics.mean_latency())),
+            ("p50 latency (ms)", _format_latency(metrics.percentile(50))),
+            ("p90 latency (ms)", _format_latency(metrics.percentile(90))),
+            ("p99 latency (ms)", _format_latency(metrics.percentile(99))),
+        ]
+        for code, count in sorted(metrics.statuses.items()):
+            values.append(("status {:d}".format(code), count))
+        status.values = [KeyValue(key, str(value)) for key, value in values]
+
+        return status
+
+    def statuses(self):
+        """Builds the status of the session and of every endpoint.
+
+        Returns:
+            List of DiagnosticStatus.
+        """
+        relogins, endpoints = self.metrics.snapshot()
+
+        # Summarize the session.
+        requests = sum(metrics.requests for metrics in endpoints.values())
+        session = self._status("session")
+        session.level = DiagnosticStatus.OK
+        session.message = "OK"
+        session.values = [
+            KeyValue("relogins", str(relogins)),
+            KeyValue("requests", str(requests)),
+        ]
+
+        return [session] + [
+            self._endpoint_status(endpoint, metrics)
+            for endpoint, metrics in sorted(endpoints.items())
+        ]
+
+
+class ObjectsDiagnostics(BaseDiagnostics):
+
+    """Publishes the backlog of an ObjectsDirectory left to sync to the
+    interop server as diagnostics.
+
+    The level is ERROR if any operation failed during the last sync, WARN if
+    the oldest change left to sync is older than a maximum age, and OK
+    otherwise.
+    """
+
+    def __init__(self,
+                 objects_dir,
+                 name,
+                 hardware_id,
+                 max_age,
+                 topic="/diagnostics"):
+        """Constructs an ObjectsDiagnostics.
+
+        Args:
+            objects_dir: ObjectsDirectory to publish the backlog of.
+            name: Prefix of every status name, e.g. the node's name.
+            hardware_id: Hardware ID of every status, e.g. the server's URL.
+            max_age: Maximum age of a change left to sync in seconds before
+                warning that syncing is falling behind.
+            topic: Topic to publish to.
+        """
+        super(ObjectsDiagnostics, self).__init__(name, hardware_id, topic)
+        self.objects_dir = objects_dir
+        self.max_age = max_age
+
+    def statuses(self):
+        """Builds the status of the sync backlog.
+
+        Returns:
+            List of DiagnosticStatus.
+        """
+        backlog = self.objects_dir.backlog()
+        age = backlog["oldest_pending_age"]
+        failures = self.objects_dir.last_sync_failures
+
+        status = self._status("objects sync")
+        if failures:
+            status.level = DiagnosticStatus.ERROR
+            status.message = "{:d} failures in last sync".format(failures)
+        elif age is not None and age > self.max_age:
+            status.level = DiagnosticStatus.WARN
+            status.message = "Falling behind"
+        else:
+            status.level = DiagnosticStatus.OK
+            status.message = "OK"
+
+        values = [
+            ("objects to add", backlog["adding"]),
+            ("objects to update", backlog["updating"]),
+            ("objects to delete", backlog["deleting"]),
+            ("images to set", backlog["images_setting"]),
+            ("images to delete", backlog["images_deleting"]),
+            ("oldest pending age (s)", _format_duration(age)),
+            ("last sync duration (s)",
+             _format_duration(self.objects_dir.last_sync_duration)),
+            ("last sync failures", failures),
+            ("total failures", self.objects_dir.sync_failures),
+        ]
+        status.values = [KeyValue(key, str(value)) for key, value in values]
+
+        return [status]
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""JSON codec.
+
+Encodes and decodes JSON with ujson if it is installed, and falls back to the
+standard library's json module otherwise.
+"""
+
+import json
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+if ujson is not None:
+    # Name of the JSON library in use.
+    NAME = "ujson"
+
+    # Older releases parse doubles imprecisely unless asked not to, which
+    # changes latitudes and longitudes. Newer ones always parse them precisely,
+    # and do not take the argument.
+    try:
+        ujson.loads("0.0", precise_float=True)
+        _LOADS_KWARGS = {"precise_float": True}
+    except TypeError:
+        _LOADS_KWARGS = {}
+
+    def dumps(obj):
+        """Encodes an object as JSON.
+
+        Args:
+            obj: Object to encode.
+
+        Returns:
+            JSON string.
+        """
+        # Keep enough digits to preserve latitudes and longitudes.
+        return ujson.dumps(obj, double_precision=15)
+
+    def loads(s):
+        """Decodes a JSON string.
+
+        Args:
+            s: JSON string.
+
+        Returns:
+            Decoded object.
+
+        Raises:
+            ValueError: On JSON decoding failure.
+        """
+        return ujson.loads(s, **_LOADS_KWARGS)
+else:
+    # Name of the JSON library in use.
+    NAME = "json"
+
+    def dumps(obj):
+        """Encodes an object as JSON.
+
+        Args:
+            obj: Object to encode.
+
+        Returns:
+            JSON string.
+        """
+        return json.dumps(obj)
+
+    def loads(s):
+        """Decodes a JSON string.
+
+        Args:
+            s: JSON string.
+
+        Returns:
+            Decoded object.
+
+        Raises:
+            ValueError: On JSON decoding failure.
+        """
+        return json.loads(s)
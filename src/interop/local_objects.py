@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
 
 import os
-import json
+import time
 import rospy
 import os.path
 import threading
+import json_codec
 import serializers
 from cv_bridge import CvBridgeError
 from requests.exceptions import ConnectionError, HTTPError, Timeout
@@ -59,6 +60,10 @@ class Object(object):
         self._image_needs_setting = False
         self._image_needs_deleting = False
 
+        # Time since which there have been changes to sync, or None if there
+        # is nothing to sync.
+        self.pending_since = None
+
         filename = str(self.file_id) + ".json"
         # self.object_path may become None when object is deleted locally.
         self.object_path = os.path.join(self.objects_dir, filename)
@@ -81,6 +86,7 @@ class Object(object):
     @needs_adding.setter
     def needs_adding(self, value):
         self._needs_adding = value
+        self._update_pending_since()
 
     @property
     def needs_updating(self):
@@ -99,6 +105,7 @@ class Object(object):
                 self._needs_updating = True
         else:
             self._needs_updating = False
+        self._update_pending_since()
 
     @property
     def needs_deleting(self):
@@ -126,6 +133,7 @@ class Object(object):
             self.image_needs_deleting = False
         else:
             self._needs_deleting = False
+        self._update_pending_since()
 
     @property
     def image_needs_setting(self):
@@ -138,6 +146,7 @@ class Object(object):
             self._image_needs_setting = False
         else:
             self._image_needs_setting = value
+        self._update_pending_since()
 
     @property
     def image_needs_deleting(self):
@@ -156,6 +165,20 @@ class Object(object):
                 self._image_needs_deleting = True
         else:
             self._image_needs_deleting = False
+        self._update_pending_since()
+
+    def is_pending(self):
+        """Returns whether there are changes to sync to the interop server."""
+        return (self._needs_adding or self._needs_updating or
+                self._needs_deleting or self._image_needs_setting or
+                self._image_needs_deleting)
+
+    def _update_pending_since(self):
+        """Records since when there have been changes to sync."""
+        if not self.is_pending():
+            self.pending_since = None
+        elif self.pending_since is None:
+            self.pending_since = time.time()
 
     def update(self, data):
         """Update this object.
@@ -304,7 +327,13 @@ class Object(object):
                 return png_image
 
     def sync(self):
-        """Syncs this object and its image to the interop server."""
+        """Syncs this object and its image to the interop server.
+
+        Returns:
+            int: Number of operations that failed.
+        """
+        failures = 0
+
         with self.lock:
             # TARGET FILE
             if self.needs_adding:
@@ -312,14 +341,17 @@ class Object(object):
                     object_ = self.get()
                 except IOError as e:
                     rospy.logerr(e)
+                    failures += 1
                 else:
                     try:
                         # Post object and record the interop_id.
                         self.interop_id = self.client.post_object(object_)
                     except (ConnectionError, Timeout) as e:
                         rospy.logwarn(e)
+                        failures += 1
                     except (ValueError, HTTPError) as e:
                         rospy.logerr(e)
+                        failures += 1
                     else:
                         # No longer needs adding.
                         self.needs_adding = False
@@ -330,13 +362,16 @@ class Object(object):
                     object_ = self.get()
                 except IOError as e:
                     rospy.logerr(e)
+                    failures += 1
                 else:
                     try:
                         self.client.put_object(self.interop_id, object_)
                     except (ConnectionError, Timeout) as e:
                         rospy.logwarn(e)
+                        failures += 1
                     except (ValueError, HTTPError) as e:
                         rospy.logerr(e)
+                        failures += 1
                     else:
                         self.needs_updating = False
 
@@ -345,8 +380,10 @@ class Object(object):
                     self.client.delete_object(self.interop_id)
                 except (ConnectionError, Timeout) as e:
                     rospy.logwarn(e)
+                    failures += 1
                 except (ValueError, HTTPError) as e:
                     rospy.logerr(e)
+                    failures += 1
                 else:
                     self.interop_id = None
                     self.image_is_on_server = False
@@ -358,13 +395,16 @@ class Object(object):
                     image = self.get_image()
                 except IOError as e:
                     rospy.logerr(e)
+                    failures += 1
                 else:
                     try:
                         self.client.post_object_image(self.interop_id, image)
                     except (ConnectionError, Timeout) as e:
                         rospy.logwarn(e)
+                        failures += 1
                     except (CvBridgeError, HTTPError) as e:
                         rospy.logerr(e)
+                        failures += 1
                     else:
                         self.image_is_on_server = True
                         self.image_needs_setting = False
@@ -375,12 +415,16 @@ class Object(object):
                     self.client.delete_object_image(self.interop_id)
                 except (ConnectionError, Timeout) as e:
                     rospy.logwarn(e)
+                    failures += 1
                 except (CvBridgeError, HTTPError) as e:
                     rospy.logerr(e)
+                    failures += 1
                 else:
                     self.image_is_on_server = False
                     self.image_needs_deleting = False
 
+        return failures
+
     def can_be_forgotten(self):
         """When an object is removed locally and on the interop server, it
         no longer has any use. References to an object may still exist elsewhere
@@ -396,9 +440,7 @@ class Object(object):
                 return False
 
             # If there are still things to be done on the interop server.
-            if (self.needs_adding or self.needs_updating or
-                    self.needs_deleting or self.image_needs_setting or
-                    self.image_needs_deleting):
+            if self.is_pending():
                 return False
 
             # Otherwise, the object is useless and all references can be
@@ -436,6 +478,11 @@ class ObjectsDirectory(object):
         # {file_id (int): object (Object)}
         self.objects = {}
 
+        # Statistics of the sync passes.
+        self.last_sync_duration = None
+        self.last_sync_failures = 0
+        self.sync_failures = 0
+
     def load_all_remote_objects(self):
         """Loads all objects stored remotely to sync up state on startup."""
         if self.offline:
@@ -444,7 +491,7 @@ class ObjectsDirectory(object):
         remote_objects = self.client.get_all_objects()
         rospy.loginfo("Found %d remote objects", len(remote_objects))
         for object_id, object_ in remote_objects.iteritems():
-            json_object = json.dumps(object_)
+            json_object = json_codec.dumps(object_)
             file_id = self.add_object(json_object, object_id)
             try:
                 img = self.client.get_object_image(object_id)
@@ -496,6 +543,35 @@ class ObjectsDirectory(object):
 
         return file_id
 
+    def add_objects(self, data):
+        """Adds several objects under a single directory lock acquisition.
+
+        Args:
+            data (list): The object data (str) of every object to add.
+
+        Returns:
+            list: The file_id (int) of each added object in the same order, or
+                None for every object that could not be added.
+        """
+        file_ids = []
+
+        with self.lock:
+            for object_data in data:
+                file_id = self.file_id + 1
+                try:
+                    object_ = Object(self.path, file_id, object_data,
+                                     self.client)
+                except IOError as e:
+                    rospy.logerr("Could not add object: {}".format(e))
+                    file_ids.append(None)
+                    continue
+
+                self.objects[file_id] = object_
+                self.file_id = file_id
+                file_ids.append(file_id)
+
+        return file_ids
+
     def update_object(self, file_id, data):
         """Updates an existing object.
 
@@ -513,6 +589,32 @@ class ObjectsDirectory(object):
 
         object_.update(data)
 
+    def update_objects(self, updates):
+        """Updates several existing objects under a single directory lock
+        acquisition.
+
+        Args:
+            updates (list): (file_id (int), data (str)) tuples of every object
+                to update.
+
+        Returns:
+            list: Whether each object was updated successfully, in the same
+                order.
+        """
+        succeeded = []
+
+        with self.lock:
+            for file_id, data in updates:
+                try:
+                    self.objects[file_id].update(data)
+                except (KeyError, IOError) as e:
+                    rospy.logerr("Could not update object: {}".format(e))
+                    succeeded.append(False)
+                else:
+                    succeeded.append(True)
+
+        return succeeded
+
     def delete_object(self, file_id):
         """Deletes an existing object.
 
@@ -530,6 +632,31 @@ class ObjectsDirectory(object):
 
         object_.delete()
 
+    def delete_objects(self, file_ids):
+        """Deletes several existing objects under a single directory lock
+        acquisition.
+
+        Args:
+            file_ids (list): The file ids (int) of the objects to delete.
+
+        Returns:
+            list: Whether each object was deleted successfully, in the same
+                order.
+        """
+        succeeded = []
+
+        with self.lock:
+            for file_id in file_ids:
+                try:
+                    self.objects[file_id].delete()
+                except (KeyError, IOError, OSError) as e:
+                    rospy.logerr("Could not delete object: {}".format(e))
+                    succeeded.append(False)
+                else:
+                    succeeded.append(True)
+
+        return succeeded
+
     def get_object(self, file_id):
         """Returns an object as a str.
 
@@ -630,11 +757,54 @@ class ObjectsDirectory(object):
         with self.lock:
             # Sync all objects.
             if not self.offline:
-                for object_ in self.objects.itervalues():
-                    object_.sync()
+                start = time.time()
+                failures = sum(
+                    object_.sync() for object_ in self.objects.itervalues())
+                self.last_sync_duration = time.time() - start
+                self.last_sync_failures = failures
+                self.sync_failures += failures
 
             # Delete unused objects from the objects dictionary.
             for file_id in list(self.objects):
                 object_ = self.objects[file_id]
                 if object_.can_be_forgotten():
                     del self.objects[file_id]
+
+    def backlog(self):
+        """Summarizes the changes left to sync to the interop server.
+
+        This does not wait for a sync in progress to complete, so the counts
+        may be slightly out of date.
+
+        Returns:
+            dict: Number of objects that need adding, updating and deleting,
+                and of images that need setting and deleting, as well as the
+                time in seconds since the oldest change to sync was made, or
+                None if there is nothing to sync.
+        """
+        backlog = {
+            "adding": 0,
+            "updating": 0,
+            "deleting": 0,
+            "images_setting": 0,
+            "images_deleting": 0,
+            "oldest_pending_age": None
+        }
+
+        oldest = None
+        for object_ in list(self.objects.values()):
+            backlog["adding"] += object_.needs_adding
+            backlog["updating"] += object_.needs_updating
+            backlog["deleting"] += object_.needs_deleting
+            backlog["images_setting"] += object_.image_needs_setting
+            backlog["images_deleting"] += object_.image_needs_deleting
+
+            pending_since = object_.pending_since
+            if pending_since is not None and (oldest is None or
+                                              pending_since < oldest):
+                oldest = pending_since
+
+        if oldest is not None:
+            backlog["oldest_pending_age"] = time.time() - oldest
+
+        return backlog
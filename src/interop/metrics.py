@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""Interoperability request metrics."""
+
+import re
+import bisect
+import threading
+
+# Upper bounds of the latency histogram buckets in seconds.
+LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0,
+                   2.0, 5.0)
+
+
+class EndpointMetrics(object):
+
+    """Metrics of the requests sent to a single endpoint.
+
+    Attributes:
+        requests: Number of requests sent.
+        failures: Number of requests that got no response.
+        statuses: Dictionary of status codes to number of responses.
+        last_status: Status code of the last response, or None if the last
+            request got no response.
+        bytes_out: Number of request body bytes sent.
+        bytes_in: Number of response body bytes received.
+        total_time: Total time spent on requests in seconds.
+        histogram: Number of requests per latency bucket, with a last bucket
+            for everything slower than the slowest bucket.
+    """
+
+    __slots__ = ("requests", "failures", "statuses", "last_status", "bytes_out",
+                 "bytes_in", "total_time", "histogram")
+
+    def __init__(self):
+        """Constructs an empty EndpointMetrics."""
+        self.requests = 0
+        self.failures = 0
+        self.statuses = {}
+        self.last_status = None
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.total_time = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, status, duration, bytes_out=0, bytes_in=0):
+        """Records a request.
+
+        Args:
+            status: Response status code, or None if there was no response.
+            duration: Time taken by the request in seconds.
+            bytes_out: Size of the request body in bytes.
+            bytes_in: Size of the response body in bytes.
+        """
+        self.requests += 1
+        if status is None:
+            self.failures += 1
+        else:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.last_status = status
+        self.bytes_out += bytes_out
+        self.bytes_in += bytes_in
+        self.total_time += duration
+        self.histogram[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+
+    def mean_latency(self):
+        """Returns the mean latency in seconds, or None if there were no
+        requests."""
+        if not self.requests:
+            return None
+        return self.total_time / self.requests
+
+    def percentile(self, p):
+        """Estimates a latency percentile from the histogram.
+
+        Args:
+            p: Percentile between 0 and 100.
+
+        Returns:
+            Upper bound of the bucket the percentile falls in, in seconds,
+            inf if it is slower than every bucket, or None if there were no
+            requests.
+        """
+        if not self.requests:
+            return None
+
+        rank = p / 100.0 * self.requests
+        count = 0
+        for bound, n in zip(LATENCY_BUCKETS, self.histogram):
+            count += n
+            if count >= rank:
+                return bound
+        return float("inf")
+
+    def copy(self):
+        """Returns a copy of these metrics."""
+        metrics = EndpointMetrics()
+        for attribute in self.__slots__:
+            setattr(metrics, attribute, getattr(self, attribute))
+        metrics.statuses = dict(self.statuses)
+        metrics.histogram = list(self.histogram)
+        return metrics
+
+
+class RequestMetrics(object):
+
+    """Thread-safe per-endpoint metrics of the requests sent by a client.
+
+    Endpoints are identified by their method and path, with numeric IDs
+    replaced by {id} so that requests to different objects are aggregated.
+
+    Attributes:
+        relogins: Number of times the session expired and was renewed.
+    """
+
+    # Numeric path segments.
+    ID_PATTERN = re.compile(r"/\d+(?=/|$)")
+
+    def __init__(self):
+        """Constructs an empty RequestMetrics."""
+        self.relogins = 0
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    @classmethod
+    def endpoint(cls, method, uri):
+        """Builds the name of an endpoint.
+
+        Args:
+            method: HTTP method.
+            uri: Server URI.
+
+        Returns:
+            Endpoint name, e.g. "GET /api/odlcs/{id}".
+        """
+        return "{} {}".format(method, cls.ID_PATTERN.sub("/{id}", uri))
+
+    def record(self, method, uri, status, duration, bytes_out=0, bytes_in=0):
+        """Records a request.
+
+        Args:
+            method: HTTP method.
+            uri: Server URI.
+            status: Response status code, or None if there was no response.
+            duration: Time taken by the request in seconds.
+            bytes_out: Size of the request body in bytes.
+            bytes_in: Size of the response body in bytes.
+        """
+        endpoint = self.endpoint(method, uri)
+        with self._lock:
+            metrics = self._endpoints.get(endpoint)
+            if metrics is None:
+                metrics = self._endpoints[endpoint] = EndpointMetrics()
+            metrics.add(status, duration, bytes_out, bytes_in)
+
+    def record_relogin(self):
+        """Records a session renewal."""
+        with self._lock:
+            self.relogins += 1
+
+    def snapshot(self):
+        """Returns a consistent copy of the metrics.
+
+        Returns:
+            Tuple of (relogins, dictionary of endpoint names to
+            EndpointMetrics).
+        """
+        with self._lock:
+            endpoints = {
+                endpoint: metrics.copy()
+                for endpoint, metrics in self._endpoints.items()
+            }
+            return self.relogins, endpoints
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""Helpers shared by the interop nodes."""
+
+import rospy
+import rosgraph.names
+from diagnostics import RequestDiagnostics
+from client import InteroperabilityClient, OfflineInteroperabilityClient
+
+
+class NodeNamespace(object):
+
+    """Resolves names and parameters as a given node would.
+
+    This lets a single process host the roles of several nodes, each with the
+    same topics, services and parameters as if it were run as its own node.
+
+    Attributes:
+        name: Fully-qualified node name, e.g. /interop/obstacles.
+    """
+
+    def __init__(self, name=None):
+        """Constructs a NodeNamespace.
+
+        Args:
+            name: Fully-qualified node name, default: this node's name.
+        """
+        self.name = name or rospy.get_name()
+
+    def resolve(self, name):
+        """Resolves a name.
+
+        Args:
+            name: Global, relative or private name.
+
+        Returns:
+            Global name, with private names resolved relative to the node and
+            relative names relative to its namespace.
+        """
+        return rosgraph.names.resolve_name(name, self.name)
+
+    def get_param(self, name, *default):
+        """Gets a parameter.
+
+        Args:
+            name: Global, relative or private parameter name.
+            *default: Default value to return if the parameter is not set.
+
+        Returns:
+            Parameter value.
+
+        Raises:
+            KeyError: If the parameter is not set and there is no default.
+        """
+        return rospy.get_param(self.resolve(name), *default)
+
+
+def connect(ns, recorder=None):
+    """Connects and logs in to the interop server, as configured by a node's
+    parameters.
+
+    When online, the client's request metrics are also published as
+    diagnostics.
+
+    Args:
+        ns: NodeNamespace of the node.
+        recorder: TelemetryRecorder to record telemetry to when offline.
+
+    Returns:
+        Logged in client.
+
+    Raises:
+        Exception: On failure to login.
+    """
+    # Get server connection information.
+    offline = ns.get_param("~offline")
+    if offline:
+        base_path = ns.get_param("~base_path")
+        client = OfflineInteroperabilityClient(base_path, recorder)
+        rospy.logwarn("Running in OFFLINE mode")
+    else:
+        base_url = ns.get_param("~base_url")
+        timeout = ns.get_param("~timeout")
+        verify = ns.get_param("~verify")
+        client = InteroperabilityClient.from_env(base_url, timeout, verify)
+
+    # Wait for server to be reachable, then login.
+    client.wait_for_server()
+    client.login()
+
+    # Publish request metrics as diagnostics.
+    if not offline:
+        diagnostics = RequestDiagnostics(client.metrics, ns.name, client.url)
+        diagnostics_period = float(ns.get_param("~diagnostics_period", 1.0))
+        rospy.Timer(rospy.Duration(diagnostics_period), diagnostics.publish)
+
+    return client
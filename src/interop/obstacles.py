@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Moving obstacle tracking and simulation."""
+
+import copy
+import threading
+import collections
+import numpy as np
+from serializers import FEET_TO_METERS
+from projection import geodetic_to_enu
+
+# Number of meters per second in a knot.
+KNOTS_TO_METERS_PER_SECOND = 1852.0 / 3600.0
+
+
+class MovingObstacleExtrapolator(object):
+
+    """Dead reckoning extrapolator for moving obstacles.
+
+    Estimates the velocity of every sphere from its most recent samples, and
+    predicts where the spheres are at any given time from the latest sample.
+
+    Spheres are matched between samples by their index, as the interop server
+    always returns moving obstacles in the same order.
+    """
+
+    def __init__(self, window=5, max_horizon=1.0):
+        """Constructs a MovingObstacleExtrapolator.
+
+        Args:
+            window: Number of recent samples to estimate velocities from.
+            max_horizon: Maximum duration in seconds to extrapolate past the
+                latest sample for. Predictions further ahead in time are
+                clamped to this horizon.
+        """
+        self.window = window
+        self.max_horizon = max_horizon
+
+        self._lock = threading.Lock()
+        self._samples = collections.deque(maxlen=window)
+        self._velocities = None
+        self._latest = None
+
+    def reset(self):
+        """Forgets all samples."""
+        with self._lock:
+            self._samples.clear()
+            self._velocities = None
+            self._latest = None
+
+    def update(self, spheres):
+        """Adds a new sample.
+
+        Args:
+            spheres: GeoSphereArrayStamped of moving obstacles, stamped with
+                the time they were sampled at.
+        """
+        t = spheres.header.stamp.to_sec()
+        positions = np.array(
+            [[s.center.latitude, s.center.longitude, s.center.altitude]
+             for s in spheres.spheres],
+            dtype=np.float64).reshape(-1, 3)
+
+        with self._lock:
+            # Restart estimation if the obstacles changed or time went back.
+            if self._samples:
+                last_t, last_positions = self._samples[-1]
+                if last_positions.shape != positions.shape or t <= last_t:
+                    self._samples.clear()
+
+            self._samples.append((t, positions))
+            self._latest = spheres
+            self._velocities = self._estimate_velocities()
+
+    def _estimate_velocities(self):
+        """Estimates the velocities from the current samples with a least
+        squares fit.
+
+        Returns:
+            Array of velocities (n, 3) in units of latitude, longitude and
+            altitude per second.
+        """
+        times = np.array([t for t, _ in self._samples])
+        positions = np.array([p for _, p in self._samples])
+        if len(times) < 2:
+            return np.zeros(positions.shape[1:])
+
+        dt = times - times.mean()
+        dp = positions - positions.mean(axis=0)
+        return np.tensordot(dt, dp, axes=1) / np.dot(dt, dt)
+
+    def predict(self, stamp):
+        """Predicts the moving obstacles at a given time.
+
+        Args:
+            stamp: rospy.Time to predict the obstacles at.
+
+        Returns:
+            GeoSphereArrayStamped stamped with the given time, with its age set
+            to the time elapsed since the latest sample, or None if no samples
+            were received yet.
+        """
+        with self._lock:
+            if self._latest is None:
+                return None
+
+            last_t, last_positions = self._samples[-1]
+            dt = np.clip(stamp.to_sec() - last_t, 0.0, self.max_horizon)
+            positions = last_positions + self._velocities * dt
+
+            spheres = copy.deepcopy(self._latest)
+
+        spheres.age = stamp - spheres.header.stamp
+        spheres.header.stamp = stamp
+        for sphere, position in zip(spheres.spheres, positions.tolist()):
+            latitude, longitude, altitude = position
+            sphere.center.latitude = latitude
+            sphere.center.longitude = longitude
+            sphere.center.altitude = altitude
+
+        return spheres
+
+
+class MovingObstacleSimulator(object):
+
+    """Simulates moving obstacles following waypoints.
+
+    Every obstacle moves at a constant speed along straight lines through its
+    waypoints in order, and loops back to its first waypoint after its last.
+    Positions only depend on the time, so they are computed in closed form at
+    any given time, and agree between processes.
+    """
+
+    def __init__(self, obstacles):
+        """Constructs a MovingObstacleSimulator.
+
+        Args:
+            obstacles: List of moving obstacle dictionaries, each with a
+                sphere_radius in feet, a speed_avg in knots, and a list of
+                waypoints with a latitude, longitude and altitude_msl in feet.
+        """
+        self._paths = []
+        for obstacle in obstacles:
+            # Close the loop, and find the distance along it of each waypoint.
+            waypoints = obstacle["waypoints"] + obstacle["waypoints"][:1]
+            coordinates = np.array(
+                [[w["latitude"], w["longitude"], w["altitude_msl"]]
+                 for w in waypoints],
+                dtype=np.float64)
+            latitude, longitude, altitude = coordinates.T
+            enu = geodetic_to_enu(latitude, longitude,
+                                  altitude * FEET_TO_METERS,
+                                  (latitude[0], longitude[0], 0.0))
+            lengths = np.sqrt((np.diff(enu, axis=0)**2).sum(axis=1))
+            distances = np.concatenate([[0.0], np.cumsum(lengths)])
+
+            speed = obstacle["speed_avg"] * KNOTS_TO_METERS_PER_SECOND
+            self._paths.append((obstacle["sphere_radius"], speed, distances,
+                                coordinates))
+
+    def moving_obstacles(self, t):
+        """Computes the moving obstacles at a given time.
+
+        Args:
+            t: Time in seconds.
+
+        Returns:
+            List of moving obstacle dictionaries in the interop server's
+            format, with a latitude, longitude, altitude_msl in feet and
+            sphere_radius in feet.
+        """
+        obstacles = []
+        for radius, speed, distances, coordinates in self._paths:
+            # Find how far along the loop the obstacle is.
+            total = distances[-1]
+            distance = (t * speed) % total if total > 0 else 0.0
+
+            latitude, longitude, altitude = [
+                float(np.interp(distance, distances, c)) for c in coordinates.T
+            ]
+            obstacles.append({
+                "latitude": latitude,
+                "longitude": longitude,
+                "altitude_msl": altitude,
+                "sphere_radius": radius
+            })
+
+        return obstacles
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""Callback profiling."""
+
+import os
+import time
+import rospy
+import pstats
+import rospkg
+import cProfile
+import datetime
+import functools
+import threading
+from std_srvs.srv import Trigger, TriggerResponse
+
+
+class CallbackStats(object):
+
+    """Call statistics of a callback.
+
+    Attributes:
+        calls: Number of calls.
+        total_time: Total time spent in seconds.
+        max_time: Longest call in seconds.
+    """
+
+    __slots__ = ("calls", "total_time", "max_time")
+
+    def __init__(self, calls=0, total_time=0.0, max_time=0.0):
+        """Constructs CallbackStats.
+
+        Args:
+            calls: Number of calls.
+            total_time: Total time spent in seconds.
+            max_time: Longest call in seconds.
+        """
+        self.calls = calls
+        self.total_time = total_time
+        self.max_time = max_time
+
+
+class CallbackProfiler(object):
+
+    """Opt-in profiler of node callbacks.
+
+    Wrapped callbacks have their calls counted and timed. They can also be run
+    under cProfile, with one profile per thread so that concurrent callbacks do
+    not interfere, which are merged when dumped. When disabled, callbacks are
+    not wrapped at all so that there is no overhead.
+
+    Attributes:
+        enabled: Whether callbacks are profiled.
+        cprofile: Whether callbacks are run under cProfile.
+        path: Directory to dump profiles to.
+        name: Name of the profiled node, used to name the dumped profiles.
+    """
+
+    def __init__(self, enabled=False, cprofile=False, path=None, name=None):
+        """Constructs a CallbackProfiler.
+
+        Args:
+            enabled: Whether to profile callbacks.
+            cprofile: Whether to also run callbacks under cProfile.
+            path: Directory to dump profiles to, default: $ROS_HOME/profiles.
+            name: Name of the profiled node, default: this node's name.
+        """
+        self.enabled = enabled
+        self.cprofile = cprofile
+        self.path = path or os.path.join(rospkg.get_ros_home(), "profiles")
+        self.name = name or rospy.get_name()
+
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._profiles = []
+        self._local = threading.local()
+
+    @classmethod
+    def from_params(cls, ns):
+        """Constructs a CallbackProfiler from a node's ROS parameters.
+
+        The ~profile parameter enables profiling, ~profile_cprofile enables
+        cProfile, and ~profile_path sets the directory to dump profiles to. If
+        enabled, the ~profile/dump service is also advertised.
+
+        Args:
+            ns: NodeNamespace of the node.
+
+        Returns:
+            CallbackProfiler.
+        """
+        enabled = ns.get_param("~profile", False)
+        cprofile = ns.get_param("~profile_cprofile", False)
+        path = ns.get_param("~profile_path", "")
+        profiler = cls(enabled, cprofile, path, ns.name)
+
+        if enabled:
+            rospy.Service(ns.resolve("~profile/dump"), Trigger, profiler.dump)
+            rospy.logwarn("Profiling callbacks")
+
+        return profiler
+
+    def wrap(self, f, name=None):
+        """Wraps a callback to profile it.
+
+        Args:
+            f: Callback.
+            name: Name to record the callback's statistics under, default: the
+                callback's name.
+
+        Returns:
+            Wrapped callback, or the callback itself if profiling is disabled.
+        """
+        if not self.enabled:
+            return f
+
+        name = name or f.__name__
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            try:
+                return self._call(f, args, kwargs)
+            finally:
+                self._record(name, time.time() - start)
+
+        return wrapper
+
+    def _call(self, f, args, kwargs):
+        """Calls a callback, under this thread's cProfile profile if enabled.
+
+        Callbacks called from other callbacks are already profiled, so they
+        are called directly.
+
+        Args:
+            f: Callback.
+            args: Positional arguments.
+            kwargs: Key-word arguments.
+
+        Returns:
+            The callback's return value.
+        """
+        if not self.cprofile or getattr(self._local, "active", False):
+            return f(*args, **kwargs)
+
+        if not hasattr(self._local, "profile"):
+            self._local.lock = threading.Lock()
+            self._local.profile = cProfile.Profile()
+            with self._lock:
+                self._profiles.append((self._local.lock, self._local.profile))
+
+        # The lock prevents dumping the profile while it is running.
+        self._local.active = True
+        try:
+            with self._local.lock:
+                return self._local.profile.runcall(f, *args, **kwargs)
+        finally:
+            self._local.active = False
+
+    def _record(self, name, duration):
+        """Records a call.
+
+        Args:
+            name: Callback name.
+            duration: Time spent in seconds.
+        """
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = CallbackStats()
+            stats.calls += 1
+            stats.total_time += duration
+            stats.max_time = max(stats.max_time, duration)
+
+    def stats(self):
+        """Returns a copy of the call statistics.
+
+        Returns:
+            Dictionary of callback names to CallbackStats.
+        """
+        with self._lock:
+            return {
+                name: CallbackStats(s.calls, s.total_time, s.max_time)
+                for name, s in self._stats.items()
+            }
+
+    def summary(self):
+        """Summarizes the call statistics, by decreasing total time spent.
+
+        Returns:
+            Multi-line string.
+        """
+        stats = sorted(
+            self.stats().items(), key=lambda item: -item[1].total_time)
+        return "\n".join(
+            "{}: {:d} calls, {:.3f} s total, {:.3f} ms mean, {:.3f} ms max".
+            format(name, s.calls, s.total_time, 1e3 * s.total_time / s.calls,
+                   1e3 * s.max_time) for name, s in stats)
+
+    def dump_profile(self):
+        """Dumps the merged cProfile profiles of every thread.
+
+        Returns:
+            Path to the dumped profile, readable with pstats, or None if
+            nothing was profiled.
+
+        Raises:
+            OSError: On failure to create the profile directory.
+        """
+        with self._lock:
+            profiles = list(self._profiles)
+
+        stats = None
+        for lock, profile in profiles:
+            with lock:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+
+        if stats is None:
+            return None
+
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+        node = self.name.strip("/").replace("/", "_")
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+        path = os.path.join(self.path, "{}-{}.prof".format(node, timestamp))
+        stats.dump_stats(path)
+        return path
+
+    def dump(self, req=None):
+        """Service to dump the call statistics and cProfile profiles.
+
+        Args:
+            req: std_srvs/Trigger request, unused.
+
+        Returns:
+            std_srvs/TriggerResponse with the call statistics, and the path of
+            the dumped profile if any.
+        """
+        message = self.summary()
+        if self.cprofile:
+            try:
+                path = self.dump_profile()
+            except (IOError, OSError) as e:
+                rospy.logerr(e)
+                return TriggerResponse(False, str(e))
+
+            if path is not None:
+                message += "\nProfile dumped to {}".format(path)
+                rospy.loginfo("Profile dumped to {}".format(path))
+
+        return TriggerResponse(True, message)
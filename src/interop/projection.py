@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Vectorized geographic projections.
+
+Projects WGS84 geographic coordinates, and the mission geometry built from
+them, to a local East-North-Up (ENU) tangent plane for many points at once.
+"""
+
+import numpy as np
+from std_msgs.msg import Header
+from geometry_msgs.msg import Point, Point32, PolygonStamped
+from interop.msg import LocalFlyZone, LocalFlyZoneArray, LocalWayPoints
+
+# WGS84 ellipsoid parameters.
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+
+def geodetic_to_ecef(latitude, longitude, altitude):
+    """Converts geodetic coordinates to Earth-Centered Earth-Fixed coordinates.
+
+    Args:
+        latitude: Latitudes in degrees, array-like.
+        longitude: Longitudes in degrees, array-like.
+        altitude: Altitudes above the ellipsoid in meters, array-like.
+
+    Returns:
+        Array of ECEF coordinates (..., 3) in meters.
+    """
+    lat = np.radians(latitude)
+    lon = np.radians(longitude)
+    altitude = np.asarray(altitude, dtype=np.float64)
+
+    sin_lat = np.sin(lat)
+    cos_lat = np.cos(lat)
+    n = WGS84_A / np.sqrt(1 - WGS84_E2 * sin_lat**2)
+
+    x = (n + altitude) * cos_lat * np.cos(lon)
+    y = (n + altitude) * cos_lat * np.sin(lon)
+    z = (n * (1 - WGS84_E2) + altitude) * sin_lat
+
+    return np.stack([x, y, z], axis=-1)
+
+
+def geodetic_to_enu(latitude, longitude, altitude, origin):
+    """Projects geodetic coordinates to a local ENU frame.
+
+    Args:
+        latitude: Latitudes in degrees, array-like.
+        longitude: Longitudes in degrees, array-like.
+        altitude: Altitudes above the ellipsoid in meters, array-like.
+        origin: (latitude, longitude, altitude) of the ENU frame's origin.
+
+    Returns:
+        Array of ENU coordinates (..., 3) in meters.
+    """
+    lat0, lon0, alt0 = origin
+    ecef = geodetic_to_ecef(latitude, longitude, altitude)
+    delta = ecef - geodetic_to_ecef(lat0, lon0, alt0)
+
+    # Rotate from ECEF to ENU.
+    sin_lat = np.sin(np.radians(lat0))
+    cos_lat = np.cos(np.radians(lat0))
+    sin_lon = np.sin(np.radians(lon0))
+    cos_lon = np.cos(np.radians(lon0))
+    rotation = np.array([
+        [-sin_lon, cos_lon, 0.0],
+        [-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat],
+        [cos_lat * cos_lon, cos_lat * sin_lon, sin_lat],
+    ])
+
+    return np.dot(delta, rotation.T)
+
+
+def geopoints_to_enu(points, origin):
+    """Projects GeoPoint messages to a local ENU frame.
+
+    Args:
+        points: List of geographic_msgs/GeoPoint.
+        origin: (latitude, longitude, altitude) of the ENU frame's origin.
+
+    Returns:
+        Array of ENU coordinates (n, 3) in meters.
+    """
+    coordinates = np.array(
+        [[p.latitude, p.longitude, p.altitude] for p in points],
+        dtype=np.float64).reshape(-1, 3)
+    return geodetic_to_enu(coordinates[:, 0], coordinates[:, 1],
+                           coordinates[:, 2], origin)
+
+
+def project_mission(flyzones, search_grid, waypoints, home, frame):
+    """Projects the mission geometry to a local ENU frame around home.
+
+    All the points are projected at once.
+
+    Args:
+        flyzones: FlyZoneArray.
+        search_grid: GeoPolygonStamped.
+        waypoints: WayPoints.
+        home: geographic_msgs/GeoPointStamped home position, used as the
+            origin of the ENU frame.
+        frame: Frame ID of the ENU frame.
+
+    Returns:
+        A tuple of (LocalFlyZoneArray, geometry_msgs/PolygonStamped,
+        LocalWayPoints) corresponding to the fly zones, search grid and
+        waypoints.
+    """
+    origin = (home.position.latitude, home.position.longitude,
+              home.position.altitude)
+
+    # Project every point in a single batch, and split them back up.
+    groups = [z.zone.polygon.points for z in flyzones.flyzones]
+    groups.append(search_grid.polygon.points)
+    groups.append(waypoints.waypoints)
+    points = [p for group in groups for p in group]
+    splits = np.cumsum([len(group) for group in groups])[:-1]
+    enu = [
+        a.tolist() for a in np.split(geopoints_to_enu(points, origin), splits)
+    ]
+
+    local_flyzones = LocalFlyZoneArray()
+    for flyzone, zone_enu in zip(flyzones.flyzones, enu):
+        local_flyzone = LocalFlyZone()
+        local_flyzone.max_alt = flyzone.max_alt - origin[2]
+        local_flyzone.min_alt = flyzone.min_alt - origin[2]
+        local_flyzone.zone.header = Header(
+            stamp=flyzone.zone.header.stamp, frame_id=frame)
+        local_flyzone.zone.polygon.points = [Point32(*p) for p in zone_enu]
+        local_flyzones.flyzones.append(local_flyzone)
+
+    local_search_grid = PolygonStamped()
+    local_search_grid.header = Header(
+        stamp=search_grid.header.stamp, frame_id=frame)
+    local_search_grid.polygon.points = [Point32(*p) for p in enu[-2]]
+
+    local_waypoints = LocalWayPoints()
+    local_waypoints.header = Header(
+        stamp=waypoints.header.stamp, frame_id=frame)
+    local_waypoints.waypoints = [Point(*p) for p in enu[-1]]
+
+    return local_flyzones, local_search_grid, local_waypoints
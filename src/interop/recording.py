@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Telemetry recording."""
+
+import os
+import threading
+import json_codec
+from six.moves import queue
+
+
+class TelemetryRecorder(object):
+
+    """Records telemetry to line-delimited JSON files.
+
+    Records are queued and written by a background thread, so that recording
+    never blocks the caller on I/O. Files are rotated once they reach a given
+    size, keeping a given number of older files around as path.1, path.2, etc.
+
+    Attributes:
+        path: Path to the current file.
+        max_bytes: Size in bytes to rotate files at.
+        backup_count: Number of older files to keep.
+        dropped: Number of records dropped because the queue was full.
+    """
+
+    def __init__(self,
+                 path,
+                 max_bytes=10 * 1024 * 1024,
+                 backup_count=5,
+                 queue_size=1000):
+        """Constructs a TelemetryRecorder, and starts its writer thread.
+
+        Args:
+            path: Path to record to.
+            max_bytes: Size in bytes to rotate files at, or 0 to never rotate.
+            backup_count: Number of older files to keep.
+            queue_size: Maximum number of records waiting to be written.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.dropped = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self._queue = queue.Queue(queue_size)
+        self._file = open(path, "ab")
+        self._thread = threading.Thread(target=self._write, name="recorder")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def record(self, data, stamp):
+        """Queues telemetry to be recorded.
+
+        Args:
+            data: Telemetry dictionary.
+            stamp: Time stamp in seconds.
+
+        Returns:
+            Whether the record was queued, or dropped because the queue was
+            full.
+        """
+        try:
+            self._queue.put_nowait((stamp, data))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def close(self):
+        """Writes all the queued records, and stops the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _rotate(self):
+        """Rotates the files."""
+        self._file.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = "{}.{}".format(self.path, i)
+                if os.path.exists(src):
+                    os.rename(src, "{}.{}".format(self.path, i + 1))
+            os.rename(self.path, "{}.1".format(self.path))
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "ab")
+
+    def _write(self):
+        """Writes records until closed.
+
+        Records are written in batches of whatever is queued, and only flushed
+        once the queue is empty.
+        """
+        while True:
+            item = self._queue.get()
+            while item is not None:
+                stamp, data = item
+                line = json_codec.dumps(dict(data, time=stamp)) + "\n"
+                self._file.write(line.encode("utf-8"))
+
+                if self.max_bytes and self._file.tell() >= self.max_bytes:
+                    self._rotate()
+
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            self._file.flush()
+            if item is None:
+                self._file.close()
+                return
@@ -2,20 +2,36 @@
 """Interoperability API message serializer.
 Serializes from ROS messages to python dictionaries and vice versa."""
 
-import cv2
+import re
 import rospy
+import calendar
+import operator
+import itertools
+import json_codec
 import numpy as np
-import dateutil.parser
-import tf.transformations
-from dateutil.tz import tzutc
-from datetime import datetime
-from cv_bridge import CvBridge
 from sensor_msgs.msg import CompressedImage
 from geographic_msgs.msg import GeoPointStamped, GeoPoint
 from std_msgs.msg import Header, Time
 from interop.msg import (Color, FlyZone, FlyZoneArray, Orientation, Shape,
                          Object, ObjectType, GeoCylinder, GeoPolygonStamped,
-                         GeoCylinderArrayStamped, WayPoints)
+                         GeoCylinderArrayStamped, GeoSphere,
+                         GeoSphereArrayStamped, WayPoints)
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+# OpenCV, cv_bridge, tf and dateutil are slow to import, and are only needed by
+# some nodes, so they are imported when first used instead.
+
+# Number of meters in a foot.
+FEET_TO_METERS = 0.3048
+
+# ISO 8601 layout used by the interop server,
+# e.g. 2017-06-15T18:23:14.451726+00:00.
+ISO8601_PATTERN = re.compile(r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})"
+                             r"(?:\.(\d+))?(Z|[+-]\d{2}:?\d{2})?$")
 
 
 def meters_to_feet(m):
@@ -27,7 +43,7 @@ def meters_to_feet(m):
     Returns:
         Distance in feet.
     """
-    return float(m) / 0.3048
+    return float(m) / FEET_TO_METERS
 
 
 def feet_to_meters(ft):
@@ -39,7 +55,53 @@ def feet_to_meters(ft):
     Returns:
         Distance in meters.
     """
-    return float(ft) * 0.3048
+    return float(ft) * FEET_TO_METERS
+
+
+def _parse_iso8601(iso):
+    """Parses the ISO 8601 layout used by the interop server.
+
+    Args:
+        iso: ISO 8601 encoded string.
+
+    Returns:
+        Tuple of (seconds, microseconds) since the epoch, or None if the string
+        is not in the expected layout.
+    """
+    match = ISO8601_PATTERN.match(iso)
+    if match is None:
+        return None
+
+    year, month, day, hour, minute, second, fraction, offset = match.groups()
+    secs = calendar.timegm((int(year), int(month), int(day), int(hour),
+                            int(minute), int(second)))
+
+    # Convert to UTC.
+    if offset and offset != "Z":
+        offset = offset.replace(":", "")
+        offset_secs = int(offset[1:3]) * 3600 + int(offset[3:5]) * 60
+        secs += -offset_secs if offset[0] == "+" else offset_secs
+
+    # Only keep microsecond precision like datetime does.
+    usecs = int(fraction[:6].ljust(6, "0")) if fraction else 0
+
+    return secs, usecs
+
+
+def _parse_iso8601_fallback(iso):
+    """Parses any ISO 8601 string.
+
+    Args:
+        iso: ISO 8601 encoded string.
+
+    Returns:
+        Tuple of (seconds, microseconds) since the epoch.
+    """
+    import dateutil.parser
+
+    # Convert to time from epoch in UTC, assuming UTC if no offset is given.
+    t = dateutil.parser.parse(iso)
+    return calendar.timegm(t.utctimetuple()), t.microsecond
 
 
 def iso8601_to_rostime(iso):
@@ -51,28 +113,54 @@ def iso8601_to_rostime(iso):
     Returns:
         std_msgs/Time.
     """
-    # Convert to datetime in UTC.
-    t = dateutil.parser.parse(iso)
-    if not t.utcoffset():
-        t = t.replace(tzinfo=tzutc())
-
-    # Convert to time from epoch in UTC.
-    epoch = datetime.utcfromtimestamp(0)
-    epoch = epoch.replace(tzinfo=tzutc())
-    dt = t - epoch
+    parsed = _parse_iso8601(iso)
+    if parsed is None:
+        parsed = _parse_iso8601_fallback(iso)
+    secs, usecs = parsed
 
     # Create ROS message.
     time = Time()
-    time.data.secs = int(dt.total_seconds())
-    time.data.nsecs = dt.microseconds * 1000
+    time.data.secs = secs
+    time.data.nsecs = usecs * 1000
 
     return time
 
 
+def points_to_geopoints(points, altitude_key=None):
+    """Converts a list of position dictionaries into GeoPoint messages.
+
+    The coordinates are gathered into a single array so that the unit
+    conversion is done for all points at once.
+
+    Args:
+        points: List of dictionaries with latitude and longitude keys.
+        altitude_key: Key of the altitude in feet, optional. The altitude is
+            left as 0 if not set.
+
+    Returns:
+        List of geographic_msgs/GeoPoint with altitudes in meters.
+    """
+    keys = ("latitude", "longitude")
+    if altitude_key is not None:
+        keys += (altitude_key,)
+
+    coordinates = np.zeros((len(points), 3))
+    if points:
+        coordinates[:, :len(keys)] = list(
+            map(operator.itemgetter(*keys), points))
+    coordinates[:, 2] *= FEET_TO_METERS
+
+    return list(itertools.starmap(GeoPoint, coordinates.tolist()))
+
+
 class MissionDeserializer(object):
 
     """Mission information deserializer."""
 
+    # Types of the messages a mission is deserialized to, in order.
+    TYPES = (FlyZoneArray, GeoPolygonStamped, WayPoints, GeoPointStamped,
+             GeoPointStamped, GeoPointStamped, GeoPointStamped)
+
     @classmethod
     def __get_flyzone(cls, data, frame):
         """
@@ -101,11 +189,8 @@ class MissionDeserializer(object):
             flyzone.min_alt = feet_to_meters(zone["altitude_msl_min"])
 
             # Change boundary points to ros message of type polygon.
-            for waypoint in zone["boundary_pts"]:
-                point = GeoPoint()
-                point.latitude = waypoint["latitude"]
-                point.longitude = waypoint["longitude"]
-                flyzone.zone.polygon.points.append(point)
+            flyzone.zone.polygon.points = points_to_geopoints(
+                zone["boundary_pts"])
 
             flyzones.flyzones.append(flyzone)
 
@@ -131,17 +216,7 @@ class MissionDeserializer(object):
         waypoints = WayPoints()
         waypoints.header = header
 
-        # Ensure there is no rotation by setting w to 1.
-        for point in data:
-            waypoint = GeoPoint()
-
-            altitude = feet_to_meters(point["altitude_msl"])
-
-            waypoint.latitude = point["latitude"]
-            waypoint.longitude = point["longitude"]
-            waypoint.altitude = altitude
-
-            waypoints.waypoints.append(waypoint)
+        waypoints.waypoints = points_to_geopoints(data, "altitude_msl")
 
         return waypoints
 
@@ -164,16 +239,7 @@ class MissionDeserializer(object):
         search_grid = GeoPolygonStamped()
         search_grid.header = header
 
-        for point in data:
-            boundary_pnt = GeoPoint()
-
-            altitude = feet_to_meters(point["altitude_msl"])
-
-            boundary_pnt.latitude = point["latitude"]
-            boundary_pnt.longitude = point["longitude"]
-            boundary_pnt.altitude = altitude
-
-            search_grid.polygon.points.append(boundary_pnt)
+        search_grid.polygon.points = points_to_geopoints(data, "altitude_msl")
 
         return search_grid
 
@@ -231,10 +297,65 @@ class MissionDeserializer(object):
                 emergent_obj, home)
 
 
+class MissionMapping(Mapping):
+
+    """Read-only mapping of mission IDs to missions.
+
+    Missions are only deserialized when first accessed, and memoized after so
+    that listing missions and selecting one does not deserialize all of them.
+    """
+
+    def __init__(self, missions, frame, cache=None):
+        """Constructs a MissionMapping.
+
+        Args:
+            missions: Mapping of mission IDs to mission dictionaries.
+            frame: Frame ID for the messages.
+            cache: Optional function returning the prebuilt messages of the
+                mission with a given ID, or None if there are none, in which
+                case the mission is deserialized instead.
+        """
+        self.frame = frame
+        self._data = missions
+        self._cache = cache
+        self._missions = {}
+
+    def __getitem__(self, id):
+        """Returns the mission with the matching ID.
+
+        Args:
+            id: Mission ID.
+
+        Returns:
+            A tuple of (FlyZoneArray, GeoPolygonStamped, WayPoints,
+            GeoPointStamped, GeoPointStamped, GeoPointStamped, GeoPointStamped)
+            as returned by MissionDeserializer.from_dict().
+
+        Raises:
+            KeyError: On mission ID not found.
+        """
+        if id not in self._missions:
+            mission = self._cache(id) if self._cache else None
+            if mission is None:
+                mission = MissionDeserializer.from_dict(self._data[id],
+                                                        self.frame)
+            self._missions[id] = mission
+        return self._missions[id]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+
 class ObstaclesDeserializer(object):
 
     """Obstacles message deserializer."""
 
+    # Types of the messages obstacles are deserialized to, in order.
+    TYPES = (GeoSphereArrayStamped, GeoCylinderArrayStamped)
+
     @classmethod
     def from_dict(cls, data, frame, lifetime):
         """Deserializes obstacle data.
@@ -245,13 +366,31 @@ class ObstaclesDeserializer(object):
             lifetime: Lifetime of every Marker in seconds.
 
         Returns:
-            GeoCylinderArrayStamped stationary obstacles.
+            Tuple of (GeoSphereArrayStamped, GeoCylinderArrayStamped)
+            corresponding to the moving and stationary obstacles.
         """
         # Generate base header.
         header = Header()
         header.stamp = rospy.get_rostime()
         header.frame_id = frame
 
+        # Parse moving obstacles, and populate markers with spheres.
+        moving_obstacles = GeoSphereArrayStamped()
+        moving_obstacles.header = header
+        if "moving_obstacles" in data:
+            for obj in data["moving_obstacles"]:
+                # Moving obstacles are spheres.
+                obstacle = GeoSphere()
+
+                # Set scale to define size.
+                obstacle.radius = feet_to_meters(obj["sphere_radius"])
+
+                obstacle.center.latitude = obj["latitude"]
+                obstacle.center.longitude = obj["longitude"]
+                obstacle.center.altitude = feet_to_meters(obj["altitude_msl"])
+
+                moving_obstacles.spheres.append(obstacle)
+
         # Parse stationary obstacles, and populate markers with cylinders.
         stationary_obstacles = GeoCylinderArrayStamped()
         stationary_obstacles.header = header
@@ -269,7 +408,7 @@ class ObstaclesDeserializer(object):
 
                 stationary_obstacles.cylinders.append(obstacle)
 
-        return stationary_obstacles
+        return moving_obstacles, stationary_obstacles
 
 
 class TelemetrySerializer(object):
@@ -288,6 +427,8 @@ class TelemetrySerializer(object):
         Returns:
             A dictionary.
         """
+        from tf.transformations import euler_from_quaternion
+
         # Convert orientation from east to north.
         q = [
             pose_msg.pose.orientation.x,
@@ -295,7 +436,7 @@ class TelemetrySerializer(object):
             pose_msg.pose.orientation.z,
             pose_msg.pose.orientation.w,
         ]
-        yaw = tf.transformations.euler_from_quaternion(q)[2]
+        yaw = euler_from_quaternion(q)[2]
         compass_heading = (450 - np.rad2deg(yaw)) % 360
 
         return {
@@ -306,6 +447,67 @@ class TelemetrySerializer(object):
         }
 
 
+class MessagePlan(object):
+
+    """Precompiled plan to serialize a flat ROS message type to and from a
+    dictionary.
+
+    The fields of the message type are inspected once on construction, so that
+    converting messages only requires direct field access.
+    """
+
+    def __init__(self, msg_type, enumeration_types=()):
+        """Constructs a MessagePlan.
+
+        Args:
+            msg_type: ROS message type.
+            enumeration_types: Message types of fields that are enumerations,
+                i.e. whose value is stored in their data field.
+        """
+        self.msg_type = msg_type
+
+        # Build a (field, getter, type) tuple for every field.
+        msg = msg_type()
+        fields = []
+        for attribute in msg_type.__slots__:
+            attribute_type = type(getattr(msg, attribute))
+            if attribute_type in enumeration_types:
+                getter = operator.attrgetter(attribute + ".data")
+            else:
+                getter = operator.attrgetter(attribute)
+            fields.append((attribute, getter, attribute_type))
+        self.fields = tuple(fields)
+
+    def to_dict(self, msg):
+        """Serializes a message into a dictionary.
+
+        Args:
+            msg: ROS message of the plan's type.
+
+        Returns:
+            A dictionary.
+        """
+        return {attribute: getter(msg) for attribute, getter, _ in self.fields}
+
+    def from_dict(self, data):
+        """Deserializes a dictionary into a message.
+
+        Args:
+            data: A dictionary. Missing and None values are left as default.
+
+        Returns:
+            ROS message of the plan's type.
+        """
+        kwargs = {}
+        for attribute, _, attribute_type in self.fields:
+            value = data.get(attribute)
+            if value is not None:
+                # Set 'casted' value.
+                kwargs[attribute] = attribute_type(value)
+
+        return self.msg_type(**kwargs)
+
+
 class ObjectSerializer(object):
 
     """Object message serializer."""
@@ -313,6 +515,9 @@ class ObjectSerializer(object):
     # Enumeration message types.
     ENUMERATION_TYPES = {Color, Orientation, Shape, ObjectType}
 
+    # Precompiled Object message plan.
+    PLAN = MessagePlan(Object, ENUMERATION_TYPES)
+
     @classmethod
     def from_msg(cls, msg):
         """Serializes object data into a dictionary.
@@ -323,17 +528,7 @@ class ObjectSerializer(object):
         Returns:
             A dictionary.
         """
-        data = {}
-
-        # Set all fields.
-        for attribute in msg.__slots__:
-            value = getattr(msg, attribute)
-            if type(value) in cls.ENUMERATION_TYPES:
-                value = value.data
-
-            data[attribute] = value
-
-        return data
+        return cls.PLAN.to_dict(msg)
 
     @classmethod
     def from_dict(cls, data):
@@ -345,20 +540,34 @@ class ObjectSerializer(object):
         Returns:
             A Object ROS message.
         """
-        # Determine ROS message type.
-        msg = Object()
+        return cls.PLAN.from_dict(data)
 
-        for attribute in msg.__slots__:
-            if attribute in data:
-                # Get corresponding type of slot.
-                attribute_type = type(getattr(msg, attribute))
+    @classmethod
+    def to_json(cls, msg):
+        """Serializes object data into a JSON string.
 
-                # Set 'casted' value.
-                value = data[attribute]
-                if value is not None:
-                    setattr(msg, attribute, attribute_type(value))
+        Args:
+            msg: Object ROS message.
 
-        return msg
+        Returns:
+            A JSON string.
+        """
+        return json_codec.dumps(cls.PLAN.to_dict(msg))
+
+    @classmethod
+    def from_json(cls, json_object):
+        """Deserializes a JSON string into Object ROS message.
+
+        Args:
+            json_object: A JSON string.
+
+        Returns:
+            A Object ROS message.
+
+        Raises:
+            ValueError: On JSON decoding failure.
+        """
+        return cls.PLAN.from_dict(json_codec.loads(json_object))
 
 
 class ObjectImageSerializer(object):
@@ -378,6 +587,9 @@ class ObjectImageSerializer(object):
         Raises:
             CvBridgeError: On image conversion error.
         """
+        import cv2
+        from cv_bridge import CvBridge
+
         if isinstance(msg, CompressedImage):
             # Decompress message.
             msg = cls.from_raw(msg.data)
@@ -408,6 +620,9 @@ class ObjectImageSerializer(object):
         Raises:
             CvBridgeError: On image conversion error.
         """
+        import cv2
+        from cv_bridge import CvBridge
+
         # Convert to OpenCV image.
         nparr = np.fromstring(raw, np.uint8)
         img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
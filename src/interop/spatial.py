@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""Spatial indices over mission geometry."""
+
+import numpy as np
+import collections
+from projection import geopoints_to_enu
+
+
+def _segments(xyz):
+    """Builds the segments of a path.
+
+    Args:
+        xyz: Array of path points (n, 3). A single point is treated as a
+            degenerate segment.
+
+    Returns:
+        Tuple of (start, end) arrays of segment end points (m, 3).
+    """
+    if len(xyz) == 1:
+        return xyz, xyz
+    return xyz[:-1], xyz[1:]
+
+
+class ObstacleIndex(object):
+
+    """Grid index over stationary obstacles.
+
+    The cylinders are projected to a local ENU plane centered on the
+    obstacles, and bucketed into square grid cells they overlap so that
+    proximity queries only need to consider the cylinders near the query.
+    """
+
+    def __init__(self, cylinders, cell_size=100.0):
+        """Constructs an ObstacleIndex.
+
+        Args:
+            cylinders: List of GeoCylinder.
+            cell_size: Grid cell size in meters.
+        """
+        self.cylinders = list(cylinders)
+        self.cell_size = float(cell_size)
+
+        centers = [c.center for c in self.cylinders]
+        if centers:
+            self.origin = (np.mean([c.latitude for c in centers]),
+                           np.mean([c.longitude for c in centers]), 0.0)
+        else:
+            self.origin = (0.0, 0.0, 0.0)
+
+        # Only the horizontal position of the center matters.
+        self.centers = geopoints_to_enu(centers, self.origin)[:, :2]
+        self.radii = np.array([c.radius for c in self.cylinders])
+        self.heights = np.array([c.height for c in self.cylinders])
+
+        # Bucket every cylinder into all the cells it overlaps.
+        cells = collections.defaultdict(list)
+        for i, (center, radius) in enumerate(zip(self.centers, self.radii)):
+            (x0, y0), (x1, y1) = self._cell_range(center - radius,
+                                                  center + radius)
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    cells[(x, y)].append(i)
+        self.cells = {k: np.array(v) for k, v in cells.items()}
+
+    @staticmethod
+    def key(cylinders):
+        """Returns a hashable key that identifies a set of obstacles.
+
+        Args:
+            cylinders: List of GeoCylinder.
+
+        Returns:
+            Tuple.
+        """
+        return tuple((c.center.latitude, c.center.longitude, c.radius, c.height)
+                     for c in cylinders)
+
+    def _cell_range(self, lower, upper):
+        """Returns the range of grid cells covering a bounding box.
+
+        Args:
+            lower: Lower (x, y) corner of the bounding box in meters.
+            upper: Upper (x, y) corner of the bounding box in meters.
+
+        Returns:
+            Tuple of the lower and upper (x, y) cell indices, inclusive.
+        """
+        lower = tuple(np.floor(np.asarray(lower) / self.cell_size).astype(int))
+        upper = tuple(np.floor(np.asarray(upper) / self.cell_size).astype(int))
+        return lower, upper
+
+    def _candidates(self, lower, upper):
+        """Returns the cylinders in the grid cells covering a bounding box.
+
+        Args:
+            lower: Lower (x, y) corner of the bounding box in meters.
+            upper: Upper (x, y) corner of the bounding box in meters.
+
+        Returns:
+            Array of cylinder indices.
+        """
+        (x0, y0), (x1, y1) = self._cell_range(lower, upper)
+
+        # Avoid walking through many empty cells for large queries.
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells):
+            buckets = [
+                v for (x, y), v in self.cells.items()
+                if x0 <= x <= x1 and y0 <= y <= y1
+            ]
+        else:
+            buckets = [
+                self.cells[(x, y)]
+                for x in range(x0, x1 + 1)
+                for y in range(y0, y1 + 1)
+                if (x, y) in self.cells
+            ]
+
+        if not buckets:
+            return np.array([], dtype=int)
+        return np.unique(np.concatenate(buckets))
+
+    def query(self, points, radius):
+        """Finds the obstacles within a distance of a point or path.
+
+        The distance is measured from the surface of each cylinder, taking its
+        height into account.
+
+        Args:
+            points: List of geographic_msgs/GeoPoint. A single point is
+                queried as a point, and several as a path going through every
+                point in order. Altitudes are w.r.t. sea level.
+            radius: Search radius in meters.
+
+        Returns:
+            List of (GeoCylinder, distance) tuples of the obstacles within the
+            search radius, sorted from closest to furthest.
+        """
+        if not points or not self.cylinders:
+            return []
+
+        # Only keep the horizontal position, but use altitudes as is.
+        xyz = geopoints_to_enu(points, self.origin)
+        xyz[:, 2] = [p.altitude for p in points]
+        start, end = _segments(xyz)
+
+        # Get candidates from the grid.
+        margin = radius + self.radii.max()
+        lower = np.minimum(start, end)[:, :2].min(axis=0) - margin
+        upper = np.maximum(start, end)[:, :2].max(axis=0) + margin
+        candidates = self._candidates(lower, upper)
+        if not len(candidates):
+            return []
+
+        # Find the closest point of every segment to every candidate center.
+        # Arrays are (candidates, segments).
+        centers = self.centers[candidates][:, np.newaxis, :]
+        direction = (end - start)[np.newaxis, :, :2]
+        length2 = np.maximum((direction**2).sum(axis=-1), 1e-12)
+        t = ((centers - start[np.newaxis, :, :2]) * direction).sum(axis=-1)
+        t = np.clip(t / length2, 0.0, 1.0)
+        closest = start[np.newaxis, :, :2] + t[..., np.newaxis] * direction
+        horizontal = np.sqrt(((centers - closest)**2).sum(axis=-1))
+
+        # Compute the clearance from the surface of the cylinders.
+        altitude = start[np.newaxis, :, 2] + t * (end - start)[np.newaxis, :, 2]
+        radii = self.radii[candidates][:, np.newaxis]
+        heights = self.heights[candidates][:, np.newaxis]
+        horizontal = np.maximum(horizontal - radii, 0.0)
+        vertical = np.maximum(altitude - heights, 0.0)
+        distances = np.sqrt(horizontal**2 + vertical**2).min(axis=1)
+
+        # Filter and sort.
+        nearby = distances <= radius
+        order = np.argsort(distances[nearby], kind="mergesort")
+        return [
+            (self.cylinders[i], float(d))
+            for i, d in zip(candidates[nearby][order], distances[nearby][order])
+        ]
+
+
+def _point_segment_distances(points, start, end):
+    """Computes the distances from points to segments in the plane.
+
+    Args:
+        points: Array of points (n, 2).
+        start: Array of segment start points (m, 2).
+        end: Array of segment end points (m, 2).
+
+    Returns:
+        Array of distances (n, m) from every point to every segment.
+    """
+    points = points[:, np.newaxis, :]
+    direction = (end - start)[np.newaxis]
+    length2 = np.maximum((direction**2).sum(axis=-1), 1e-12)
+    t = ((points - start[np.newaxis]) * direction).sum(axis=-1)
+    t = np.clip(t / length2, 0.0, 1.0)
+    closest = start[np.newaxis] + t[..., np.newaxis] * direction
+    return np.sqrt(((points - closest)**2).sum(axis=-1))
+
+
+def _cross(o, a, b):
+    """Computes the z component of the cross product of (a - o) and (b - o).
+
+    Args:
+        o: Array of origins (..., 2).
+        a: Array of first points (..., 2).
+        b: Array of second points (..., 2).
+
+    Returns:
+        Array of cross products (...).
+    """
+    return ((a[..., 0] - o[..., 0]) * (b[..., 1] - o[..., 1]) -
+            (a[..., 1] - o[..., 1]) * (b[..., 0] - o[..., 0]))
+
+
+class FlyZoneIndex(object):
+
+    """Precomputed fly zone geometry for containment queries.
+
+    The fly zone polygons are projected to a local ENU plane once, and stored
+    as arrays of edges along with their bounding boxes so that many points can
+    be tested against them at once.
+    """
+
+    def __init__(self, flyzones):
+        """Constructs a FlyZoneIndex.
+
+        Args:
+            flyzones: List of FlyZone.
+        """
+        points = [p for z in flyzones for p in z.zone.polygon.points]
+        if points:
+            self.origin = (np.mean([p.latitude for p in points]),
+                           np.mean([p.longitude for p in points]), 0.0)
+        else:
+            self.origin = (0.0, 0.0, 0.0)
+
+        # Store each zone as (min_alt, max_alt, start, end, lower, upper),
+        # where start and end are the edges' end points, and lower and upper
+        # are the corners of the zone's bounding box.
+        self.zones = []
+        for flyzone in flyzones:
+            vertices = flyzone.zone.polygon.points
+            if len(vertices) < 3:
+                continue
+            start = geopoints_to_enu(vertices, self.origin)[:, :2]
+            end = np.roll(start, -1, axis=0)
+            self.zones.append((flyzone.min_alt, flyzone.max_alt, start, end,
+                               start.min(axis=0), start.max(axis=0)))
+
+    def _project(self, points):
+        """Projects points to the local plane.
+
+        Args:
+            points: List of geographic_msgs/GeoPoint.
+
+        Returns:
+            Array of (x, y, altitude) points (n, 3), with altitudes w.r.t. sea
+            level.
+        """
+        xyz = geopoints_to_enu(points, self.origin)
+        xyz[:, 2] = [p.altitude for p in points]
+        return xyz
+
+    def _zone_distances(self, zone, xyz):
+        """Computes the signed distances from points to a fly zone's boundary.
+
+        Args:
+            zone: Zone tuple.
+            xyz: Array of (x, y, altitude) points (n, 3).
+
+        Returns:
+            Array of distances (n,) in meters, positive inside the zone and
+            negative outside.
+        """
+        min_alt, max_alt, start, end, lower, upper = zone
+        xy = xyz[:, :2]
+
+        # Ray cast only for the points within the bounding box.
+        inside = np.all((xy >= lower) & (xy <= upper), axis=1)
+        if inside.any():
+            x = xy[inside, 0:1]
+            y = xy[inside, 1:2]
+            spans = (start[:, 1] > y) != (end[:, 1] > y)
+            dy = end[:, 1] - start[:, 1]
+            dy = np.where(dy == 0.0, 1e-12, dy)
+            crossing = (end[:, 0] - start[:, 0]) * (y - start[:, 1]) / dy
+            crosses = spans & (x < crossing + start[:, 0])
+            inside[inside] = crosses.sum(axis=1) % 2 == 1
+
+        horizontal = _point_segment_distances(xy, start, end).min(axis=1)
+        below = min_alt - xyz[:, 2]
+        above = xyz[:, 2] - max_alt
+
+        # Inside, the closest boundary is either an edge, the floor, or the
+        # ceiling. Outside, it is the closest point of the zone's volume.
+        interior = np.minimum(horizontal, np.minimum(-below, -above))
+        horizontal = np.where(inside, 0.0, horizontal)
+        vertical = np.maximum(np.maximum(below, above), 0.0)
+        exterior = -np.sqrt(horizontal**2 + vertical**2)
+        return np.where(inside & (interior >= 0.0), interior, exterior)
+
+    def _segments_inside(self, zone, first, second):
+        """Checks whether segments stay inside a fly zone.
+
+        Args:
+            zone: Zone tuple.
+            first: Array of (x, y, altitude) segment start points (n, 3), all
+                of which must be inside the zone.
+            second: Array of (x, y, altitude) segment end points (n, 3), all of
+                which must be inside the zone.
+
+        Returns:
+            Array of booleans (n,) of whether each segment does not cross any
+            of the zone's edges.
+        """
+        _, _, start, end, _, _ = zone
+        a = first[:, np.newaxis, :2]
+        b = second[:, np.newaxis, :2]
+        c = start[np.newaxis]
+        d = end[np.newaxis]
+
+        # Segments cross edges if each one's end points are on opposite sides
+        # of the other.
+        crosses = ((_cross(a, b, c) * _cross(a, b, d) < 0.0) &
+                   (_cross(c, d, a) * _cross(c, d, b) < 0.0))
+        return ~crosses.any(axis=1)
+
+    def query(self, points):
+        """Checks whether points or a path are inside the fly zones.
+
+        Args:
+            points: List of geographic_msgs/GeoPoint. Altitudes are w.r.t. sea
+                level.
+
+        Returns:
+            Tuple of (path_inside, inside, distances), where path_inside is
+            whether the path going through every point in order stays inside
+            the fly zones, inside is an array of booleans of whether each point
+            is inside the fly zones, and distances is an array of the distance
+            of each point to the closest fly zone boundary in meters, positive
+            inside and negative outside.
+        """
+        if not points or not self.zones:
+            return False, np.zeros(len(points), bool), np.full(
+                len(points), -np.inf)
+
+        xyz = self._project(points)
+        distances = np.array([self._zone_distances(z, xyz) for z in self.zones])
+        inside = distances > 0.0
+
+        # Each segment needs to stay within a single zone, which is the case
+        # if both its end points are inside it and it crosses none of its
+        # edges, as the altitude limits are the same throughout the zone.
+        segments_inside = np.zeros(len(xyz) - 1, bool)
+        for zone, zone_inside in zip(self.zones, inside):
+            segments = np.flatnonzero(zone_inside[:-1] & zone_inside[1:])
+            if len(segments):
+                segments_inside[segments] |= self._segments_inside(
+                    zone, xyz[segments], xyz[segments + 1])
+
+        inside = inside.any(axis=0)
+        path_inside = bool(inside.all() and segments_inside.all())
+        return path_inside, inside, distances.max(axis=0)
@@ -0,0 +1,800 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Local interoperability server for load testing.
+
+Unlike the InteroperabilityMockServer, this is a real HTTP server that the
+nodes can be launched against. It implements the interop API endpoints used
+by the InteroperabilityClient, with configurable latency, error rate, session
+expiry and payload sizes, and keeps statistics of the requests it served.
+
+Faults can also be scheduled to reproduce production failures, such as 403
+storms, stalled connections, slow bodies, 5xx bursts and truncated JSON, see
+Fault. Schedules are loaded from a JSON list of Fault arguments, e.g.:
+
+    [{"kind": "forbidden", "start": 10, "duration": 5, "period": 60},
+     {"kind": "stall", "start": 30, "duration": 2, "endpoints": ["telemetry"]}]
+
+Run it, and point the nodes to it as follows:
+
+    rosrun interop local_server.py --port 8000 --latency 0.05
+    roslaunch interop interop.launch base_url:=http://127.0.0.1:8000
+
+The statistics are served as JSON at /stats, and printed on exit.
+"""
+
+from __future__ import division, print_function
+
+import re
+import six
+import json
+import math
+import time
+import uuid
+import random
+import argparse
+import threading
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.http_cookies import SimpleCookie
+from six.moves.urllib.parse import parse_qs
+
+# Center of the generated mission.
+LATITUDE = 38.145
+LONGITUDE = -76.428
+
+# Name of the session cookie.
+SESSION_COOKIE = "sessionid"
+
+
+def generate_point(rng, radius=0.01):
+    """Generates a random position around the mission's center.
+
+    Args:
+        rng: Random number generator.
+        radius: Maximum distance from the center in degrees.
+
+    Returns:
+        A dictionary with a latitude and longitude.
+    """
+    return {
+        "latitude": LATITUDE + rng.uniform(-radius, radius),
+        "longitude": LONGITUDE + rng.uniform(-radius, radius)
+    }
+
+
+def generate_mission(rng, id, active, waypoints):
+    """Generates a mission.
+
+    Args:
+        rng: Random number generator.
+        id: Mission ID.
+        active: Whether the mission is active.
+        waypoints: Number of waypoints and search grid points.
+
+    Returns:
+        Mission dictionary.
+    """
+
+    def generate_points(n):
+        points = []
+        for i in range(n):
+            point = generate_point(rng)
+            point["altitude_msl"] = rng.uniform(100.0, 750.0)
+            point["order"] = i + 1
+            points.append(point)
+        return points
+
+    boundary_pts = [
+        dict(generate_point(rng), order=i + 1) for i in range(waypoints)
+    ]
+    return {
+        "id":
+            id,
+        "active":
+            active,
+        "air_drop_pos":
+            generate_point(rng),
+        "fly_zones": [{
+            "altitude_msl_max": 750.0,
+            "altitude_msl_min": 100.0,
+            "boundary_pts": boundary_pts
+        }],
+        "home_pos":
+            generate_point(rng),
+        "mission_waypoints":
+            generate_points(waypoints),
+        "off_axis_odlc_pos":
+            generate_point(rng),
+        "emergent_last_known_pos":
+            generate_point(rng),
+        "search_grid_points":
+            generate_points(waypoints)
+    }
+
+
+def generate_stationary_obstacles(rng, n):
+    """Generates stationary obstacles.
+
+    Args:
+        rng: Random number generator.
+        n: Number of obstacles.
+
+    Returns:
+        List of stationary obstacle dictionaries.
+    """
+    return [
+        dict(
+            generate_point(rng),
+            cylinder_height=rng.uniform(100.0, 750.0),
+            cylinder_radius=rng.uniform(30.0, 300.0)) for _ in range(n)
+    ]
+
+
+class MovingObstacles(object):
+
+    """Moving obstacles flying in circles around the mission's center."""
+
+    def __init__(self, rng, n):
+        """Constructs MovingObstacles.
+
+        Args:
+            rng: Random number generator.
+            n: Number of obstacles.
+        """
+        self.obstacles = [(generate_point(rng), rng.uniform(0.001, 0.005),
+                           rng.uniform(0.05, 0.5), rng.uniform(100.0, 750.0),
+                           rng.uniform(30.0, 300.0)) for _ in range(n)]
+
+    def at(self, t):
+        """Computes the moving obstacles at a given time.
+
+        Args:
+            t: Time in seconds.
+
+        Returns:
+            List of moving obstacle dictionaries.
+        """
+        return [{
+            "latitude": center["latitude"] + radius * math.sin(speed * t),
+            "longitude": center["longitude"] + radius * math.cos(speed * t),
+            "altitude_msl": altitude,
+            "sphere_radius": sphere_radius
+        } for center, radius, speed, altitude, sphere_radius in self.obstacles]
+
+
+class Fault(object):
+
+    """Fault injected into the responses of some endpoints for some time.
+
+    The kinds of faults are:
+        forbidden: Responds with 403 as if the session had expired. Logging in
+            is never affected, so that clients can recover by logging in again.
+        error: Responds with the given status code.
+        stall: Holds the connection open for the given delay, and then closes
+            it without responding.
+        slow_body: Sends the response body in chunks spread over the given
+            delay.
+        truncate: Sends only the first half of JSON response bodies.
+    """
+
+    KINDS = ("forbidden", "error", "stall", "slow_body", "truncate")
+
+    # Number of chunks slow bodies are sent in.
+    CHUNKS = 10
+
+    def __init__(self,
+                 kind,
+                 start=0.0,
+                 duration=None,
+                 period=None,
+                 endpoints=None,
+                 probability=1.0,
+                 status=503,
+                 delay=1.0):
+        """Constructs a Fault.
+
+        Args:
+            kind: Kind of fault.
+            start: Time the fault starts at in seconds since the server
+                started.
+            duration: Time the fault lasts for in seconds, or None to last
+                forever.
+            period: Time the fault repeats every in seconds, or None to never
+                repeat.
+            endpoints: Names of the endpoints affected, or None for all of
+                them.
+            probability: Probability of affecting each request while active.
+            status: Status code to respond with for error faults.
+            delay: Time in seconds to stall for, or to send slow bodies over.
+
+        Raises:
+            ValueError: On unknown kind of fault.
+        """
+        if kind not in self.KINDS:
+            raise ValueError("Unknown fault: {}".format(kind))
+
+        self.kind = kind
+        self.start = start
+        self.duration = duration
+        self.period = period
+        self.endpoints = endpoints
+        self.probability = probability
+        self.status = status
+        self.delay = delay
+
+    def is_active(self, endpoint, t):
+        """Checks whether the fault affects a request.
+
+        Args:
+            endpoint: Endpoint name.
+            t: Time of the request in seconds since the server started.
+
+        Returns:
+            Whether the fault affects the request.
+        """
+        if self.endpoints is not None and endpoint not in self.endpoints:
+            return False
+        if self.kind == "forbidden" and endpoint == "login":
+            return False
+        if t < self.start:
+            return False
+
+        t -= self.start
+        if self.period:
+            t %= self.period
+        if self.duration is not None and t >= self.duration:
+            return False
+
+        return random.random() < self.probability
+
+
+class FaultSchedule(object):
+
+    """Schedule of faults to inject."""
+
+    def __init__(self, faults=()):
+        """Constructs a FaultSchedule.
+
+        Args:
+            faults: List of Faults, by order of precedence.
+        """
+        self.faults = list(faults)
+
+    @classmethod
+    def from_file(cls, path):
+        """Loads a fault schedule from a JSON list of Fault arguments.
+
+        Args:
+            path: Path to the JSON file.
+
+        Returns:
+            FaultSchedule.
+
+        Raises:
+            ValueError: On invalid schedule.
+        """
+        with open(path) as f:
+            return cls(Fault(**fault) for fault in json.load(f))
+
+    def find(self, endpoint, t):
+        """Finds the fault affecting a request, if any.
+
+        Args:
+            endpoint: Endpoint name.
+            t: Time of the request in seconds since the server started.
+
+        Returns:
+            Fault, or None.
+        """
+        for fault in self.faults:
+            if fault.is_active(endpoint, t):
+                return fault
+        return None
+
+
+class Statistics(object):
+
+    """Thread-safe request statistics."""
+
+    def __init__(self):
+        """Constructs Statistics."""
+        self.lock = threading.Lock()
+        self.start = time.time()
+        self.endpoints = {}
+
+    def add(self,
+            endpoint,
+            status,
+            duration,
+            fault=None,
+            bytes_in=0,
+            bytes_out=0):
+        """Records a request.
+
+        Args:
+            endpoint: Endpoint name.
+            status: Response status code, or None if no response was sent.
+            duration: Time taken to respond in seconds.
+            fault: Fault injected into the response, if any.
+            bytes_in: Size of the request body in bytes.
+            bytes_out: Size of the response body in bytes.
+        """
+        with self.lock:
+            stats = self.endpoints.setdefault(
+                endpoint, {
+                    "requests": 0,
+                    "errors": 0,
+                    "faults": 0,
+                    "bytes_in": 0,
+                    "bytes_out": 0,
+                    "total_time": 0.0,
+                    "max_time": 0.0
+                })
+            stats["requests"] += 1
+            stats["errors"] += status is None or status >= 400
+            stats["faults"] += fault is not None
+            stats["bytes_in"] += bytes_in
+            stats["bytes_out"] += bytes_out
+            stats["total_time"] += duration
+            stats["max_time"] = max(stats["max_time"], duration)
+
+    def to_dict(self):
+        """Returns the statistics as a dictionary."""
+        with self.lock:
+            elapsed = time.time() - self.start
+            endpoints = {}
+            for endpoint, stats in self.endpoints.items():
+                endpoints[endpoint] = dict(
+                    stats,
+                    rate=stats["requests"] / elapsed,
+                    mean_time=stats["total_time"] / stats["requests"])
+            return {"elapsed": elapsed, "endpoints": endpoints}
+
+
+class LocalInteropServer(socketserver.ThreadingMixIn,
+                         BaseHTTPServer.HTTPServer):
+
+    """Local interoperability server.
+
+    Every request is handled in its own thread.
+
+    Attributes:
+        missions: List of mission dictionaries.
+        stationary_obstacles: List of stationary obstacle dictionaries.
+        moving_obstacles: MovingObstacles.
+        objects: Dictionary of object IDs to object dictionaries.
+        images: Dictionary of object IDs to images.
+        telemetry: Number of telemetry messages received.
+        on_telemetry: Optional function called with every telemetry
+            dictionary received, and the time it was received at.
+        faults: FaultSchedule.
+        stats: Statistics.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self,
+                 address,
+                 latency=0.0,
+                 jitter=0.0,
+                 error_rate=0.0,
+                 session_lifetime=None,
+                 missions=1,
+                 waypoints=20,
+                 stationary=20,
+                 moving=5,
+                 seed=0,
+                 faults=None):
+        """Constructs a LocalInteropServer.
+
+        Args:
+            address: (host, port) tuple to listen on.
+            latency: Time to wait before responding in seconds.
+            jitter: Maximum random time added to the latency in seconds.
+            error_rate: Probability of responding to an authenticated request
+                with an internal server error.
+            session_lifetime: Time after which sessions expire in seconds, or
+                None to never expire them.
+            missions: Number of missions to generate. The first one is active.
+            waypoints: Number of waypoints, search grid points and fly zone
+                boundary points of each mission.
+            stationary: Number of stationary obstacles.
+            moving: Number of moving obstacles.
+            seed: Random seed for the generated payloads.
+            faults: FaultSchedule to inject, timed from when the server is
+                constructed.
+        """
+        BaseHTTPServer.HTTPServer.__init__(self, address, RequestHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.session_lifetime = session_lifetime
+        self.faults = faults or FaultSchedule()
+        self.start = time.time()
+
+        rng = random.Random(seed)
+        self.missions = [
+            generate_mission(rng, i + 1, i == 0, waypoints)
+            for i in range(missions)
+        ]
+        self.stationary_obstacles = generate_stationary_obstacles(
+            rng, stationary)
+        self.moving_obstacles = MovingObstacles(rng, moving)
+
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.objects = {}
+        self.images = {}
+        self.next_object_id = 1
+        self.telemetry = 0
+        self.on_telemetry = None
+        self.stats = Statistics()
+
+    def login(self):
+        """Starts a new session.
+
+        Returns:
+            Session ID.
+        """
+        session = uuid.uuid4().hex
+        expiry = None
+        if self.session_lifetime is not None:
+            expiry = time.time() + self.session_lifetime
+        with self.lock:
+            self.sessions[session] = expiry
+        return session
+
+    def is_authenticated(self, session):
+        """Checks whether a session is valid.
+
+        Args:
+            session: Session ID.
+
+        Returns:
+            Whether the session exists and has not expired.
+        """
+        with self.lock:
+            if session not in self.sessions:
+                return False
+            expiry = self.sessions[session]
+            if expiry is not None and time.time() > expiry:
+                del self.sessions[session]
+                return False
+            return True
+
+
+class RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    """Local interoperability server request handler."""
+
+    # Keep connections alive like the interop server does.
+    protocol_version = "HTTP/1.1"
+
+    # Routes as (method, pattern, endpoint name, handler name).
+    ROUTES = [
+        (method, re.compile(pattern + "$"), endpoint, handler)
+        for method, pattern, endpoint, handler in [
+            ("GET", r"/", "root", "handle_root"),
+            ("GET", r"/stats", "stats", "handle_stats"),
+            ("POST", r"/api/login", "login", "handle_login"),
+            ("GET", r"/api/missions", "missions", "handle_missions"),
+            ("GET", r"/api/missions/(\d+)", "mission", "handle_mission"),
+            ("GET", r"/api/obstacles", "obstacles", "handle_obstacles"),
+            ("POST", r"/api/telemetry", "telemetry", "handle_telemetry"),
+            ("GET", r"/api/odlcs", "odlcs", "handle_get_objects"),
+            ("POST", r"/api/odlcs", "odlcs", "handle_post_object"),
+            ("GET", r"/api/odlcs/(\d+)", "odlc", "handle_get_object"),
+            ("PUT", r"/api/odlcs/(\d+)", "odlc", "handle_put_object"),
+            ("DELETE", r"/api/odlcs/(\d+)", "odlc", "handle_delete_object"),
+            ("GET", r"/api/odlcs/(\d+)/image", "image", "handle_get_image"),
+            ("POST", r"/api/odlcs/(\d+)/image", "image", "handle_post_image"),
+            ("PUT", r"/api/odlcs/(\d+)/image", "image", "handle_post_image"),
+            ("DELETE", r"/api/odlcs/(\d+)/image", "image",
+             "handle_delete_image"),
+        ]
+    ]
+
+    def log_message(self, format, *args):
+        """Silences the default logging of every request."""
+        pass
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PUT(self):
+        self.dispatch("PUT")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        """Routes a request to its handler, and records statistics.
+
+        Args:
+            method: HTTP method.
+        """
+        start = time.time()
+        path = self.path.split("?")[0]
+        self.body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.bytes_out = 0
+
+        for route_method, pattern, endpoint, handler in self.ROUTES:
+            match = pattern.match(path)
+            if match and route_method == method:
+                break
+        else:
+            endpoint = "unknown"
+            handler = None
+
+        # Simulate network and processing latency.
+        delay = self.server.latency + random.uniform(0.0, self.server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        # Only the interop API is affected by faults and errors.
+        api = path.startswith("/api/")
+        self.fault = None
+        if api:
+            self.fault = self.server.faults.find(endpoint,
+                                                 start - self.server.start)
+        kind = self.fault.kind if self.fault else None
+
+        # Every endpoint of the interop API requires logging in first.
+        authenticated = not api or endpoint == "login" or \
+            self.server.is_authenticated(self.get_session())
+
+        if handler is None:
+            status = self.respond(404)
+        elif kind == "stall":
+            time.sleep(self.fault.delay)
+            self.close_connection = True
+            status = None
+        elif kind == "error":
+            status = self.respond(self.fault.status, b"Simulated fault.")
+        elif kind == "forbidden" or not authenticated:
+            status = self.respond(403, b"Authentication required.")
+        elif api and random.random() < self.server.error_rate:
+            status = self.respond(500, b"Simulated error.")
+        else:
+            status = getattr(self, handler)(*match.groups())
+
+        self.server.stats.add(endpoint, status,
+                              time.time() - start, self.fault, len(self.body),
+                              self.bytes_out)
+
+    def get_session(self):
+        """Returns the session ID from the request's cookies, if any."""
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        if SESSION_COOKIE in cookie:
+            return cookie[SESSION_COOKIE].value
+        return None
+
+    def respond(self, status, body=b"", content_type="text/plain",
+                headers=None):
+        """Sends a response.
+
+        Args:
+            status: Status code.
+            body: Response body.
+            content_type: Content type of the body.
+            headers: Optional dictionary of additional headers.
+
+        Returns:
+            Status code.
+        """
+        kind = self.fault.kind if self.fault else None
+        if kind == "truncate" and content_type == "application/json":
+            body = body[:len(body) // 2]
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in six.iteritems(headers or {}):
+            self.send_header(key, value)
+        self.end_headers()
+        self.bytes_out = len(body)
+
+        if kind == "slow_body":
+            size = len(body) // Fault.CHUNKS + 1
+            for i in range(Fault.CHUNKS):
+                time.sleep(self.fault.delay / Fault.CHUNKS)
+                self.wfile.write(body[i * size:(i + 1) * size])
+                self.wfile.flush()
+        else:
+            self.wfile.write(body)
+        return status
+
+    def respond_json(self, obj):
+        """Sends a JSON response.
+
+        Args:
+            obj: Object to encode.
+
+        Returns:
+            Status code.
+        """
+        body = json.dumps(obj).encode("utf-8")
+        return self.respond(200, body, "application/json")
+
+    def handle_root(self):
+        return self.respond(200)
+
+    def handle_stats(self):
+        return self.respond_json(self.server.stats.to_dict())
+
+    def handle_login(self):
+        form = parse_qs(self.body.decode("utf-8"))
+        if "username" not in form or "password" not in form:
+            return self.respond(400, b"Invalid credentials.")
+
+        session = self.server.login()
+        cookie = "{}={}; Path=/".format(SESSION_COOKIE, session)
+        return self.respond(
+            200, b"Login Successful.", headers={"Set-Cookie": cookie})
+
+    def handle_missions(self):
+        return self.respond_json(self.server.missions)
+
+    def handle_mission(self, id):
+        for mission in self.server.missions:
+            if mission["id"] == int(id):
+                return self.respond_json(mission)
+        return self.respond(404, b"Mission not found.")
+
+    def handle_obstacles(self):
+        return self.respond_json({
+            "moving_obstacles": self.server.moving_obstacles.at(time.time()),
+            "stationary_obstacles": self.server.stationary_obstacles
+        })
+
+    def handle_telemetry(self):
+        if self.server.on_telemetry is not None:
+            form = parse_qs(self.body.decode("utf-8"))
+            data = {key: values[0] for key, values in form.items()}
+            self.server.on_telemetry(data, time.time())
+
+        with self.server.lock:
+            self.server.telemetry += 1
+        return self.respond(200, b"UAS Telemetry Successfully Posted.")
+
+    def handle_get_objects(self):
+        with self.server.lock:
+            objects = sorted(
+                self.server.objects.values(), key=lambda o: o["id"])
+        return self.respond_json(objects[:100])
+
+    def handle_post_object(self):
+        try:
+            obj = json.loads(self.body.decode("utf-8"))
+        except ValueError:
+            return self.respond(400, b"Invalid JSON.")
+
+        with self.server.lock:
+            obj["id"] = self.server.next_object_id
+            self.server.next_object_id += 1
+            self.server.objects[obj["id"]] = obj
+        return self.respond_json(obj)
+
+    def handle_get_object(self, id):
+        with self.server.lock:
+            obj = self.server.objects.get(int(id))
+        if obj is None:
+            return self.respond(404, b"Object not found.")
+        return self.respond_json(obj)
+
+    def handle_put_object(self, id):
+        try:
+            update = json.loads(self.body.decode("utf-8"))
+        except ValueError:
+            return self.respond(400, b"Invalid JSON.")
+
+        with self.server.lock:
+            obj = self.server.objects.get(int(id))
+            if obj is not None:
+                obj.update(update)
+                obj["id"] = int(id)
+        if obj is None:
+            return self.respond(404, b"Object not found.")
+        return self.respond_json(obj)
+
+    def handle_delete_object(self, id):
+        with self.server.lock:
+            obj = self.server.objects.pop(int(id), None)
+            self.server.images.pop(int(id), None)
+        if obj is None:
+            return self.respond(404, b"Object not found.")
+        return self.respond(200, b"Object deleted.")
+
+    def handle_get_image(self, id):
+        with self.server.lock:
+            image = self.server.images.get(int(id))
+        if image is None:
+            return self.respond(404, b"Image not found.")
+        return self.respond(200, image, "image/png")
+
+    def handle_post_image(self, id):
+        with self.server.lock:
+            if int(id) not in self.server.objects:
+                image = None
+            else:
+                image = self.server.images[int(id)] = self.body
+        if image is None:
+            return self.respond(404, b"Object not found.")
+        return self.respond(200, b"Image uploaded.")
+
+    def handle_delete_image(self, id):
+        with self.server.lock:
+            image = self.server.images.pop(int(id), None)
+        if image is None:
+            return self.respond(404, b"Image not found.")
+        return self.respond(200, b"Image deleted.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="host to bind")
+    parser.add_argument("--port", type=int, default=8000, help="port to bind")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="response latency in s")
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.0,
+        help="maximum random latency added in s")
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="probability of internal server errors")
+    parser.add_argument(
+        "--session-lifetime",
+        type=float,
+        default=None,
+        help="time after which sessions expire in s")
+    parser.add_argument(
+        "--missions", type=int, default=1, help="number of missions")
+    parser.add_argument(
+        "--waypoints", type=int, default=20, help="number of waypoints")
+    parser.add_argument(
+        "--stationary",
+        type=int,
+        default=20,
+        help="number of stationary obstacles")
+    parser.add_argument(
+        "--moving", type=int, default=5, help="number of moving obstacles")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--faults", help="path to a JSON fault schedule")
+    args, _ = parser.parse_known_args()
+
+    faults = None
+    if args.faults:
+        faults = FaultSchedule.from_file(args.faults)
+
+    server = LocalInteropServer(
+        (args.host, args.port),
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        session_lifetime=args.session_lifetime,
+        missions=args.missions,
+        waypoints=args.waypoints,
+        stationary=args.stationary,
+        moving=args.moving,
+        seed=args.seed,
+        faults=faults)
+    print("Serving on http://{}:{}".format(*server.server_address))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats.to_dict(), indent=4, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Offline mission bundle tests."""
+
+import os
+import json
+import rospy
+import shutil
+import rosunit
+import tempfile
+from unittest import TestCase
+from interop import serializers
+from interop.client import OfflineInteroperabilityClient
+from interop.bundle import Bundle, message_key, write_bundle
+
+# yapf: disable
+MISSIONS = [{
+    "id": 1,
+    "active": False,
+    "air_drop_pos": {"latitude": 38.141833, "longitude": -76.425263},
+    "fly_zones": [{
+        "altitude_msl_max": 200.0,
+        "altitude_msl_min": 100.0,
+        "boundary_pts": [
+            {"latitude": 38.142544, "longitude": -76.434088, "order": 1},
+            {"latitude": 38.141833, "longitude": -76.425263, "order": 2},
+            {"latitude": 38.144678, "longitude": -76.427995, "order": 3},
+        ]
+    }],
+    "home_pos": {"latitude": 38.14792, "longitude": -76.427995},
+    "mission_waypoints": [
+        {"altitude_msl": 200.0, "latitude": 38.142544,
+         "longitude": -76.434088, "order": 1},
+    ],
+    "off_axis_odlc_pos": {"latitude": 38.142544, "longitude": -76.434088},
+    "emergent_last_known_pos": {"latitude": 38.145823,
+                                "longitude": -76.422396},
+    "search_grid_points": [
+        {"altitude_msl": 200.0, "latitude": 38.142544,
+         "longitude": -76.434088, "order": 1},
+    ]
+}]
+# yapf: enable
+
+MISSIONS.append(dict(MISSIONS[0], id=2, active=True))
+
+OBSTACLES = {
+    "moving_obstacles": [],
+    "stationary_obstacles": [{
+        "cylinder_height": 750.0,
+        "cylinder_radius": 300.0,
+        "latitude": 38.14792,
+        "longitude": -76.427995
+    }]
+}
+
+
+class TestBundle(TestCase):
+
+    """Tests offline mission bundles."""
+
+    def setUp(self):
+        """Sets up a temporary directory with a bundle."""
+        self.path = tempfile.mkdtemp()
+        self.bundle_path = os.path.join(
+            self.path, OfflineInteroperabilityClient.BUNDLE_PATH)
+        write_bundle(self.bundle_path, MISSIONS, OBSTACLES)
+
+    def tearDown(self):
+        """Deletes the temporary directory."""
+        shutil.rmtree(self.path)
+
+    def test_round_trip(self):
+        """Tests the bundle holds what was written."""
+        bundle = Bundle(self.bundle_path)
+        self.assertEqual(sorted(bundle), [1, 2])
+        self.assertEqual(bundle.active, [2])
+        self.assertEqual(bundle[1], MISSIONS[0])
+        self.assertEqual(bundle[2], MISSIONS[1])
+        self.assertEqual(bundle.obstacles(), OBSTACLES)
+        with self.assertRaises(KeyError):
+            bundle[3]
+        bundle.close()
+
+    def test_invalid(self):
+        """Tests loading invalid bundles fails."""
+        with open(self.bundle_path, "wb") as f:
+            f.write(b"[]")
+        with self.assertRaises(ValueError):
+            Bundle(self.bundle_path)
+
+    def test_offline_client(self):
+        """Tests the offline client loads missions from the bundle."""
+        client = OfflineInteroperabilityClient(self.path)
+
+        home = client.get_active_mission("map")[6]
+        self.assertEqual(home.position.latitude, 38.14792)
+
+        missions = client.get_all_missions("map")
+        self.assertEqual(sorted(missions), [1, 2])
+
+        with self.assertRaises(LookupError):
+            client.get_mission(3, "map")
+
+        _, stationary = client.get_obstacles("map", 1.0)
+        self.assertEqual(len(stationary.cylinders), 1)
+
+    def test_stale_bundle(self):
+        """Tests the offline client ignores bundles older than the JSON."""
+        home_pos = {"latitude": 0.0, "longitude": 0.0}
+        missions = [dict(m, home_pos=home_pos) for m in MISSIONS]
+        for name, data in (
+            (OfflineInteroperabilityClient.MISSIONS_PATH, missions),
+            (OfflineInteroperabilityClient.OBSTACLES_PATH, OBSTACLES),
+        ):
+            path = os.path.join(self.path, name)
+            with open(path, "w") as f:
+                json.dump(data, f)
+
+            # Make sure the JSON is newer than the bundle.
+            mtime = os.path.getmtime(self.bundle_path) + 1.0
+            os.utime(path, (mtime, mtime))
+
+        client = OfflineInteroperabilityClient(self.path)
+        home = client.get_active_mission("map")[6]
+        self.assertEqual(home.position.latitude, 0.0)
+
+        # A bundle written afterwards is used again.
+        write_bundle(self.bundle_path, MISSIONS, OBSTACLES)
+        mtime = os.path.getmtime(self.bundle_path) + 2.0
+        os.utime(self.bundle_path, (mtime, mtime))
+        client = OfflineInteroperabilityClient(self.path)
+        home = client.get_active_mission("map")[6]
+        self.assertEqual(home.position.latitude, 38.14792)
+
+    def test_messages(self):
+        """Tests caching ROS messages."""
+        moving, stationary = serializers.ObstaclesDeserializer.from_dict(
+            OBSTACLES, "map", 0.0)
+        messages = {
+            message_key("map", "obstacles", 0): moving,
+            message_key("map", "obstacles", 1): stationary,
+        }
+        write_bundle(self.bundle_path, MISSIONS, OBSTACLES, messages)
+
+        bundle = Bundle(self.bundle_path)
+        self.assertEqual(bundle[1], MISSIONS[0])
+        self.assertEqual(bundle.obstacles(), OBSTACLES)
+        self.assertEqual(
+            bundle.message(
+                message_key("map", "obstacles", 1), type(stationary)),
+            stationary)
+        self.assertIsNone(
+            bundle.message(
+                message_key("earth", "obstacles", 1), type(stationary)))
+        bundle.close()
+
+    def test_stale_messages(self):
+        """Tests messages cached with another definition are ignored."""
+        mission = serializers.MissionDeserializer.from_dict(MISSIONS[1], "map")
+        home_type = type(mission[6])
+
+        # Cache the home position as if its definition were different.
+        class StaleHome(home_type):
+            _md5sum = "0" * 32
+
+        home = StaleHome()
+        home.position.latitude = 0.0
+        mission = mission[:6] + (home,) + mission[7:]
+        messages = {
+            message_key("map", "missions", 2, i): msg
+            for i, msg in enumerate(mission)
+        }
+        write_bundle(self.bundle_path, MISSIONS, OBSTACLES, messages)
+
+        bundle = Bundle(self.bundle_path)
+        self.assertIsNone(
+            bundle.message(message_key("map", "missions", 2, 6), home_type))
+        self.assertIsNotNone(
+            bundle.message(
+                message_key("map", "missions", 2, 0), type(mission[0])))
+        bundle.close()
+
+        # The offline client falls back to building them from JSON.
+        client = OfflineInteroperabilityClient(self.path)
+        home = client.get_mission(2, "map")[6]
+        self.assertEqual(home.position.latitude, 38.14792)
+
+    def test_offline_client_messages(self):
+        """Tests the offline client uses the cached ROS messages."""
+        mission = serializers.MissionDeserializer.from_dict(MISSIONS[1], "map")
+        mission[6].position.latitude = 0.0
+        messages = {
+            message_key("map", "missions", 2, i): msg
+            for i, msg in enumerate(mission)
+        }
+        write_bundle(self.bundle_path, MISSIONS, OBSTACLES, messages)
+        client = OfflineInteroperabilityClient(self.path)
+
+        # Cached messages are used, and stamped with the current time.
+        before = rospy.get_rostime()
+        home = client.get_mission(2, "map")[6]
+        self.assertEqual(home.position.latitude, 0.0)
+        self.assertGreaterEqual(home.header.stamp, before)
+        home = client.get_all_missions("map")[2][6]
+        self.assertEqual(home.position.latitude, 0.0)
+
+        # Other missions and frames are built from JSON.
+        home = client.get_mission(1, "map")[6]
+        self.assertEqual(home.position.latitude, 38.14792)
+        home = client.get_mission(2, "earth")[6]
+        self.assertEqual(home.position.latitude, 38.14792)
+
+
+if __name__ == "__main__":
+    rospy.init_node("test_bundle")
+    rosunit.unitrun("test_bundle", "test_bundle", TestBundle)
@@ -10,9 +10,11 @@ from cv_bridge import CvBridge
 from mavros_msgs.msg import Altitude
 from sensor_msgs.msg import NavSatFix
 from geometry_msgs.msg import PoseStamped
+from requests.exceptions import HTTPError
 from interop.client import InteroperabilityClient
 from mock_server import InteroperabilityMockServer
 from interop.serializers import ObjectImageSerializer
+from interop.metrics import LATENCY_BUCKETS, RequestMetrics
 
 
 class TestInteroperabilityClient(TestCase):
@@ -192,7 +194,82 @@ class TestInteroperabilityClient(TestCase):
             client.get_object_image(object_id)
             client.delete_object_image(object_id)
 
+    def test_metrics(self):
+        """Tests request metrics are recorded per endpoint."""
+        # Set up test data.
+        url = "http://interop"
+        client_args = (url, "testuser", "testpass", 1.0)
+
+        with InteroperabilityMockServer(url) as server:
+            # Setup mock server.
+            server.set_root_response()
+            server.set_login_response()
+            server.set_telemetry_response()
+            server.set_delete_object_response(1)
+            server.set_delete_object_response(2, code=500)
+
+            # Connect client.
+            pose_stamped = PoseStamped()
+            pose_stamped.pose.orientation.w = 1.0
+            client = InteroperabilityClient(*client_args)
+            client.wait_for_server()
+            client.login()
+            client.post_telemetry(NavSatFix(), Altitude(), pose_stamped)
+            client.delete_object(1)
+            with self.assertRaises(HTTPError):
+                client.delete_object(2)
+
+        relogins, endpoints = client.metrics.snapshot()
+        self.assertEqual(relogins, 0)
+        self.assertEqual(endpoints["POST /api/login"].statuses, {200: 1})
+        self.assertGreater(endpoints["POST /api/telemetry"].bytes_out, 0)
+
+        deletes = endpoints["DELETE /api/odlcs/{id}"]
+        self.assertEqual(deletes.requests, 2)
+        self.assertEqual(deletes.statuses, {200: 1, 500: 1})
+        self.assertEqual(deletes.last_status, 500)
+
+
+class TestRequestMetrics(TestCase):
+
+    """Tests request metrics."""
+
+    def test_endpoint(self):
+        """Tests IDs are aggregated into a single endpoint."""
+        self.assertEqual(
+            RequestMetrics.endpoint("GET", "/api/odlcs/12/image"),
+            "GET /api/odlcs/{id}/image")
+        self.assertEqual(
+            RequestMetrics.endpoint("GET", "/api/missions/3"),
+            "GET /api/missions/{id}")
+        self.assertEqual(
+            RequestMetrics.endpoint("GET", "/api/obstacles"),
+            "GET /api/obstacles")
+
+    def test_histogram(self):
+        """Tests latencies are bucketed and percentiles estimated."""
+        metrics = RequestMetrics()
+        for _ in range(90):
+            metrics.record("GET", "/api/obstacles", 200, 0.003)
+        for _ in range(10):
+            metrics.record("GET", "/api/obstacles", None, 10.0)
+
+        _, endpoints = metrics.snapshot()
+        obstacles = endpoints["GET /api/obstacles"]
+        self.assertEqual(obstacles.requests, 100)
+        self.assertEqual(obstacles.failures, 10)
+        self.assertEqual(sum(obstacles.histogram), 100)
+        self.assertEqual(obstacles.histogram[-1], 10)
+        self.assertEqual(obstacles.percentile(50), 0.005)
+        self.assertEqual(obstacles.percentile(99), float("inf"))
+        self.assertAlmostEqual(obstacles.mean_latency(), 1.0027)
+
+        # Snapshots are not affected by later requests.
+        metrics.record("GET", "/api/obstacles", 200, LATENCY_BUCKETS[0])
+        self.assertEqual(obstacles.requests, 100)
+
 
 if __name__ == "__main__":
     rospy.init_node("test_client")
     rosunit.unitrun("test_client", "test_client", TestInteroperabilityClient)
+    rosunit.unitrun("test_client", "test_request_metrics", TestRequestMetrics)
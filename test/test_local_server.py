@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Local interoperability server fault injection tests."""
+
+import os
+import json
+import time
+import rospy
+import rosunit
+import shutil
+import tempfile
+import threading
+from unittest import TestCase, TestLoader, TestSuite
+from requests.exceptions import HTTPError, Timeout
+from interop.client import InteroperabilityClient
+from local_server import Fault, FaultSchedule, LocalInteropServer
+
+# Client request timeout in seconds.
+TIMEOUT = 0.5
+
+# Server latency in seconds, and number of threads for concurrency tests.
+LATENCY = 0.2
+THREADS = 8
+
+
+class TestFaultSchedule(TestCase):
+
+    """Tests fault schedules."""
+
+    def test_is_active(self):
+        """Tests when faults are active."""
+        fault = Fault("error", start=1.0, duration=1.0, period=3.0)
+        self.assertFalse(fault.is_active("odlcs", 0.5))
+        self.assertTrue(fault.is_active("odlcs", 1.5))
+        self.assertFalse(fault.is_active("odlcs", 2.5))
+        self.assertTrue(fault.is_active("odlcs", 4.5))
+
+        fault = Fault("error", endpoints=["telemetry"])
+        self.assertFalse(fault.is_active("odlcs", 0.0))
+        self.assertTrue(fault.is_active("telemetry", 1000.0))
+
+        fault = Fault("error", probability=0.0)
+        self.assertFalse(fault.is_active("odlcs", 0.0))
+
+    def test_forbidden_login(self):
+        """Tests logging in is never forbidden."""
+        fault = Fault("forbidden")
+        self.assertFalse(fault.is_active("login", 0.0))
+        self.assertTrue(fault.is_active("odlcs", 0.0))
+
+    def test_unknown_fault(self):
+        """Tests unknown faults are rejected."""
+        with self.assertRaises(ValueError):
+            Fault("unknown")
+
+    def test_from_file(self):
+        """Tests loading a fault schedule from JSON."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        path = os.path.join(directory, "faults.json")
+        with open(path, "w") as f:
+            json.dump([{
+                "kind": "stall",
+                "endpoints": ["telemetry"]
+            }, {
+                "kind": "error",
+                "start": 10.0,
+                "status": 502
+            }], f)
+
+        schedule = FaultSchedule.from_file(path)
+        self.assertEqual(schedule.find("telemetry", 0.0).kind, "stall")
+        self.assertIsNone(schedule.find("odlcs", 0.0))
+        self.assertEqual(schedule.find("odlcs", 10.0).status, 502)
+
+
+class TestFaultInjection(TestCase):
+
+    """Tests the client against the local server with faults injected."""
+
+    def start_server(self, *faults, **kwargs):
+        """Starts a local server, and logs in to it.
+
+        Args:
+            *faults: Faults to inject.
+            **kwargs: Additional key-word arguments to pass to the server.
+
+        Returns:
+            Tuple of (LocalInteropServer, InteroperabilityClient).
+        """
+        server = LocalInteropServer(
+            ("127.0.0.1", 0), faults=FaultSchedule(faults), **kwargs)
+        self.addCleanup(server.server_close)
+
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.shutdown)
+
+        url = "http://{}:{}".format(*server.server_address)
+        client = InteroperabilityClient(url, "testuser", "testpass", TIMEOUT)
+        client.login()
+        return server, client
+
+    def test_forbidden(self):
+        """Tests recovering from a 403 storm by logging in again."""
+        server, client = self.start_server(
+            Fault("forbidden", duration=1.0, endpoints=["odlcs"]))
+
+        self.assertEqual(client.get_all_objects(), {})
+        self.assertGreaterEqual(time.time() - server.start, 1.0)
+
+        stats = server.stats.to_dict()["endpoints"]
+        self.assertGreater(stats["login"]["requests"], 1)
+        self.assertGreater(stats["odlcs"]["faults"], 0)
+
+    def test_statistics(self):
+        """Tests request sizes and times are recorded."""
+        server, client = self.start_server(latency=LATENCY)
+        client.post_object(json.dumps({"type": "standard"}))
+
+        # Requests are only recorded once responded to.
+        time.sleep(LATENCY)
+        stats = server.stats.to_dict()["endpoints"]
+        self.assertGreater(stats["login"]["bytes_in"], 0)
+        self.assertEqual(stats["login"]["bytes_out"], len("Login Successful."))
+        self.assertGreater(stats["odlcs"]["bytes_in"], 0)
+        self.assertGreater(stats["odlcs"]["bytes_out"], 0)
+        for endpoint in ("login", "odlcs"):
+            self.assertEqual(stats[endpoint]["requests"], 1)
+            self.assertGreaterEqual(stats[endpoint]["mean_time"], LATENCY)
+
+    def test_concurrent_forbidden(self):
+        """Tests threads getting a 403 at once only log in again once."""
+        server, client = self.start_server(latency=LATENCY)
+
+        # Reject the requests sent from now on for less time than it takes to
+        # respond to them, so that only the first request of each thread is.
+        server.faults.faults.append(
+            Fault(
+                "forbidden",
+                start=time.time() - server.start,
+                duration=LATENCY / 2,
+                endpoints=["odlcs"]))
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(client.get_all_objects()))
+            for i in range(THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [{}] * THREADS)
+        relogins, _ = client.metrics.snapshot()
+        self.assertEqual(relogins, 1)
+
+        stats = server.stats.to_dict()["endpoints"]
+        self.assertEqual(stats["login"]["requests"], 2)
+        self.assertEqual(stats["odlcs"]["faults"], THREADS)
+
+    def test_error(self):
+        """Tests recovering from a 5xx burst."""
+        _, client = self.start_server(
+            Fault("error", duration=1.0, endpoints=["odlcs"], status=503))
+
+        with self.assertRaises(HTTPError) as context:
+            client.get_all_objects()
+        self.assertEqual(context.exception.response.status_code, 503)
+
+        time.sleep(1.0)
+        self.assertEqual(client.get_all_objects(), {})
+
+    def test_stall(self):
+        """Tests stalled connections time out."""
+        _, client = self.start_server(
+            Fault("stall", delay=2 * TIMEOUT, endpoints=["odlcs"]))
+
+        with self.assertRaises(Timeout):
+            client.get_all_objects()
+
+    def test_slow_body(self):
+        """Tests slow bodies are received whole."""
+        _, client = self.start_server(
+            Fault("slow_body", delay=TIMEOUT, endpoints=["odlc"]))
+
+        id = client.post_object(json.dumps({"type": "standard"}))
+        start = time.time()
+        obj = client.get_object(id)
+        self.assertGreaterEqual(time.time() - start, TIMEOUT)
+        self.assertEqual(obj, {"id": id, "type": "standard"})
+
+    def test_slow_body_integer_delay(self):
+        """Tests slow bodies are spread over integer delays."""
+        _, client = self.start_server(
+            Fault("slow_body", delay=1, endpoints=["odlc"]))
+
+        id = client.post_object(json.dumps({"type": "standard"}))
+        start = time.time()
+        obj = client.get_object(id)
+        self.assertGreaterEqual(time.time() - start, 1.0)
+        self.assertEqual(obj, {"id": id, "type": "standard"})
+
+    def test_truncate(self):
+        """Tests truncated JSON fails to decode."""
+        _, client = self.start_server(Fault("truncate", endpoints=["odlc"]))
+
+        id = client.post_object(json.dumps({"type": "standard"}))
+        with self.assertRaises(ValueError):
+            client.get_object(id)
+
+
+def suite():
+    """Returns a suite of every test case, to report them together."""
+    loader = TestLoader()
+    return TestSuite(
+        loader.loadTestsFromTestCase(case)
+        for case in (TestFaultSchedule, TestFaultInjection))
+
+
+if __name__ == "__main__":
+    rospy.init_node("test_local_server")
+    rosunit.unitrun("test_local_server", "test_local_server", "__main__.suite")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Node namespace and combined node tests."""
+
+import os
+import sys
+import rospy
+import shutil
+import rosunit
+import tempfile
+import threading
+from unittest import TestCase, TestLoader, TestSuite
+from geographic_msgs.msg import GeoPointStamped
+from interop.node import NodeNamespace, connect
+from local_server import LocalInteropServer
+
+# The nodes live in the scripts directory.
+sys.path.append(
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), os.pardir, "scripts"))
+import objects_server  # noqa: E402
+import missions_client  # noqa: E402
+import obstacles_client  # noqa: E402
+import telemetry_client  # noqa: E402
+
+# Namespace to run the combined node in.
+NAMESPACE = "/combined"
+
+# Time to wait for services and messages in seconds.
+TIMEOUT = 5.0
+
+
+class TestNodeNamespace(TestCase):
+
+    """Tests resolving names as another node would."""
+
+    def test_resolve(self):
+        """Tests private, relative and global names are resolved."""
+        ns = NodeNamespace("/interop/obstacles")
+        self.assertEqual(ns.resolve("~moving"), "/interop/obstacles/moving")
+        self.assertEqual(
+            ns.resolve("~stationary/nearby"),
+            "/interop/obstacles/stationary/nearby")
+        self.assertEqual(ns.resolve("nearby"), "/interop/nearby")
+        self.assertEqual(
+            ns.resolve("/mavros/global_position/global"),
+            "/mavros/global_position/global")
+
+    def test_resolve_root(self):
+        """Tests names are resolved for nodes in the root namespace."""
+        ns = NodeNamespace("/mission_info")
+        self.assertEqual(ns.resolve("~home"), "/mission_info/home")
+        self.assertEqual(
+            ns.resolve("get_active_mission"), "/get_active_mission")
+
+
+class TestCombinedNode(TestCase):
+
+    """Tests running every node in a single process with a shared client."""
+
+    def setUp(self):
+        """Starts a local server, and sets the nodes' parameters."""
+        self.server = LocalInteropServer(("127.0.0.1", 0))
+        self.addCleanup(self.server.server_close)
+
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.shutdown)
+
+        self.objects_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.objects_root)
+
+        os.environ["INTEROP_USERNAME"] = "testuser"
+        os.environ["INTEROP_PASSWORD"] = "testpass"
+
+        # yapf: disable
+        rospy.set_param(NAMESPACE, {
+            "client": {
+                "offline": False,
+                "base_url": "http://{}:{}".format(*self.server.server_address),
+                "timeout": 1.0,
+                "verify": True,
+            },
+            "obstacles": {
+                "moving_topic": "~moving",
+                "stationary_topic": "~stationary",
+                "navsat_topic": "/navsat",
+                "altitude_topic": "/altitude",
+                "period": 0.1,
+                "frame": "map",
+            },
+            "telemetry": {
+                "sync_queue_size": 12,
+                "max_sync_delay": 1,
+                "navsat_topic": "/navsat",
+                "altitude_topic": "/altitude",
+                "pose_topic": "/pose",
+            },
+            "objects": {
+                "objects_root": self.objects_root,
+                "interop_update_period": 1.0,
+            },
+            "mission_info": {
+                "flyzones_topic": "~flyzones",
+                "search_grid_topic": "~search_grid",
+                "waypoints_topic": "~waypoints",
+                "air_drop_topic": "~air_drop",
+                "off_axis_obj_topic": "~off_axis_obj",
+                "emergent_obj_topic": "~emergent_obj",
+                "home_topic": "~home",
+                "period": 0.1,
+                "frame": "map",
+                "id": -1,
+            },
+        })
+        # yapf: enable
+
+    def test_start(self):
+        """Tests every node starts with one shared client."""
+        client = connect(NodeNamespace(NAMESPACE + "/client"))
+        for name, node in (("obstacles", obstacles_client), ("telemetry",
+                                                             telemetry_client),
+                           ("objects", objects_server), ("mission_info",
+                                                         missions_client)):
+            node.start(client, NodeNamespace(NAMESPACE + "/" + name))
+
+        # Every node advertises in its own namespace.
+        rospy.wait_for_service(NAMESPACE + "/obstacles/nearby", TIMEOUT)
+        rospy.wait_for_service(NAMESPACE + "/objects/all", TIMEOUT)
+        rospy.wait_for_service(NAMESPACE + "/get_active_mission", TIMEOUT)
+        rospy.wait_for_message(NAMESPACE + "/mission_info/home",
+                               GeoPointStamped, TIMEOUT)
+
+        # The client only logged in once for all of them.
+        stats = self.server.stats.to_dict()["endpoints"]
+        self.assertEqual(stats["login"]["requests"], 1)
+        self.assertGreater(stats["missions"]["requests"], 0)
+        self.assertGreater(stats["odlcs"]["requests"], 0)
+
+
+def suite():
+    """Returns a suite of every test case, to report them together."""
+    loader = TestLoader()
+    return TestSuite(
+        loader.loadTestsFromTestCase(case)
+        for case in (TestNodeNamespace, TestCombinedNode))
+
+
+if __name__ == "__main__":
+    rospy.init_node("test_node")
+    rosunit.unitrun("test_node", "test_node", "__main__.suite")
@@ -14,7 +14,7 @@ import numpy as np
 from PIL import Image
 from interop.client import InteroperabilityClient
 from mock_server import InteroperabilityMockServer
-from interop.local_objects import Object
+from interop.local_objects import Object, ObjectsDirectory
 
 
 def generate_image():
@@ -148,6 +148,94 @@ class TestObject(unittest.TestCase):
         # Try to delete a previously deleted image.
         self.assertRaises(OSError, self.object.delete_image)
 
+    def test_batch_objects(self):
+        """Tests adding, updating, and deleting several objects at once."""
+        path = os.path.join(self.objects_dir, "batch")
+        os.mkdir(path)
+        objects_dir = ObjectsDirectory(path, self.client, offline=True)
+
+        # Add objects.
+        json_data = json.dumps(self.object_data)
+        file_ids = objects_dir.add_objects([json_data] * 3)
+        self.assertEqual(file_ids, [1, 2, 3])
+        for file_id in file_ids:
+            self.assertEqual(
+                json.loads(objects_dir.get_object(file_id)), self.object_data)
+
+        # Update objects, including one that does not exist.
+        updated_object = self.object_data.copy()
+        updated_object["shape"] = "circle"
+        json_object = json.dumps(updated_object)
+        succeeded = objects_dir.update_objects([(1, json_object),
+                                                (4, json_object)])
+        self.assertEqual(succeeded, [True, False])
+        self.assertEqual(json.loads(objects_dir.get_object(1)), updated_object)
+
+        # Delete objects, including one that was already deleted.
+        succeeded = objects_dir.delete_objects([2, 3, 3])
+        self.assertEqual(succeeded, [True, True, False])
+        self.assertFalse(os.path.exists(os.path.join(path, "2.json")))
+        self.assertFalse(os.path.exists(os.path.join(path, "3.json")))
+        self.assertTrue(os.path.exists(os.path.join(path, "1.json")))
+
+    def test_backlog(self):
+        """Tests the backlog of changes left to sync and the sync statistics.
+        """
+        path = os.path.join(self.objects_dir, "backlog")
+        os.mkdir(path)
+        objects_dir = ObjectsDirectory(path, self.client, offline=False)
+
+        # Nothing to sync.
+        backlog = objects_dir.backlog()
+        self.assertEqual(backlog["adding"], 0)
+        self.assertIsNone(backlog["oldest_pending_age"])
+
+        # Add objects, one with an image.
+        json_data = json.dumps(self.object_data)
+        file_ids = objects_dir.add_objects([json_data] * 2)
+        objects_dir.set_object_image(file_ids[0], generate_image())
+
+        backlog = objects_dir.backlog()
+        self.assertEqual(backlog["adding"], 2)
+        self.assertEqual(backlog["updating"], 0)
+        self.assertEqual(backlog["deleting"], 0)
+        self.assertEqual(backlog["images_setting"], 1)
+        self.assertEqual(backlog["images_deleting"], 0)
+        self.assertGreaterEqual(backlog["oldest_pending_age"], 0.0)
+
+        # Failed syncs are counted and leave the backlog as is.
+        with InteroperabilityMockServer("http://interop") as server:
+            server.set_root_response()
+            server.set_login_response()
+            server.set_post_object_response(self.object_data, 1, code=500)
+
+            self.client.wait_for_server()
+            self.client.login()
+            objects_dir.sync()
+
+        self.assertEqual(objects_dir.last_sync_failures, 2)
+        self.assertEqual(objects_dir.sync_failures, 2)
+        self.assertGreaterEqual(objects_dir.last_sync_duration, 0.0)
+        self.assertEqual(objects_dir.backlog()["adding"], 2)
+
+        # Successful syncs clear the backlog.
+        with InteroperabilityMockServer("http://interop") as server:
+            server.set_root_response()
+            server.set_login_response()
+            server.set_post_object_response(self.object_data, 1)
+            server.set_post_object_image_response(1)
+
+            self.client.wait_for_server()
+            self.client.login()
+            objects_dir.sync()
+
+        self.assertEqual(objects_dir.last_sync_failures, 0)
+        self.assertEqual(objects_dir.sync_failures, 2)
+        backlog = objects_dir.backlog()
+        self.assertEqual(backlog["adding"], 0)
+        self.assertEqual(backlog["images_setting"], 0)
+        self.assertIsNone(backlog["oldest_pending_age"])
+
     def test_initial_state_variables(self):
         """Tests the state variables right after an object is added."""
         self.assertTrue(self.object._needs_adding)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Moving obstacle tracking tests."""
+
+import rospy
+import rosunit
+from unittest import TestCase, TestLoader, TestSuite
+from interop.msg import GeoSphere, GeoSphereArrayStamped
+from interop.obstacles import (KNOTS_TO_METERS_PER_SECOND,
+                               MovingObstacleExtrapolator,
+                               MovingObstacleSimulator)
+
+
+def generate_spheres(t, positions):
+    """Generates moving obstacles.
+
+    Args:
+        t: Time stamp in seconds.
+        positions: List of (latitude, longitude, altitude) tuples.
+
+    Returns:
+        GeoSphereArrayStamped.
+    """
+    spheres = GeoSphereArrayStamped()
+    spheres.header.stamp = rospy.Time.from_sec(t)
+    for latitude, longitude, altitude in positions:
+        sphere = GeoSphere()
+        sphere.center.latitude = latitude
+        sphere.center.longitude = longitude
+        sphere.center.altitude = altitude
+        sphere.radius = 30.0
+        spheres.spheres.append(sphere)
+    return spheres
+
+
+class TestMovingObstacleExtrapolator(TestCase):
+
+    """Tests moving obstacle extrapolation."""
+
+    def test_no_samples(self):
+        """Tests nothing is predicted without samples."""
+        extrapolator = MovingObstacleExtrapolator()
+        self.assertIsNone(extrapolator.predict(rospy.Time.from_sec(1.0)))
+
+    def test_single_sample(self):
+        """Tests obstacles stay still with a single sample."""
+        extrapolator = MovingObstacleExtrapolator()
+        extrapolator.update(generate_spheres(1.0, [(38.14, -76.43, 100.0)]))
+
+        spheres = extrapolator.predict(rospy.Time.from_sec(1.5))
+        self.assertEqual(spheres.header.stamp, rospy.Time.from_sec(1.5))
+        self.assertEqual(spheres.age, rospy.Duration.from_sec(0.5))
+        self.assertEqual(spheres.spheres[0].center.latitude, 38.14)
+        self.assertEqual(spheres.spheres[0].center.longitude, -76.43)
+        self.assertEqual(spheres.spheres[0].center.altitude, 100.0)
+        self.assertEqual(spheres.spheres[0].radius, 30.0)
+
+    def test_constant_velocity(self):
+        """Tests obstacles moving at a constant velocity are extrapolated."""
+        extrapolator = MovingObstacleExtrapolator(max_horizon=1.0)
+        for t in range(4):
+            extrapolator.update(
+                generate_spheres(t, [(38.14 + 1e-4 * t, -76.43, 100.0 + t),
+                                     (38.15, -76.44, 200.0)]))
+
+        spheres = extrapolator.predict(rospy.Time.from_sec(3.5))
+        moving, still = spheres.spheres
+        self.assertAlmostEqual(moving.center.latitude, 38.14 + 3.5e-4)
+        self.assertAlmostEqual(moving.center.longitude, -76.43)
+        self.assertAlmostEqual(moving.center.altitude, 103.5)
+        self.assertAlmostEqual(still.center.latitude, 38.15)
+        self.assertAlmostEqual(still.center.altitude, 200.0)
+
+        # Test the prediction is clamped to the maximum horizon.
+        spheres = extrapolator.predict(rospy.Time.from_sec(10.0))
+        self.assertAlmostEqual(spheres.spheres[0].center.altitude, 104.0)
+
+    def test_obstacles_changed(self):
+        """Tests velocities are reset when the obstacles change."""
+        extrapolator = MovingObstacleExtrapolator()
+        extrapolator.update(generate_spheres(0.0, [(38.14, -76.43, 100.0)]))
+        extrapolator.update(generate_spheres(1.0, [(38.14, -76.43, 101.0)]))
+        extrapolator.update(
+            generate_spheres(2.0, [(38.14, -76.43, 100.0),
+                                   (38.15, -76.44, 200.0)]))
+
+        spheres = extrapolator.predict(rospy.Time.from_sec(2.5))
+        self.assertEqual(len(spheres.spheres), 2)
+        self.assertAlmostEqual(spheres.spheres[0].center.altitude, 100.0)
+
+
+class TestMovingObstacleSimulator(TestCase):
+
+    """Tests moving obstacle simulation."""
+
+    def test_loop(self):
+        """Tests obstacles loop through their waypoints."""
+        # Climb 200 ft in one second, and go back down.
+        simulator = MovingObstacleSimulator([{
+            "sphere_radius":
+                50.0,
+            "speed_avg":
+                60.96 / KNOTS_TO_METERS_PER_SECOND,
+            "waypoints": [{
+                "latitude": 38.14,
+                "longitude": -76.43,
+                "altitude_msl": 100.0
+            }, {
+                "latitude": 38.14,
+                "longitude": -76.43,
+                "altitude_msl": 300.0
+            }]
+        }])
+
+        for t, altitude in [(0.0, 100.0), (0.5, 200.0), (1.0, 300.0),
+                            (1.5, 200.0), (2.0, 100.0), (10.25, 150.0)]:
+            obstacle, = simulator.moving_obstacles(t)
+            self.assertAlmostEqual(obstacle["altitude_msl"], altitude, 2)
+            self.assertAlmostEqual(obstacle["latitude"], 38.14)
+            self.assertAlmostEqual(obstacle["longitude"], -76.43)
+            self.assertEqual(obstacle["sphere_radius"], 50.0)
+
+    def test_single_waypoint(self):
+        """Tests obstacles with a single waypoint stay still."""
+        simulator = MovingObstacleSimulator([{
+            "sphere_radius":
+                50.0,
+            "speed_avg":
+                10.0,
+            "waypoints": [{
+                "latitude": 38.14,
+                "longitude": -76.43,
+                "altitude_msl": 100.0
+            }]
+        }])
+
+        obstacle, = simulator.moving_obstacles(12.3)
+        self.assertEqual(obstacle["latitude"], 38.14)
+        self.assertEqual(obstacle["longitude"], -76.43)
+        self.assertEqual(obstacle["altitude_msl"], 100.0)
+
+
+def suite():
+    """Returns a suite of every test case, to report them together."""
+    loader = TestLoader()
+    return TestSuite(
+        loader.loadTestsFromTestCase(case)
+        for case in (TestMovingObstacleExtrapolator,
+                     TestMovingObstacleSimulator))
+
+
+if __name__ == "__main__":
+    rosunit.unitrun("test_obstacles", "test_obstacles", "__main__.suite")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Callback profiling tests."""
+
+import os
+import time
+import pstats
+import shutil
+import rosunit
+import tempfile
+import threading
+from unittest import TestCase
+from interop.profiling import CallbackProfiler
+
+
+def callback(duration=0.0):
+    """Callback to profile.
+
+    Args:
+        duration: Time to sleep for in seconds.
+
+    Returns:
+        The duration.
+    """
+    time.sleep(duration)
+    return duration
+
+
+class TestCallbackProfiler(TestCase):
+
+    """Tests callback profiling."""
+
+    def setUp(self):
+        """Sets up a temporary directory."""
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Deletes the temporary directory."""
+        shutil.rmtree(self.dir)
+
+    def test_disabled(self):
+        """Tests callbacks are not wrapped when disabled."""
+        profiler = CallbackProfiler(False, path=self.dir)
+        self.assertIs(profiler.wrap(callback), callback)
+        self.assertEqual(profiler.stats(), {})
+
+    def test_stats(self):
+        """Tests calls are counted and timed."""
+        profiler = CallbackProfiler(True, path=self.dir)
+        wrapped = profiler.wrap(callback)
+        self.assertEqual(wrapped.__name__, "callback")
+        self.assertEqual(wrapped(0.01), 0.01)
+        wrapped()
+
+        # Failed calls are also recorded.
+        failing = profiler.wrap(lambda: 1 / 0, "failing")
+        self.assertRaises(ZeroDivisionError, failing)
+
+        stats = profiler.stats()
+        self.assertEqual(sorted(stats), ["callback", "failing"])
+        self.assertEqual(stats["callback"].calls, 2)
+        self.assertGreaterEqual(stats["callback"].total_time, 0.01)
+        self.assertGreaterEqual(stats["callback"].max_time, 0.01)
+        self.assertEqual(stats["failing"].calls, 1)
+
+        response = profiler.dump()
+        self.assertTrue(response.success)
+        self.assertTrue(response.message.startswith("callback: 2 calls"))
+        self.assertEqual(os.listdir(self.dir), [])
+
+    def test_cprofile(self):
+        """Tests cProfile profiles of every thread are merged and dumped."""
+        profiler = CallbackProfiler(True, True, self.dir)
+        self.assertIsNone(profiler.dump_profile())
+
+        # Nested callbacks are profiled as part of their caller.
+        wrapped = profiler.wrap(callback)
+        nested = profiler.wrap(lambda: wrapped(), "nested")
+        threads = [threading.Thread(target=nested) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = profiler.stats()
+        self.assertEqual(stats["nested"].calls, 4)
+        self.assertEqual(stats["callback"].calls, 4)
+
+        response = profiler.dump()
+        self.assertTrue(response.success)
+        paths = os.listdir(self.dir)
+        self.assertEqual(len(paths), 1)
+        self.assertIn(paths[0], response.message)
+
+        # Every call is in the merged profile.
+        profile = pstats.Stats(os.path.join(self.dir, paths[0]))
+        calls = [
+            stats[0]
+            for (path, line, name), stats in profile.stats.items()
+            if name == "callback"
+        ]
+        self.assertEqual(calls, [4])
+
+
+if __name__ == "__main__":
+    rosunit.unitrun("test_profiling", "test_profiling", TestCallbackProfiler)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Telemetry recording tests."""
+
+import os
+import json
+import shutil
+import rosunit
+import tempfile
+from unittest import TestCase
+from interop.recording import TelemetryRecorder
+
+TELEMETRY = {
+    "latitude": 38.14792,
+    "longitude": -76.427995,
+    "altitude_msl": 200.0,
+    "uas_heading": 90.0
+}
+
+
+class TestTelemetryRecorder(TestCase):
+
+    """Tests telemetry recording."""
+
+    def setUp(self):
+        """Sets up a temporary directory."""
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "telemetry.jsonl")
+
+    def tearDown(self):
+        """Deletes the temporary directory."""
+        shutil.rmtree(self.dir)
+
+    def read(self, path):
+        """Reads recorded telemetry.
+
+        Args:
+            path: Path to the recording.
+
+        Returns:
+            List of telemetry dictionaries.
+        """
+        with open(path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_record(self):
+        """Tests telemetry is recorded in order."""
+        recorder = TelemetryRecorder(self.path)
+        for i in range(100):
+            self.assertTrue(recorder.record(TELEMETRY, float(i)))
+        recorder.close()
+
+        records = self.read(self.path)
+        self.assertEqual([r["time"] for r in records], list(range(100)))
+        self.assertEqual(records[0]["latitude"], TELEMETRY["latitude"])
+        self.assertEqual(records[0]["uas_heading"], TELEMETRY["uas_heading"])
+
+    def test_rotate(self):
+        """Tests recordings are rotated."""
+        recorder = TelemetryRecorder(self.path, max_bytes=1000, backup_count=2)
+        for i in range(100):
+            recorder.record(TELEMETRY, float(i))
+        recorder.close()
+
+        # Only the most recent records are kept.
+        files = ["{}.2".format(self.path), "{}.1".format(self.path), self.path]
+        records = [r for path in files for r in self.read(path)]
+        times = [r["time"] for r in records]
+        self.assertEqual(times, list(range(100 - len(times), 100)))
+        self.assertFalse(os.path.exists("{}.3".format(self.path)))
+        for path in files[:-1]:
+            self.assertGreaterEqual(os.path.getsize(path), 1000)
+
+
+if __name__ == "__main__":
+    rosunit.unitrun("test_recording", "test_recording", TestTelemetryRecorder)
@@ -2,8 +2,10 @@
 # -*- coding: utf-8 -*-
 """Interoperability Serialization Tests."""
 
+import sys
 import rospy
 import rosunit
+import subprocess
 import numpy as np
 from unittest import TestCase
 from cv_bridge import CvBridge
@@ -149,10 +151,114 @@ class TestSerializers(TestCase):
         self.assertEqual(home.position.latitude, data["home_pos"]["latitude"])
         self.assertEqual(home.position.longitude, data["home_pos"]["longitude"])
 
+    def test_mission_mapping(self):
+        """Tests missions are only deserialized when accessed."""
+        # yapf: disable
+        point = {"latitude": 38.142544, "longitude": -76.434088}
+        waypoint = dict(point, altitude_msl=200.0, order=1)
+        data = {
+            "id": 1,
+            "active": True,
+            "air_drop_pos": point,
+            "fly_zones": [{
+                "altitude_msl_max": 200.0,
+                "altitude_msl_min": 100.0,
+                "boundary_pts": [dict(point, order=1)]
+            }],
+            "home_pos": point,
+            "mission_waypoints": [waypoint],
+            "off_axis_odlc_pos": point,
+            "emergent_last_known_pos": point,
+            "search_grid_points": [waypoint]
+        }
+        # yapf: enable
+        other = dict(data, id=2, active=False)
+        missions = serializers.MissionMapping({1: data, 2: other}, "map")
+        self.assertEqual(len(missions), 2)
+        self.assertEqual(sorted(missions), [1, 2])
+        self.assertEqual(missions._missions, {})
+
+        mission = missions[2]
+        self.assertEqual(list(missions._missions), [2])
+        self.assertEqual(mission[0].flyzones[0].max_alt,
+                         serializers.feet_to_meters(200.0))
+        self.assertIs(missions[2], mission)
+
+        self.assertNotIn(3, missions)
+        with self.assertRaises(KeyError):
+            missions[3]
+
+    def test_iso8601_to_rostime(self):
+        """Tests ISO 8601 parsing matches the general parser."""
+        timestamps = [
+            "2017-06-15T18:23:14.451726+00:00",
+            "2017-06-15T18:23:14Z",
+            "2017-06-15T18:23:14",
+            "2017-06-15T18:23:14.4+05:30",
+            "2017-06-15T18:23:14.123456789-0400",
+            "2000-02-29T00:00:00.000001-00:00",
+        ]
+        for iso in timestamps:
+            self.assertEqual(
+                serializers._parse_iso8601(iso),
+                serializers._parse_iso8601_fallback(iso))
+
+        # Test the fallback is used for other layouts.
+        iso = "2017-06-15 18:23:14"
+        self.assertIsNone(serializers._parse_iso8601(iso))
+        time = serializers.iso8601_to_rostime(iso)
+        self.assertEqual(time.data.secs, 1497550994)
+        self.assertEqual(time.data.nsecs, 0)
+
+        time = serializers.iso8601_to_rostime(timestamps[0])
+        self.assertEqual(time.data.secs, 1497550994)
+        self.assertEqual(time.data.nsecs, 451726000)
+
+    def test_points_to_geopoints(self):
+        """Tests bulk conversion of points to GeoPoint messages."""
+        points = [{
+            "altitude_msl": 200.0,
+            "latitude": 38.142544,
+            "longitude": -76.434088
+        }, {
+            "altitude_msl": 100,
+            "latitude": 38.141833,
+            "longitude": -76.425263
+        }]
+
+        # Without altitude.
+        geopoints = serializers.points_to_geopoints(points)
+        self.assertEqual(len(geopoints), len(points))
+        for geopoint, point in zip(geopoints, points):
+            self.assertEqual(geopoint.latitude, point["latitude"])
+            self.assertEqual(geopoint.longitude, point["longitude"])
+            self.assertEqual(geopoint.altitude, 0.0)
+
+        # With altitude.
+        geopoints = serializers.points_to_geopoints(points, "altitude_msl")
+        for geopoint, point in zip(geopoints, points):
+            altitude = serializers.feet_to_meters(point["altitude_msl"])
+            self.assertEqual(geopoint.altitude, altitude)
+
+        # Empty.
+        self.assertEqual(
+            serializers.points_to_geopoints([], "altitude_msl"), [])
+
     def test_obstacles_deserializer(self):
         """Tests obstacles deserializer."""
         # Set up test data.
         data = {
+            "moving_obstacles": [{
+                "altitude_msl": 189.56748784643966,
+                "latitude": 38.141826869853645,
+                "longitude": -76.43199876559223,
+                "sphere_radius": 150.0
+            }, {
+                "altitude_msl": 250.0,
+                "latitude": 38.14923628783763,
+                "longitude": -76.43238529543882,
+                "sphere_radius": 150.0
+            }],
             "stationary_obstacles": [{
                 "cylinder_height": 750.0,
                 "cylinder_radius": 300.0,
@@ -168,12 +274,24 @@ class TestSerializers(TestCase):
 
         # Deserialize obstacles.
         args = (data, "odom", 1.0)
-        stationary = serializers.ObstaclesDeserializer.from_dict(*args)
+        moving, stationary = serializers.ObstaclesDeserializer.from_dict(*args)
 
         # Compare number of markers.
+        self.assertEqual(len(data["moving_obstacles"]), len(moving.spheres))
         self.assertEqual(
             len(data["stationary_obstacles"]), len(stationary.cylinders))
 
+        # Test moving obstacle properties.
+        for i, sphere in enumerate(moving.spheres):
+            obs = data["moving_obstacles"][i]
+            altitude = serializers.feet_to_meters(obs["altitude_msl"])
+            radius = serializers.feet_to_meters(obs["sphere_radius"])
+
+            self.assertEqual(sphere.center.latitude, obs["latitude"])
+            self.assertEqual(sphere.center.longitude, obs["longitude"])
+            self.assertEqual(sphere.center.altitude, altitude)
+            self.assertEqual(sphere.radius, radius)
+
         # Test stationary obstacle properties.
         for i, cylinder in enumerate(stationary.cylinders):
             obs = data["stationary_obstacles"][i]
@@ -274,6 +392,31 @@ class TestSerializers(TestCase):
         self.assertEqual(data["description"], object_.description)
         self.assertEqual(data["autonomous"], object_.autonomous)
 
+    def test_object_serializer_round_trip(self):
+        """Tests object serialization followed by deserialization."""
+        object_ = Object()
+        object_.type.data = ObjectType.QRC
+        object_.latitude = 38.1878
+        object_.longitude = -76.4075
+        object_.description = "http://auvsi-seafarer.org"
+        object_.autonomous = True
+
+        data = serializers.ObjectSerializer.from_msg(object_)
+        self.assertEqual(set(data), set(Object.__slots__))
+        self.assertEqual(serializers.ObjectSerializer.from_dict(data), object_)
+
+        # Test through JSON.
+        json_object = serializers.ObjectSerializer.to_json(object_)
+        self.assertEqual(
+            serializers.ObjectSerializer.from_json(json_object), object_)
+
+        # Test None values are left as default.
+        data["shape"] = None
+        data["latitude"] = None
+        converted = serializers.ObjectSerializer.from_dict(data)
+        self.assertEqual(converted.shape.data, "")
+        self.assertEqual(converted.latitude, 0.0)
+
     def test_object_image_serializer(self):
         """Tests object image serializer can be deserialized."""
         # Create random 40 x 30 RGB image.
@@ -298,6 +441,14 @@ class TestSerializers(TestCase):
         # Test if we get the original image.
         self.assertTrue((converted_arr == nparr).all())
 
+    def test_lazy_imports(self):
+        """Tests slow dependencies are not imported with the package."""
+        modules = ["cv2", "cv_bridge", "dateutil", "tf"]
+        code = ("import sys, interop; "
+                "print(' '.join(m for m in sys.argv[1:] if m in sys.modules))")
+        output = subprocess.check_output([sys.executable, "-c", code] + modules)
+        self.assertEqual(output.decode().strip(), "")
+
 
 if __name__ == "__main__":
     rospy.init_node("test_serializers")
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Spatial index tests."""
+
+import rosunit
+import numpy as np
+from unittest import TestCase, TestLoader, TestSuite
+from interop.spatial import FlyZoneIndex, ObstacleIndex
+from geographic_msgs.msg import GeoPoint, GeoPointStamped
+from interop.projection import geodetic_to_enu, project_mission
+from interop.msg import (FlyZone, FlyZoneArray, GeoCylinder, GeoPolygonStamped,
+                         WayPoints)
+
+# Roughly 1 meter in latitude or longitude around the origin.
+ORIGIN = (38.0, -76.0, 0.0)
+LATITUDE_METER = 1.0 / 111000.0
+LONGITUDE_METER = 1.0 / 87800.0
+
+# Vertices of a U shaped fly zone open to the north, in meters east and north
+# of the origin.
+U_SHAPE = [
+    (0.0, 0.0),
+    (300.0, 0.0),
+    (300.0, 300.0),
+    (200.0, 300.0),
+    (200.0, 100.0),
+    (100.0, 100.0),
+    (100.0, 300.0),
+    (0.0, 300.0),
+]
+
+
+def generate_cylinder(east, north, radius, height):
+    """Generates a stationary obstacle around the origin.
+
+    Args:
+        east: Distance east of the origin in meters.
+        north: Distance north of the origin in meters.
+        radius: Radius in meters.
+        height: Height in meters.
+
+    Returns:
+        GeoCylinder.
+    """
+    cylinder = GeoCylinder()
+    cylinder.center.latitude = ORIGIN[0] + north * LATITUDE_METER
+    cylinder.center.longitude = ORIGIN[1] + east * LONGITUDE_METER
+    cylinder.radius = radius
+    cylinder.height = height
+    return cylinder
+
+
+def generate_point(east, north, altitude):
+    """Generates a point around the origin.
+
+    Args:
+        east: Distance east of the origin in meters.
+        north: Distance north of the origin in meters.
+        altitude: Altitude in meters.
+
+    Returns:
+        GeoPoint.
+    """
+    return GeoPoint(ORIGIN[0] + north * LATITUDE_METER,
+                    ORIGIN[1] + east * LONGITUDE_METER, altitude)
+
+
+class TestProjection(TestCase):
+
+    """Tests geographic projections."""
+
+    def test_geodetic_to_enu(self):
+        """Tests projecting to ENU."""
+        enu = geodetic_to_enu([38.001, 38.0, 38.0], [-76.0, -75.999, -76.0],
+                              [0.0, 0.0, 10.0], ORIGIN)
+        np.testing.assert_allclose(enu[0], [0.0, 111.0, 0.0], atol=0.1)
+        np.testing.assert_allclose(enu[1], [87.8, 0.0, 0.0], atol=0.1)
+        np.testing.assert_allclose(enu[2], [0.0, 0.0, 10.0], atol=0.001)
+
+    def test_project_mission(self):
+        """Tests projecting the mission geometry around home."""
+        flyzone = FlyZone()
+        flyzone.min_alt = 30.0
+        flyzone.max_alt = 200.0
+        flyzone.zone.polygon.points = [
+            generate_point(east, north, 0.0) for east, north in U_SHAPE
+        ]
+        flyzones = FlyZoneArray([flyzone])
+
+        search_grid = GeoPolygonStamped()
+        search_grid.polygon.points = [
+            generate_point(10.0, 20.0, 0.0),
+            generate_point(30.0, 20.0, 0.0),
+            generate_point(30.0, 40.0, 0.0),
+        ]
+
+        waypoints = WayPoints()
+        waypoints.waypoints = [generate_point(100.0, 50.0, 150.0)]
+
+        home = GeoPointStamped()
+        home.position = generate_point(0.0, 0.0, 0.0)
+
+        local_flyzones, local_search_grid, local_waypoints = project_mission(
+            flyzones, search_grid, waypoints, home, "home")
+
+        local_flyzone = local_flyzones.flyzones[0]
+        self.assertEqual(local_flyzone.zone.header.frame_id, "home")
+        self.assertEqual(local_flyzone.min_alt, 30.0)
+        self.assertEqual(local_flyzone.max_alt, 200.0)
+        np.testing.assert_allclose(
+            [(p.x, p.y) for p in local_flyzone.zone.polygon.points],
+            U_SHAPE,
+            atol=0.5)
+
+        self.assertEqual(local_search_grid.header.frame_id, "home")
+        np.testing.assert_allclose(
+            [(p.x, p.y) for p in local_search_grid.polygon.points],
+            [(10.0, 20.0), (30.0, 20.0), (30.0, 40.0)],
+            atol=0.5)
+
+        self.assertEqual(local_waypoints.header.frame_id, "home")
+        waypoint = local_waypoints.waypoints[0]
+        np.testing.assert_allclose(
+            (waypoint.x, waypoint.y, waypoint.z), (100.0, 50.0, 150.0),
+            atol=0.5)
+
+
+class TestObstacleIndex(TestCase):
+
+    """Tests the stationary obstacle index."""
+
+    def setUp(self):
+        """Sets up the obstacle index."""
+        self.cylinders = [
+            generate_cylinder(0.0, 0.0, 30.0, 200.0),
+            generate_cylinder(0.0, 1000.0, 50.0, 100.0),
+            generate_cylinder(-2000.0, 0.0, 10.0, 300.0),
+        ]
+        self.index = ObstacleIndex(self.cylinders, cell_size=100.0)
+
+    def test_empty(self):
+        """Tests querying an empty index."""
+        index = ObstacleIndex([])
+        self.assertEqual(
+            index.query([generate_point(0.0, 0.0, 0.0)], 100.0), [])
+
+    def test_point(self):
+        """Tests querying around a point."""
+        nearby = self.index.query([generate_point(0.0, 55.0, 50.0)], 100.0)
+        self.assertEqual(len(nearby), 1)
+        self.assertIs(nearby[0][0], self.cylinders[0])
+        self.assertAlmostEqual(nearby[0][1], 25.0, delta=0.5)
+
+    def test_point_above(self):
+        """Tests the height of the obstacles is taken into account."""
+        nearby = self.index.query([generate_point(0.0, 0.0, 250.0)], 100.0)
+        self.assertEqual(len(nearby), 1)
+        self.assertAlmostEqual(nearby[0][1], 50.0, delta=0.5)
+
+        nearby = self.index.query([generate_point(0.0, 0.0, 250.0)], 40.0)
+        self.assertEqual(nearby, [])
+
+    def test_path(self):
+        """Tests querying along a path, sorted by distance."""
+        path = [
+            generate_point(0.0, 0.0, 50.0),
+            generate_point(0.0, 1000.0, 150.0)
+        ]
+        nearby = self.index.query(path, 60.0)
+        self.assertEqual([c for c, _ in nearby], self.cylinders[:2])
+        self.assertAlmostEqual(nearby[0][1], 0.0, delta=0.5)
+        self.assertAlmostEqual(nearby[1][1], 50.0, delta=0.5)
+
+    def test_nothing_nearby(self):
+        """Tests querying far from every obstacle."""
+        nearby = self.index.query([generate_point(-1000.0, 500.0, 50.0)], 100.0)
+        self.assertEqual(nearby, [])
+
+    def test_key(self):
+        """Tests obstacle set keys only change with the obstacles."""
+        same = [
+            generate_cylinder(0.0, 0.0, 30.0, 200.0),
+            generate_cylinder(0.0, 1000.0, 50.0, 100.0),
+            generate_cylinder(-2000.0, 0.0, 10.0, 300.0),
+        ]
+        self.assertEqual(
+            ObstacleIndex.key(self.cylinders), ObstacleIndex.key(same))
+
+        same[0].radius = 40.0
+        self.assertNotEqual(
+            ObstacleIndex.key(self.cylinders), ObstacleIndex.key(same))
+
+
+class TestFlyZoneIndex(TestCase):
+
+    """Tests fly zone containment queries."""
+
+    def setUp(self):
+        """Sets up the fly zone index."""
+        flyzone = FlyZone()
+        flyzone.min_alt = 30.0
+        flyzone.max_alt = 200.0
+        flyzone.zone.polygon.points = [
+            generate_point(east, north, 0.0) for east, north in U_SHAPE
+        ]
+        self.index = FlyZoneIndex([flyzone])
+
+    def test_empty(self):
+        """Tests nothing is inside without fly zones."""
+        path_inside, inside, _ = FlyZoneIndex([]).query(
+            [generate_point(0.0, 0.0, 100.0)])
+        self.assertFalse(path_inside)
+        self.assertFalse(inside[0])
+
+    def test_points(self):
+        """Tests checking points in a batch."""
+        _, inside, distances = self.index.query([
+            generate_point(50.0, 200.0, 100.0),
+            generate_point(150.0, 200.0, 100.0),
+            generate_point(50.0, 200.0, 250.0),
+            generate_point(50.0, 200.0, 40.0),
+            generate_point(-10.0, 150.0, 100.0),
+        ])
+        self.assertEqual(inside.tolist(), [True, False, False, True, False])
+        np.testing.assert_allclose(
+            distances, [50.0, -50.0, -50.0, 10.0, -10.0], atol=0.5)
+
+    def test_path(self):
+        """Tests checking paths."""
+        # Going around the notch.
+        path_inside, inside, _ = self.index.query([
+            generate_point(50.0, 250.0, 100.0),
+            generate_point(50.0, 50.0, 100.0),
+            generate_point(250.0, 50.0, 100.0),
+            generate_point(250.0, 250.0, 100.0),
+        ])
+        self.assertTrue(path_inside)
+        self.assertTrue(inside.all())
+
+        # Going through the notch.
+        path_inside, inside, _ = self.index.query([
+            generate_point(50.0, 250.0, 100.0),
+            generate_point(250.0, 250.0, 100.0),
+        ])
+        self.assertFalse(path_inside)
+        self.assertTrue(inside.all())
+
+
+def suite():
+    """Returns a suite of every test case, to report them together."""
+    loader = TestLoader()
+    return TestSuite(
+        loader.loadTestsFromTestCase(case)
+        for case in (TestProjection, TestObstacleIndex, TestFlyZoneIndex))
+
+
+if __name__ == "__main__":
+    rosunit.unitrun("test_spatial", "test_spatial", "__main__.suite")